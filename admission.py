@@ -0,0 +1,254 @@
+"""Admission control: per-route concurrency limits with priority classes.
+
+Every endpoint belongs to a class:
+
+- ``critical`` (login, report submission/edit/delete) is never queued or
+  rejected
+- ``default`` (everything not listed) is not limited
+- limited classes, by default ``analytics`` (monitoring pages, the Excel
+  export, pivot, drill-down, audit log) and ``upload`` (item workbooks,
+  report imports), run at most ``concurrency`` requests at once and queue up
+  to ``queue`` more for at most ``timeout`` seconds, oldest first. Beyond
+  that the request is answered with 503 and Retry-After.
+
+A queued request still holds a server thread, so the limited classes together
+(running and queued) never occupy more than ``capacity - reserved`` threads,
+where capacity is waitress's thread count. The reserved threads stay free for
+report submissions and logins however many admins open a one-year range.
+
+Limits are per process. ADMISSION_LIMITS (``class=concurrency:queue:timeout``,
+comma separated) overrides or adds classes and ADMISSION_ROUTES
+(``endpoint=class``) moves routes between them, so a route given a class of
+its own gets its own limit. Admission counters and queue waits are served to
+admins at /admin/admission/stats.
+"""
+import threading
+import time
+from collections import deque
+from flask import request, jsonify, make_response, g
+
+CRITICAL = 'critical'
+DEFAULT = 'default'
+DEFAULT_LIMITS = {
+    'analytics': (4, 4, 10.0),
+    'upload': (1, 1, 30.0),
+}
+DEFAULT_ROUTES = {
+    'login': CRITICAL,
+    'new_report': CRITICAL,
+    'edit_report': CRITICAL,
+    'delete_report': CRITICAL,
+    'monitoring': 'analytics',
+    'monitoring_export': 'analytics',
+    'api_monitoring_pivot': 'analytics',
+    'api_monitoring_drilldown': 'analytics',
+    'audit_log': 'analytics',
+    'upload_items': 'upload',
+    'import_reports': 'upload',
+}
+WAIT_SAMPLES = 1000  # recent queue waits kept per class for the percentiles
+
+
+def _pairs(value, setting):
+    for part in (value or '').split(','):
+        if not part.strip():
+            continue
+        key, sep, rest = part.partition('=')
+        if not sep or not key.strip() or not rest.strip():
+            raise ValueError(f'{setting}: expected name=value, got {part.strip()!r}')
+        yield key.strip(), rest.strip()
+
+
+def parse_limits(value):
+    """{class: (concurrency, queue, timeout)} from ``class=concurrency:queue:timeout,...``."""
+    limits = {}
+    for name, spec in _pairs(value, 'ADMISSION_LIMITS'):
+        try:
+            concurrency, queue, timeout = spec.split(':')
+            limits[name] = (int(concurrency), int(queue), float(timeout))
+        except ValueError:
+            raise ValueError(f'ADMISSION_LIMITS: expected {name}=concurrency:queue:timeout, got {spec!r}')
+        if limits[name][0] < 1 or limits[name][1] < 0:
+            raise ValueError(f'ADMISSION_LIMITS: {name} needs concurrency >= 1 and queue >= 0')
+    return limits
+
+
+def parse_routes(value):
+    """{endpoint: class} from ``endpoint=class,...``."""
+    return dict(_pairs(value, 'ADMISSION_ROUTES'))
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class RequestClass:
+    """Concurrency slots, FIFO queue and counters of one limited class."""
+
+    def __init__(self, name, concurrency, queue, timeout):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.timeout = timeout
+        self.tickets = deque()
+        self.running = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.peak_waiting = 0
+        self.wait_total = 0.0
+        self.waits = deque(maxlen=WAIT_SAMPLES)
+
+    @property
+    def waiting(self):
+        return len(self.tickets)
+
+    def stats(self):
+        waits = list(self.waits)
+        return {
+            'concurrency': self.concurrency,
+            'queue': self.queue,
+            'timeout': self.timeout,
+            'running': self.running,
+            'waiting': self.waiting,
+            'peak_waiting': self.peak_waiting,
+            'admitted': self.admitted,
+            'queued': self.queued,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+            'wait_ms_total': round(self.wait_total * 1000, 1),
+            'wait_ms_p50': round(_percentile(waits, 0.5) * 1000, 1) if waits else 0.0,
+            'wait_ms_p95': round(_percentile(waits, 0.95) * 1000, 1) if waits else 0.0,
+            'wait_ms_max': round(max(waits) * 1000, 1) if waits else 0.0,
+        }
+
+
+class AdmissionController:
+    def __init__(self):
+        self.enabled = False
+        self.capacity = 16
+        self.reserved = 4
+        self.retry_after = 5
+        self.routes = dict(DEFAULT_ROUTES)
+        self.classes = {}
+        self.occupied = 0  # running + queued requests of limited classes
+        self.critical = 0
+        self._cond = threading.Condition()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('ADMISSION_CONTROL', True)
+        self.capacity = app.config.get('ADMISSION_CAPACITY', 16)
+        self.reserved = app.config.get('ADMISSION_RESERVED', 4)
+        self.retry_after = app.config.get('ADMISSION_RETRY_AFTER', 5)
+        limits = dict(DEFAULT_LIMITS)
+        limits.update(parse_limits(app.config.get('ADMISSION_LIMITS')))
+        self.routes = dict(DEFAULT_ROUTES)
+        self.routes.update(parse_routes(app.config.get('ADMISSION_ROUTES')))
+        self.classes = {name: RequestClass(name, *limit) for name, limit in limits.items()
+                        if name not in (CRITICAL, DEFAULT)}
+        unknown = sorted({name for name in self.routes.values()} - set(self.classes) - {CRITICAL, DEFAULT})
+        if unknown:
+            raise ValueError(f"ADMISSION_ROUTES: no limits configured for {', '.join(unknown)}")
+        self.occupied = 0
+        app.extensions['admission'] = self
+        if self.enabled:
+            app.before_request(self._before_request)
+            app.teardown_request(self._teardown_request)
+
+    @property
+    def budget(self):
+        """Threads the limited classes may hold together."""
+        return max(1, self.capacity - self.reserved)
+
+    def class_for(self, endpoint):
+        return self.routes.get(endpoint, DEFAULT)
+
+    def acquire(self, name):
+        """Take a slot in limited class ``name``, queueing up to its timeout. False when rejected."""
+        request_class = self.classes[name]
+        started = time.monotonic()
+        with self._cond:
+            full = request_class.running >= request_class.concurrency or request_class.waiting > 0
+            if self.occupied >= self.budget or (full and request_class.waiting >= request_class.queue):
+                request_class.rejected += 1
+                return False
+            self.occupied += 1
+            if not full:
+                request_class.running += 1
+                request_class.admitted += 1
+                request_class.waits.append(0.0)
+                return True
+
+            ticket = object()
+            request_class.tickets.append(ticket)
+            request_class.queued += 1
+            request_class.peak_waiting = max(request_class.peak_waiting, request_class.waiting)
+            deadline = started + request_class.timeout
+            while request_class.tickets[0] is not ticket or request_class.running >= request_class.concurrency:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    request_class.tickets.remove(ticket)
+                    request_class.timed_out += 1
+                    self.occupied -= 1
+                    self._cond.notify_all()
+                    return False
+                self._cond.wait(remaining)
+            request_class.tickets.popleft()
+            request_class.running += 1
+            request_class.admitted += 1
+            waited = time.monotonic() - started
+            request_class.wait_total += waited
+            request_class.waits.append(waited)
+            self._cond.notify_all()  # the next ticket may fit too
+            return True
+
+    def release(self, name):
+        request_class = self.classes[name]
+        with self._cond:
+            request_class.running -= 1
+            self.occupied -= 1
+            self._cond.notify_all()
+
+    def busy_response(self):
+        message = f'The server is busy, please retry in {self.retry_after} seconds'
+        if request.path.startswith('/api/') or request.accept_mimetypes.best == 'application/json' \
+                or request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            response = jsonify({'success': False, 'message': message})
+        else:
+            response = make_response(message)
+        response.status_code = 503
+        response.headers['Retry-After'] = str(self.retry_after)
+        return response
+
+    def _before_request(self):
+        name = self.class_for(request.endpoint)
+        if name == CRITICAL:
+            self.critical += 1
+        if name not in self.classes:
+            return None
+        if not self.acquire(name):
+            return self.busy_response()
+        g.admission_class = name
+        return None
+
+    def _teardown_request(self, exc):
+        name = g.pop('admission_class', None)
+        if name is not None:
+            self.release(name)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'enabled': self.enabled,
+                'capacity': self.capacity,
+                'reserved': self.reserved,
+                'occupied': self.occupied,
+                'critical_requests': self.critical,
+                'classes': {name: request_class.stats() for name, request_class in self.classes.items()},
+                'routes': dict(sorted(self.routes.items())),
+            }
+
+
+admission = AdmissionController()
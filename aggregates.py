@@ -0,0 +1,213 @@
+"""Aggregate queries behind the monitoring page.
+
+Each function returns plain dicts/lists so results can be cached, stored as
+snapshots and merged. ``after_id`` restricts a computation to reports with a
+larger id, which is how snapshots pick up reports created after they were taken;
+``max_id`` pins a snapshot to the reports that existed when it was computed.
+Archived reports are included whenever the range needs them (see report_archive.py).
+Items are grouped and filtered by ``Report.item_id``; reports that are not
+linked to the library yet fall back to their ``item_name`` string. Categories
+work the same way through ``Report.category_id``. Results are keyed by the
+current item/category names.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from sqlalchemy import func, or_, and_, case
+from models import db
+from item_library import ids_for_name, names_for_ids
+import category_lookup
+import report_archive
+
+
+def _id_filters(model, after_id, max_id):
+    filters = []
+    if after_id is not None:
+        filters.append(model.id > after_id)
+    if max_id is not None:
+        filters.append(model.id <= max_id)
+    return filters
+
+
+def item_filter(model, item, item_ids=None):
+    """Reports of one item name: its library ids, plus unlinked reports matched by name."""
+    if item_ids is None:
+        item_ids = ids_for_name(item)
+    return or_(model.item_id.in_(item_ids), and_(model.item_id.is_(None), model.item_name == item))
+
+
+def _unlinked_name(model):
+    """item_name for reports without an item_id, NULL otherwise."""
+    return case((model.item_id.is_(None), model.item_name))
+
+
+def _category_key(model):
+    """Unlinked category name (NULL when category_id is set)."""
+    return case((model.category_id.is_(None), model.category))
+
+
+def items_by_name(counts):
+    """Re-key counts from item_id (or name, for unlinked reports) to item name."""
+    names = names_for_ids(key for key in counts if isinstance(key, int))
+    merged = {}
+    for key, count in counts.items():
+        name = names.get(key) if isinstance(key, int) else key
+        if name and name.strip():
+            merged[name] = merged.get(name, 0) + count
+    return merged
+
+
+def _gmt7_day(created_at):
+    return (created_at + timedelta(hours=7)).strftime('%Y-%m-%d')
+
+
+def summary_aggregates(start_utc, end_utc, item=None, after_id=None, max_id=None):
+    """Category, per-user, per-item and daily counts over all users in one pass."""
+    category_totals = defaultdict(int)
+    user_totals = defaultdict(int)
+    item_totals = defaultdict(int)
+    timeline = defaultdict(lambda: defaultdict(int))
+    item_ids = ids_for_name(item) if item else None
+    for model in report_archive.sources(start_utc):
+        query = db.session.query(
+            model.user_id, model.category_id, _category_key(model),
+            model.item_id, _unlinked_name(model), model.created_at
+        ).filter(model.created_at >= start_utc, model.created_at < end_utc)
+        if item:
+            query = query.filter(item_filter(model, item, item_ids))
+        query = query.filter(*_id_filters(model, after_id, max_id))
+        for user_id, category_id, category, item_id, item_name, created_at in query:
+            category = category_id if category_id is not None else category
+            category_totals[category] += 1
+            user_totals[user_id] += 1
+            if item_id is not None or item_name:
+                item_totals[item_id if item_id is not None else item_name] += 1
+            timeline[_gmt7_day(created_at)][category] += 1
+    return {
+        'category_counts': category_lookup.by_name(category_totals),
+        'user_counts': dict(user_totals),
+        'item_counts': items_by_name(item_totals),
+        'timeline': {day: category_lookup.by_name(cats) for day, cats in timeline.items()},
+    }
+
+
+def user_range_aggregates(user_id, start_utc, end_utc, item=None, after_id=None, max_id=None):
+    """Total, category counts and daily timeline for one user's reports in range."""
+    counts = defaultdict(int)
+    timeline = defaultdict(lambda: defaultdict(int))
+    total = 0
+    item_ids = ids_for_name(item) if item else None
+    for model in report_archive.sources(start_utc):
+        query = db.session.query(model.category_id, _category_key(model), model.created_at).filter(
+            model.user_id == user_id,
+            model.created_at >= start_utc,
+            model.created_at < end_utc
+        )
+        if item:
+            query = query.filter(item_filter(model, item, item_ids))
+        query = query.filter(*_id_filters(model, after_id, max_id))
+        for category_id, category, created_at in query:
+            category = category_id if category_id is not None else category
+            total += 1
+            counts[category] += 1
+            timeline[_gmt7_day(created_at)][category] += 1
+    return {
+        'total': total,
+        'category_counts': category_lookup.by_name(counts),
+        'timeline': {day: category_lookup.by_name(cats) for day, cats in timeline.items()},
+    }
+
+
+def user_item_aggregates(user_id, after_id=None, max_id=None):
+    """Recent items and all-time item contribution counts for one user."""
+    item_totals = {}
+    last_used = {}
+    for model in report_archive.sources():
+        unlinked = _unlinked_name(model)
+        query = db.session.query(
+            model.item_id, unlinked, func.count(model.id), func.max(model.created_at)
+        ).filter(
+            model.user_id == user_id,
+            or_(model.item_id.isnot(None), func.coalesce(model.item_name, '') != ''),
+            *_id_filters(model, after_id, max_id)
+        ).group_by(model.item_id, unlinked)
+        for item_id, item_name, count, created_at in query:
+            key = item_id if item_id is not None else item_name
+            item_totals[key] = item_totals.get(key, 0) + count
+            last_used[key] = max(last_used.get(key, created_at), created_at)
+
+    names = names_for_ids(key for key in item_totals if isinstance(key, int))
+    recent_items = []
+    for key in sorted(last_used, key=last_used.get, reverse=True):
+        name = names.get(key) if isinstance(key, int) else key
+        if name and name not in recent_items:
+            recent_items.append(name)
+        if len(recent_items) == 10:
+            break
+    counts = items_by_name(item_totals)
+    return {
+        'recent_items': recent_items,
+        'item_labels': list(counts.keys()),
+        'item_counts': list(counts.values()),
+    }
+
+
+def distinct_items():
+    """Sorted distinct item names across hot and archived reports (monitoring filter)."""
+    item_ids = set()
+    names = set()
+    for model in report_archive.sources():
+        item_ids.update(row[0] for row in db.session.query(model.item_id).filter(
+            model.item_id.isnot(None)
+        ).distinct())
+        names.update(row[0] for row in db.session.query(model.item_name).filter(
+            model.item_id.is_(None),
+            model.item_name.isnot(None),
+            model.item_name != ''
+        ).distinct())
+    names.update(names_for_ids(item_ids).values())
+    return sorted(names)
+
+
+def _add_counts(base, delta):
+    merged = dict(base)
+    for key, count in delta.items():
+        merged[key] = merged.get(key, 0) + count
+    return merged
+
+
+def _add_timeline(base, delta):
+    merged = {day: dict(cats) for day, cats in base.items()}
+    for day, cats in delta.items():
+        merged[day] = _add_counts(merged.get(day, {}), cats)
+    return merged
+
+
+def merge_summary(base, delta):
+    return {
+        'category_counts': _add_counts(base['category_counts'], delta['category_counts']),
+        'user_counts': _add_counts(base['user_counts'], delta['user_counts']),
+        'item_counts': _add_counts(base['item_counts'], delta['item_counts']),
+        'timeline': _add_timeline(base['timeline'], delta['timeline']),
+    }
+
+
+def merge_user_range(base, delta):
+    return {
+        'total': base['total'] + delta['total'],
+        'category_counts': _add_counts(base['category_counts'], delta['category_counts']),
+        'timeline': _add_timeline(base['timeline'], delta['timeline']),
+    }
+
+
+def merge_user_items(base, delta):
+    counts = _add_counts(
+        dict(zip(base['item_labels'], base['item_counts'])),
+        dict(zip(delta['item_labels'], delta['item_counts']))
+    )
+    recent = list(delta['recent_items'])
+    recent += [item for item in base['recent_items'] if item not in recent]
+    return {
+        'recent_items': recent[:10],
+        'item_labels': list(counts.keys()),
+        'item_counts': list(counts.values()),
+    }
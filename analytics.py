@@ -0,0 +1,355 @@
+"""Columnar analytics engine for the monitoring charts (optional, needs NumPy).
+
+The monitoring series are plain counts over (user, day, category, item). The
+engine loads those columns for every report once into compact NumPy arrays
+(users by id, categories and items integer-coded, days as GMT+7 day numbers)
+and answers each chart with ``bincount`` over a boolean mask instead of
+looping over rows. Results have the same shape as the functions in
+aggregates.py, which remain the fallback.
+
+New reports are appended from ``Report.id`` above the loaded high-water mark
+when the 'reports' data version changes. Edits, deletes, renames and
+anything else that goes through snapshots.invalidate() bump the 'analytics'
+version and force a full reload.
+
+With ANALYTICS_SNAPSHOT_DIR set, a full load is also written there as .npy
+files. Other worker processes map those files (``mmap_mode='r'``) instead of
+querying, so they share one copy through the page cache. Invalidation removes
+the snapshot.
+
+Day ranges are whole GMT+7 days: ``start_utc``/``end_utc`` must fall on local
+midnights, as they do for every monitoring view.
+"""
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import select, case
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+import category_lookup
+import report_archive
+from aggregates import items_by_name
+from cache import cache
+from item_library import ids_for_name
+from models import db, Report
+
+COLUMNS = ('ids', 'users', 'days', 'categories', 'items')
+DTYPES = {'ids': 'int64', 'users': 'int32', 'days': 'int32', 'categories': 'int32', 'items': 'int32'}
+CHUNK_SIZE = 50000
+META_FILE = 'meta.json'
+NO_ITEM = 0  # item code of reports without an item
+EPOCH = datetime(1970, 1, 1)
+
+
+def _day_number(utc):
+    """GMT+7 day number (days since 1970-01-01) of a UTC datetime."""
+    return (utc + timedelta(hours=7) - EPOCH).days
+
+
+class Codes:
+    """Integer codes for category/item keys (an id, or the name of an unlinked report)."""
+
+    def __init__(self, keys=()):
+        self.keys = list(keys)
+        self.index = {key: code for code, key in enumerate(self.keys)}
+
+    def code(self, key):
+        code = self.index.get(key)
+        if code is None:
+            code = self.index[key] = len(self.keys)
+            self.keys.append(key)
+        return code
+
+
+class ReportColumns:
+    """Report columns as a list of array parts (a loaded or mapped base, then appended rows)."""
+
+    def __init__(self, parts, categories, items, max_id):
+        self.parts = parts
+        self.categories = categories
+        self.items = items
+        self.max_id = max_id
+
+    def __len__(self):
+        return sum(len(part['ids']) for part in self.parts)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for part in self.parts for array in part.values())
+
+
+def _select(model, min_id=None):
+    statement = select(
+        model.id, model.user_id,
+        model.category_id, case((model.category_id.is_(None), model.category)),
+        model.item_id, case((model.item_id.is_(None), model.item_name)),
+        model.created_at
+    )
+    if min_id is not None:
+        statement = statement.where(model.id > min_id)
+    return statement.order_by(model.id)
+
+
+def _encode(rows, categories, items):
+    """Arrays for a chunk of _select() rows, coding new keys on the way."""
+    count = len(rows)
+    ids = np.empty(count, dtype=DTYPES['ids'])
+    users = np.empty(count, dtype=DTYPES['users'])
+    category_codes = np.empty(count, dtype=DTYPES['categories'])
+    item_codes = np.empty(count, dtype=DTYPES['items'])
+    created = []
+    category_code, item_code = categories.code, items.code
+    for i, (report_id, user_id, category_id, category, item_id, item_name, created_at) in enumerate(rows):
+        ids[i] = report_id
+        users[i] = user_id
+        category_codes[i] = category_code(category_id if category_id is not None else category)
+        if item_id is not None:
+            item_codes[i] = item_code(item_id)
+        elif item_name:
+            item_codes[i] = item_code(item_name)
+        else:
+            item_codes[i] = NO_ITEM
+        created.append(created_at)
+    local = np.array(created, dtype='datetime64[s]') + np.timedelta64(7, 'h')
+    days = local.astype('datetime64[D]').astype(DTYPES['days'])
+    return {'ids': ids, 'users': users, 'days': days, 'categories': category_codes, 'items': item_codes}
+
+
+def _concat(chunks):
+    if not chunks:
+        return {name: np.empty(0, dtype=DTYPES[name]) for name in COLUMNS}
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in COLUMNS}
+
+
+def load_columns(categories=None, items=None, min_id=None, models=None):
+    """Read reports (all tables, or ids above ``min_id`` in Report) into one array part."""
+    categories = categories or Codes()
+    items = items or Codes([None])
+    chunks = []
+    for model in models or (report_archive.sources() if min_id is None else [Report]):
+        result = db.session.execute(_select(model, min_id).execution_options(yield_per=CHUNK_SIZE))
+        for rows in result.partitions(CHUNK_SIZE):
+            chunks.append(_encode(rows, categories, items))
+    part = _concat(chunks)
+    max_id = int(part['ids'].max()) if len(part['ids']) else (min_id or 0)
+    return part, categories, items, max_id
+
+
+class ColumnarEngine:
+    def __init__(self):
+        self.enabled = False
+        self.snapshot_dir = None
+        self.columns = None
+        self._versions = None
+        self._snapshot_token = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = bool(app.config.get('ANALYTICS_ENGINE')) and np is not None
+        if app.config.get('ANALYTICS_ENGINE') and np is None:
+            app.logger.warning('ANALYTICS_ENGINE is set but NumPy is not installed; using SQL aggregates')
+        self.snapshot_dir = app.config.get('ANALYTICS_SNAPSHOT_DIR') or None
+        app.extensions['analytics'] = self
+
+    # --- snapshots ---
+
+    def _meta_path(self):
+        return os.path.join(self.snapshot_dir, META_FILE)
+
+    def _token(self):
+        """Identity of the snapshot on disk (None when there is none)."""
+        try:
+            stat = os.stat(self._meta_path())
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def save_snapshot(self, columns):
+        """Write ``columns`` (a single part) as .npy files plus meta.json, atomically per file."""
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        part = columns.parts[0]
+        for name in COLUMNS:
+            path = os.path.join(self.snapshot_dir, f'{name}.npy')
+            tmp = f'{path}.{os.getpid()}.tmp'
+            with open(tmp, 'wb') as f:
+                np.save(f, part[name])
+            os.replace(tmp, path)
+        meta = {'max_id': columns.max_id, 'rows': len(part['ids']),
+                'categories': columns.categories.keys, 'items': columns.items.keys}
+        tmp = f'{self._meta_path()}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        # meta.json last: readers only trust arrays it describes
+        os.replace(tmp, self._meta_path())
+
+    def _map_snapshot(self):
+        try:
+            with open(self._meta_path()) as f:
+                meta = json.load(f)
+            part = {name: np.load(os.path.join(self.snapshot_dir, f'{name}.npy'), mmap_mode='r')
+                    for name in COLUMNS}
+        except (OSError, ValueError):
+            return None
+        if any(len(array) != meta['rows'] for array in part.values()):
+            return None  # written by a concurrent save; reload from the database
+        return ReportColumns([part], Codes(meta['categories']), Codes(meta['items']), meta['max_id'])
+
+    def refresh_snapshot(self):
+        """Rewrite the snapshot from the database (run periodically to fold in appended rows)."""
+        part, categories, items, max_id = load_columns()
+        self.save_snapshot(ReportColumns([part], categories, items, max_id))
+        return len(part['ids'])
+
+    def remove_snapshot(self):
+        if self.snapshot_dir:
+            try:
+                os.remove(self._meta_path())
+            except OSError:
+                pass
+
+    # --- loading ---
+
+    def _full_load(self):
+        if self.snapshot_dir:
+            columns = self._map_snapshot()
+            if columns is not None:
+                return columns
+        part, categories, items, max_id = load_columns()
+        columns = ReportColumns([part], categories, items, max_id)
+        if self.snapshot_dir:
+            self.save_snapshot(columns)
+        return columns
+
+    def get_columns(self):
+        """Current columns, reloaded or topped up as the data versions require."""
+        with self._lock:
+            versions = (cache.version('analytics'), cache.version('history'))
+            token = self._token() if self.snapshot_dir else None
+            stale = (self.columns is None or versions != self._versions[:2]
+                     or (self.snapshot_dir and token != self._snapshot_token))
+            if stale:
+                self.columns = self._full_load()
+                self._snapshot_token = self._token() if self.snapshot_dir else None
+            # A mapped snapshot may predate the newest reports, so top it up too
+            if stale or cache.version('reports') != self._versions[2]:
+                columns = self.columns
+                part, _, _, max_id = load_columns(columns.categories, columns.items, min_id=columns.max_id)
+                if len(part['ids']):
+                    if len(columns.parts) == 1:
+                        columns.parts.append(part)
+                    else:
+                        columns.parts[1] = _concat([columns.parts[1], part])
+                    columns.max_id = max_id
+            self._versions = versions + (cache.version('reports'),)
+            return self.columns
+
+    def invalidate(self):
+        """Drop loaded columns in every process (see snapshots.invalidate)."""
+        if not self.enabled:
+            return
+        self.remove_snapshot()
+        cache.bump('analytics')
+
+    # --- queries ---
+
+    def _item_matches(self, columns, item):
+        """Boolean lookup over item codes: True for codes of ``item``."""
+        wanted = set(ids_for_name(item))
+        wanted.add(item)
+        return np.array([key in wanted for key in columns.items.keys], dtype=bool)
+
+    def _masked(self, columns, start_utc, end_utc, item=None, user_id=None):
+        """(part, mask) for each array part, restricted to the range and filters."""
+        first_day, end_day = _day_number(start_utc), _day_number(end_utc)
+        matches = self._item_matches(columns, item) if item else None
+        for part in columns.parts:
+            days = part['days']
+            mask = (days >= first_day) & (days < end_day)
+            if user_id is not None:
+                mask &= part['users'] == user_id
+            if matches is not None:
+                mask &= matches[part['items']]
+            yield part, mask
+
+    def _timeline(self, timeline, first_day, category_keys):
+        """{'YYYY-MM-DD': {category key: count}} from a (days, categories) count matrix."""
+        result = {}
+        for offset, day_counts in enumerate(timeline):
+            nonzero = np.flatnonzero(day_counts)
+            if len(nonzero):
+                day = (EPOCH + timedelta(days=first_day + offset)).strftime('%Y-%m-%d')
+                result[day] = category_lookup.by_name(
+                    {category_keys[code]: int(day_counts[code]) for code in nonzero}
+                )
+        return result
+
+    def summary_aggregates(self, start_utc, end_utc, item=None):
+        """Same result as aggregates.summary_aggregates."""
+        columns = self.get_columns()
+        category_count, item_count = len(columns.categories.keys), len(columns.items.keys)
+        first_day = _day_number(start_utc)
+        day_count = max(_day_number(end_utc) - first_day, 0)
+        categories = np.zeros(category_count, dtype='int64')
+        items = np.zeros(item_count, dtype='int64')
+        timeline = np.zeros(day_count * category_count, dtype='int64')
+        users = {}
+        for part, mask in self._masked(columns, start_utc, end_utc, item):
+            part_categories = part['categories'][mask]
+            categories += np.bincount(part_categories, minlength=category_count)
+            items += np.bincount(part['items'][mask], minlength=item_count)
+            timeline += np.bincount((part['days'][mask] - first_day) * category_count + part_categories,
+                                    minlength=day_count * category_count)
+            user_counts = np.bincount(part['users'][mask])
+            for user_id in np.flatnonzero(user_counts):
+                users[int(user_id)] = users.get(int(user_id), 0) + int(user_counts[user_id])
+        category_keys, item_keys = columns.categories.keys, columns.items.keys
+        return {
+            'category_counts': category_lookup.by_name(
+                {category_keys[code]: int(categories[code]) for code in np.flatnonzero(categories)}
+            ),
+            'user_counts': users,
+            'item_counts': items_by_name(
+                {item_keys[code]: int(items[code]) for code in np.flatnonzero(items) if code != NO_ITEM}
+            ),
+            'timeline': self._timeline(timeline.reshape(day_count, category_count), first_day, category_keys),
+        }
+
+    def user_range_aggregates(self, user_id, start_utc, end_utc, item=None):
+        """Same result as aggregates.user_range_aggregates."""
+        columns = self.get_columns()
+        category_count = len(columns.categories.keys)
+        first_day = _day_number(start_utc)
+        day_count = max(_day_number(end_utc) - first_day, 0)
+        categories = np.zeros(category_count, dtype='int64')
+        timeline = np.zeros(day_count * category_count, dtype='int64')
+        for part, mask in self._masked(columns, start_utc, end_utc, item, user_id=user_id):
+            part_categories = part['categories'][mask]
+            categories += np.bincount(part_categories, minlength=category_count)
+            timeline += np.bincount((part['days'][mask] - first_day) * category_count + part_categories,
+                                    minlength=day_count * category_count)
+        category_keys = columns.categories.keys
+        return {
+            'total': int(categories.sum()),
+            'category_counts': category_lookup.by_name(
+                {category_keys[code]: int(categories[code]) for code in np.flatnonzero(categories)}
+            ),
+            'timeline': self._timeline(timeline.reshape(day_count, category_count), first_day, category_keys),
+        }
+
+    def stats(self):
+        columns = self.columns
+        return {
+            'enabled': self.enabled,
+            'rows': len(columns) if columns else 0,
+            'bytes': columns.nbytes if columns else 0,
+            'parts': len(columns.parts) if columns else 0,
+            'mapped': bool(columns) and isinstance(columns.parts[0]['ids'], np.memmap),
+        }
+
+
+engine = ColumnarEngine()
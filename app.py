@@ -1,12 +1,32 @@
-from flask import Flask, render_template, redirect, url_for, flash, request, jsonify, send_from_directory, Response, stream_with_context
+from flask import Flask, render_template, redirect, url_for, flash, request, jsonify, send_from_directory, Response, stream_with_context, abort, make_response
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
 from forms import LoginForm, RegisterForm, ReportForm, SettingsForm, AdminEditUserForm
-from models import db, User, Report, ReportTemplate, Category, AuditLog, ItemLibrary
+from models import db, User, Report, ReportArchive, ReportTemplate, Category, AuditLog, ItemLibrary
+from cache import cache
+from admission import admission
+from passwords import hasher, HashingBusy
+import aggregates
+import snapshots
+import analytics
+from pagination import keyset_page, page_size
+from audit import audit_page
+import report_archive
+import report_query
+import report_import
+import pivot
+import drilldown
+import category_lookup
+import serialization
+import fragment_cache
+from fragment_cache import Lazy
+import item_library
+import item_popularity
+from item_library import insert_ignore, resolve_item_id
 from datetime import datetime, timedelta
 from werkzeug.utils import secure_filename
 import os
+import tempfile
 import time
 import json
 from sqlalchemy import text
@@ -15,6 +35,7 @@ import openpyxl
 
 def create_app():
     app = Flask(__name__, template_folder='templates', static_folder='static')
+    serialization.init_app(app)
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'change-me-for-production')
     
     # Check if DATABASE_URL is set (for Neon PostgreSQL)
@@ -44,7 +65,59 @@ def create_app():
         'max_overflow': 30
     }
 
+    # Result cache for monitoring aggregates; set RESULT_CACHE_STORE to a file path
+    # (e.g. instance/result_cache.db) to share results between worker processes.
+    # The store also holds the data versions, so with WAITRESS_WORKERS > 1 it defaults
+    # to the instance folder: otherwise a write in one worker would not invalidate the others
+    app.config['RESULT_CACHE_ENABLED'] = os.getenv('RESULT_CACHE_ENABLED', '1') == '1'
+    app.config['RESULT_CACHE_MAX_BYTES'] = int(os.getenv('RESULT_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+    multi_process = int(os.getenv('WAITRESS_WORKERS', '1')) > 1
+    default_store = os.path.join(app.instance_path, 'result_cache.db') if multi_process else ''
+    app.config['RESULT_CACHE_STORE'] = os.getenv('RESULT_CACHE_STORE') or default_store
+
+    # Audit log entries older than this are moved to audit_log_archive by archive_audit_log.py
+    app.config['AUDIT_LOG_RETENTION_DAYS'] = int(os.getenv('AUDIT_LOG_RETENTION_DAYS', '90'))
+
+    # Minutes between in-process snapshot precomputes (0 = off, use precompute_snapshots.py from cron)
+    app.config['SNAPSHOT_INTERVAL_MINUTES'] = int(os.getenv('SNAPSHOT_INTERVAL_MINUTES', '0'))
+
+    # Columnar (NumPy) engine for the monitoring charts; the snapshot dir lets
+    # worker processes share one memory-mapped copy of the arrays
+    app.config['ANALYTICS_ENGINE'] = os.getenv('ANALYTICS_ENGINE', '0') == '1'
+    app.config['ANALYTICS_SNAPSHOT_DIR'] = os.getenv('ANALYTICS_SNAPSHOT_DIR', '')
+
+    # Password hashing: werkzeug method for new/upgraded hashes, and the bounded
+    # verification pool (keep the queue limit below the server's thread count)
+    app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+    app.config['PASSWORD_HASH_QUEUE_LIMIT'] = int(os.getenv('PASSWORD_HASH_QUEUE_LIMIT', '8'))
+    app.config['PASSWORD_HASH_TIMEOUT'] = float(os.getenv('PASSWORD_HASH_TIMEOUT', '10'))
+    app.config['PASSWORD_HASH_RETRY_AFTER'] = int(os.getenv('PASSWORD_HASH_RETRY_AFTER', '5'))
+
+    # {% cache %} template fragments (stored in the result cache) and compiled-template cache
+    app.config['FRAGMENT_CACHE_ENABLED'] = os.getenv('FRAGMENT_CACHE_ENABLED', '1') == '1'
+    default_bytecode_dir = '/tmp/jinja_cache' if os.getenv('VERCEL') else os.path.join(app.instance_path, 'jinja_cache')
+    app.config['TEMPLATE_BYTECODE_CACHE_DIR'] = os.getenv('TEMPLATE_BYTECODE_CACHE_DIR', default_bytecode_dir)
+
+    # Output of generate_digests.py, served to admins under /digests/
+    default_digest_dir = '/tmp/digests' if os.getenv('VERCEL') else os.path.join(app.instance_path, 'digests')
+    app.config['DIGEST_DIR'] = os.getenv('DIGEST_DIR') or default_digest_dir
+
+    # Admission control (see admission.py): capacity is the server's thread count and
+    # the reserved threads stay free for logins and report submissions
+    app.config['ADMISSION_CONTROL'] = os.getenv('ADMISSION_CONTROL', '1') == '1'
+    app.config['ADMISSION_CAPACITY'] = int(os.getenv('ADMISSION_CAPACITY') or os.getenv('WAITRESS_THREADS', '16'))
+    app.config['ADMISSION_RESERVED'] = int(os.getenv('ADMISSION_RESERVED', '4'))
+    app.config['ADMISSION_LIMITS'] = os.getenv('ADMISSION_LIMITS', '')
+    app.config['ADMISSION_ROUTES'] = os.getenv('ADMISSION_ROUTES', '')
+    app.config['ADMISSION_RETRY_AFTER'] = int(os.getenv('ADMISSION_RETRY_AFTER', '5'))
+
     db.init_app(app)
+    cache.init_app(app)
+    hasher.init_app(app)
+    fragment_cache.init_app(app)
+    analytics.engine.init_app(app)
+    admission.init_app(app)
     
     # Initialize database tables and create default data
     try:
@@ -99,24 +172,35 @@ def create_app():
                 
                 db.session.commit()
                 app.logger.info("Default users and categories created successfully!")
+
+            # Databases created before the unique item index refuse item inserts until migrated
+            if not item_library.has_unique_index():
+                app.logger.error(f"item_library has no {item_library.UNIQUE_INDEX} index; "
+                                 "run migrate_item_library_unique.py")
     except Exception as e:
         app.logger.error(f"Database initialization error: {e}")
         # Continue anyway - will fail on first database access but at least app loads
 
+    if app.config['SNAPSHOT_INTERVAL_MINUTES'] > 0:
+        snapshots.start_scheduler(app, app.config['SNAPSHOT_INTERVAL_MINUTES'])
+
     login_manager = LoginManager()
     login_manager.login_view = 'login'
     login_manager.init_app(app)
 
+    def audit_entry(user_id, action, detail='', actor_id=None):
+        """Audit log row for the caller to add to its own transaction."""
+        return AuditLog(
+            user_id=user_id,
+            actor_id=actor_id if actor_id is not None else user_id,
+            action=action,
+            detail=detail
+        )
+
     def log_action(user_id, action, detail='', actor_id=None):
         """Persist audit log without blocking main flow."""
         try:
-            entry = AuditLog(
-                user_id=user_id,
-                actor_id=actor_id if actor_id is not None else user_id,
-                action=action,
-                detail=detail
-            )
-            db.session.add(entry)
+            db.session.add(audit_entry(user_id, action, detail, actor_id))
             db.session.commit()
         except Exception as exc:
             db.session.rollback()
@@ -129,6 +213,11 @@ def create_app():
             return utc_datetime + timedelta(hours=7)
         return utc_datetime
     
+    @app.template_filter('category_name')
+    def category_name_filter(report):
+        """Current name of a report's category (follows renames)."""
+        return category_lookup.display_name(report.category_id, report.category)
+
     # Jinja2 filter for strftime
     @app.template_filter('strftime')
     def strftime_filter(date, fmt):
@@ -176,6 +265,7 @@ def create_app():
             user.set_password(form.password.data)
             db.session.add(user)
             db.session.commit()
+            cache.bump('users')
             flash('Registration successful. Please login.', 'success')
             return redirect(url_for('login'))
         return render_template('register.html', form=form)
@@ -185,7 +275,17 @@ def create_app():
         form = LoginForm()
         if form.validate_on_submit():
             user = User.query.filter_by(employee_id=form.employee_id.data).first()
-            if user and user.check_password(form.password.data):
+            try:
+                ok, new_hash = hasher.verify(user.password_hash, form.password.data) if user else (False, None)
+            except HashingBusy as busy:
+                flash('Server is busy, please try again in a few seconds.', 'warning')
+                response = make_response(render_template('login.html', form=form), 503)
+                response.headers['Retry-After'] = str(busy.retry_after)
+                return response
+            if ok:
+                if new_hash:
+                    # Upgrade to the configured hash parameters; committed with the audit entry below
+                    user.password_hash = new_hash
                 login_user(user)
                 log_action(user.id, 'login', detail=f"IP {request.remote_addr or '-'}")
                 flash('Logged in successfully.', 'success')
@@ -205,7 +305,9 @@ def create_app():
     @login_required
     def dashboard():
         # Get all reports (no date filter - frontend will handle filtering by selected date)
-        reports = Report.query.filter_by(user_id=current_user.id).order_by(Report.time.desc()).all()
+        # List columns only; full notes are fetched from /api/report/<id> when a report is opened
+        reports = report_query.rows({'user_id': current_user.id}, report_query.LIST_FIELDS)
+        reports.sort(key=lambda r: (r.time or '', r.created_at), reverse=True)
         
         templates = ReportTemplate.query.filter_by(user_id=current_user.id).order_by(ReportTemplate.created_at.desc()).all()
         categories = Category.query.filter_by(is_active=True).order_by(Category.name).all()
@@ -216,18 +318,23 @@ def create_app():
         last_report = reports[0] if reports else None
         
         # Calculate category counts
-        category_counts = {}
-        for category in categories:
-            count = Report.query.filter_by(user_id=current_user.id, category=category.name).count()
-            category_counts[category.name] = count
-        
-        # Convert reports to JSON-serializable format for calendar (with GMT+7)
-        reports_json = [{
-            'id': r.id,
-            'created_at': (r.created_at + timedelta(hours=7)).strftime('%Y-%m-%d %H:%M:%S'),
-            'category': r.category,
-            'title': r.title
-        } for r in reports]
+        category_counts = {category.name: 0 for category in categories}
+        id_counts = {}
+        for r in reports:
+            key = r.category_id if r.category_id is not None else r.category
+            id_counts[key] = id_counts.get(key, 0) + 1
+        for name, count in category_lookup.by_name(id_counts).items():
+            if name in category_counts:
+                category_counts[name] += count
+        
+        # Calendar data (GMT+7) in columnar form, decoded by static/columnar.js
+        reports_json = serialization.columnar((
+            (r.id,
+             (r.created_at + timedelta(hours=7)).strftime('%Y-%m-%d %H:%M:%S'),
+             category_lookup.display_name(r.category_id, r.category),
+             r.title)
+            for r in reports
+        ), ('id', 'created_at', 'category', 'title'))
         
         return render_template(
             'dashboard.html',
@@ -259,50 +366,38 @@ def create_app():
                 if not time or not category or not title:
                     return {'success': False, 'message': 'Time, category, and title are required'}, 400
                 
-                # Auto-save to ItemLibrary if item_name is provided
-                # Check for unique combination of item_name + part_number + customer
-                if item_name:
-                    existing_item = ItemLibrary.query.filter_by(
-                        item_name=item_name,
-                        part_number=part_number,
-                        customer=customer
-                    ).first()
-                    
-                    if not existing_item:
-                        new_item = ItemLibrary(
-                            item_name=item_name,
-                            part_number=part_number,
-                            customer=customer
-                        )
-                        db.session.add(new_item)
-                        # Commit immediately to make it available for next autocomplete
-                        db.session.flush()
+                # One transaction: item upsert, report and audit row
+                # Auto-save to ItemLibrary if item_name is provided and link the report to it
+                item_id = resolve_item_id(item_name, part_number, customer)
                 
                 r = Report(
                     user_id=current_user.id,
                     time=time,
                     category=category,
+                    category_id=category_lookup.category_id(category),
                     title=title,
                     notes=notes,
                     item_name=item_name,
                     part_number=part_number,
                     customer=customer,
+                    item_id=item_id,
                 )
                 db.session.add(r)
+                db.session.flush()  # assigns r.id for the audit detail
+                # Read before commit expires them, which would cost a reload query
+                report_id, user_id, created_at = r.id, r.user_id, r.created_at
+                db.session.add(audit_entry(user_id, 'report_created', f"Report #{report_id}: {title}"))
                 db.session.commit()
-                log_action(current_user.id, 'report_created', detail=f"Report #{r.id}: {title}")
-                
-                # Get category color
-                cat = Category.query.filter_by(name=category).first()
-                category_color = cat.color if cat else 'secondary'
+                cache.bump('reports')
+                item_popularity.record(user_id, item_id, created_at, report_id)
                 
                 return {
                     'success': True,
                     'message': 'Report saved successfully',
-                    'report_id': r.id,
+                    'report_id': report_id,
                     'time': time,
                     'category': category,
-                    'category_color': category_color,
+                    'category_color': category_lookup.color(category),
                     'title': title,
                     'notes': notes,
                     'item_name': item_name or '',
@@ -317,7 +412,9 @@ def create_app():
     @login_required
     def edit_report(report_id):
         from datetime import datetime, timedelta
-        report = Report.query.get_or_404(report_id)
+        report = report_archive.find(report_id)
+        if report is None:
+            abort(404)
         
         # Check ownership
         if report.user_id != current_user.id:
@@ -339,12 +436,17 @@ def create_app():
                 try:
                     report.time = request.form.get('time', report.time)
                     report.category = request.form.get('category', report.category)
+                    report.category_id = category_lookup.category_id(report.category)
                     report.title = request.form.get('title', report.title)
-                    report.notes = request.form.get('notes', report.notes)
+                    if 'notes' in request.form:
+                        report.notes = request.form['notes']
                     report.item_name = request.form.get('item_name') or None
                     report.part_number = request.form.get('part_number') or None
                     report.customer = request.form.get('customer') or None
+                    report.item_id = resolve_item_id(report.item_name, report.part_number, report.customer)
+                    snapshots.invalidate(report.id)
                     db.session.commit()
+                    cache.bump('reports')
                     log_action(report.user_id, 'report_edited', detail=f"Report #{report.id}", actor_id=current_user.id)
                     return {'success': True, 'message': 'Report updated successfully'}
                 except Exception as e:
@@ -356,66 +458,219 @@ def create_app():
     @login_required
     def get_report_detail(report_id):
         """Get detailed information about a specific report."""
-        report = Report.query.get_or_404(report_id)
-        
-        # Calculate if report is editable (within 2 days and owned by current user)
-        from datetime import datetime
-        days_old = (datetime.utcnow() - report.created_at).days
-        is_editable = (days_old < 2 and report.user_id == current_user.id)
-        
-        return jsonify({
-            'success': True,
-            'report': {
-                'id': report.id,
-                'time': report.time,
-                'category': report.category,
-                'title': report.title,
-                'notes': report.notes,
-                'item_name': report.item_name,
-                'part_number': report.part_number,
-                'customer': report.customer,
-                'user_name': report.user.name,
-                'user_employee_id': report.user.employee_id,
-                'created_at': report.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'is_editable': is_editable
-            }
+        report = report_archive.find_detail(report_id)
+        if report is None:
+            abort(404)
+        return jsonify(report_archive.detail_payload(report, current_user.id))
+
+    @app.route('/api/reports')
+    @login_required
+    def api_reports():
+        """Filtered reports, newest first, keyset-paginated, in columnar form.
+
+        Filters: user_id, department, category, item, customer, part_number,
+        start_date / end_date (GMT+7 days), q (title or item prefix).
+        ``fields`` selects the columns (see report_query.FIELDS).
+        Non-admins only see their own reports.
+        """
+        try:
+            fields = report_query.parse_fields(request.args.get('fields'))
+            filters = report_query.parse_filters(request.args)
+            if not current_user.is_admin:
+                filters['user_id'] = current_user.id
+            rows, next_cursor = report_query.page(
+                filters, fields, cursor=request.args.get('cursor'),
+                limit=page_size(request.args.get('limit'))
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+
+        if 'created_at' in fields:
+            position = fields.index('created_at')
+            rows = [row[:position] + (row[position].strftime('%Y-%m-%d %H:%M:%S'),) + row[position + 1:]
+                    for row in rows]
+        payload = serialization.columnar(rows, fields)
+        payload.update(success=True, next_cursor=next_cursor)
+        return jsonify(payload)
+
+    @app.route('/monitoring/export.xlsx')
+    @login_required
+    def monitoring_export():
+        """Monitoring numbers as an Excel workbook (same query parameters as /monitoring).
+
+        Written with openpyxl in write-only mode (rows go straight to temporary
+        XML parts) into a temporary file that is streamed back in chunks.
+        """
+        if not current_user.is_admin:
+            flash('Access denied. Admin only.', 'danger')
+            return redirect(url_for('dashboard'))
+
+        import tempfile
+        from openpyxl import Workbook
+
+        categories = [c.name for c in Category.query.filter_by(is_active=True).order_by(Category.name)]
+        filter_item = request.args.get('filter_item') or None
+        all_start_date, all_end_date = local_date_range(
+            request.args.get('all_start_date'), request.args.get('all_end_date')
+        )
+        summary = monitoring_summary(all_start_date, all_end_date, filter_item)
+
+        def write_timeline(sheet, timeline, start_date, end_date):
+            sheet.append(['Date'] + categories + ['Total'])
+            day = start_date
+            while day <= end_date:
+                counts = timeline.get(day.strftime('%Y-%m-%d'), {})
+                row = [counts.get(name, 0) for name in categories]
+                sheet.append([day.strftime('%Y-%m-%d')] + row + [sum(counts.values())])
+                day += timedelta(days=1)
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Summary')
+        sheet.append(['Period', f'{all_start_date:%Y-%m-%d} to {all_end_date:%Y-%m-%d} (GMT+7)'])
+        sheet.append(['Item filter', filter_item or 'All items'])
+        sheet.append([])
+        sheet.append(['Category', 'Reports'])
+        for name in categories:
+            sheet.append([name, summary['category_counts'].get(name, 0)])
+
+        sheet = workbook.create_sheet('Users')
+        sheet.append(['Employee ID', 'Name', 'Department', 'Section', 'Shift', 'Reports'])
+        users = db.session.query(User.id, User.employee_id, User.name, User.department, User.section, User.shift)
+        for user_id, employee_id, name, department, section, shift in sorted(
+                users, key=lambda u: summary['user_counts'].get(u[0], 0), reverse=True):
+            sheet.append([employee_id, name, department, section, shift, summary['user_counts'].get(user_id, 0)])
+
+        sheet = workbook.create_sheet('Items')
+        sheet.append(['Item', 'Reports'])
+        for name, count in sorted(summary['item_counts'].items(), key=lambda x: x[1], reverse=True):
+            sheet.append([name, count])
+
+        write_timeline(workbook.create_sheet('Timeline'), summary['timeline'], all_start_date, all_end_date)
+
+        selected_user_id = request.args.get('user_id', type=int)
+        selected_user = db.session.get(User, selected_user_id) if selected_user_id else None
+        if selected_user is not None:
+            item_filter = request.args.get('item') or None
+            start_date, end_date = local_date_range(request.args.get('start_date'), request.args.get('end_date'))
+            stats = user_range_stats(selected_user.id, start_date, end_date, item_filter)
+            sheet = workbook.create_sheet('User')
+            sheet.append(['User', f'{selected_user.name} ({selected_user.employee_id})'])
+            sheet.append(['Period', f'{start_date:%Y-%m-%d} to {end_date:%Y-%m-%d} (GMT+7)'])
+            sheet.append(['Item filter', item_filter or 'All items'])
+            sheet.append(['Total reports', stats['total']])
+            sheet.append([])
+            sheet.append(['Category', 'Reports'])
+            for name in categories:
+                sheet.append([name, stats['category_counts'].get(name, 0)])
+            write_timeline(workbook.create_sheet('User Timeline'), stats['timeline'], start_date, end_date)
+
+        output = tempfile.TemporaryFile()
+        workbook.save(output)
+        size = output.tell()
+        output.seek(0)
+
+        def generate():
+            with output:
+                while True:
+                    chunk = output.read(64 * 1024)
+                    if not chunk:
+                        break
+                    yield chunk
+
+        filename = f'monitoring_{all_start_date:%Y%m%d}_{all_end_date:%Y%m%d}.xlsx'
+        return Response(generate(), headers={
+            'Content-Type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'Content-Length': str(size),
         })
 
+    @app.route('/api/monitoring/pivot')
+    @login_required
+    def api_monitoring_pivot():
+        """Report counts cross-tabulated over two dimensions (see pivot.DIMENSIONS).
+
+        Takes ``rows``, ``columns``, ``top`` and the /api/reports filters;
+        the date range defaults to the last 30 days (GMT+7).
+        """
+        if not current_user.is_admin:
+            return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+
+        row_dimension = request.args.get('rows', 'customer')
+        column_dimension = request.args.get('columns', 'month')
+        if row_dimension not in pivot.DIMENSIONS or column_dimension not in pivot.DIMENSIONS:
+            return jsonify({'success': False, 'message': f"Dimensions: {', '.join(pivot.DIMENSIONS)}"}), 400
+        if row_dimension == column_dimension:
+            return jsonify({'success': False, 'message': 'Choose two different dimensions'}), 400
+        try:
+            top = max(1, min(int(request.args.get('top', pivot.DEFAULT_TOP)), pivot.MAX_TOP))
+            filters = report_query.parse_filters(request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+
+        today = (datetime.utcnow() + timedelta(hours=7)).date()
+        filters.setdefault('end_date', today)
+        filters.setdefault('start_date', filters['end_date'] - timedelta(days=29))
+        start_utc, end_utc = report_query.utc_range(filters)
+
+        # Dates are in the key through start/end; other filters and user data go in the view name
+        extra = [f'{name}={value}' for name, value in sorted(filters.items())
+                 if name not in ('start_date', 'end_date', 'item')]
+        view = '|'.join(['pivot', row_dimension, column_dimension, str(top), f"u{cache.version('users')}"] + extra)
+        result = cache.get_or_compute(
+            view, lambda: pivot.pivot(row_dimension, column_dimension, filters, top=top),
+            start_utc=start_utc, end_utc=end_utc, item=filters.get('item')
+        )
+        return jsonify(dict(result, success=True))
+
+    @app.route('/api/monitoring/drilldown')
+    @login_required
+    def api_monitoring_drilldown():
+        """One level of the department → section → user drill-down.
+
+        ``level`` is department, section or user; ``department`` / ``section``
+        select the expanded parent. Takes start_date, end_date (GMT+7 shift
+        days, default the last 30) and item like the summary.
+        """
+        if not current_user.is_admin:
+            return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+
+        level = request.args.get('level', 'department')
+        if level not in drilldown.LEVELS:
+            return jsonify({'success': False, 'message': f"Levels: {', '.join(drilldown.LEVELS)}"}), 400
+        department = request.args.get('department') if level != 'department' else None
+        section = request.args.get('section') if level == 'user' else None
+        try:
+            filters = report_query.parse_filters(request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        end_date = filters.get('end_date') or (datetime.utcnow() + timedelta(hours=7)).date()
+        start_date = filters.get('start_date') or end_date - timedelta(days=29)
+        item = filters.get('item')
+
+        start_utc, end_utc = drilldown.utc_bounds(start_date, end_date)
+        parent = [f'd={department}'] if department is not None else []
+        parent += [f's={section}'] if section is not None else []
+        view = '|'.join(['drilldown', level, f"u{cache.version('users')}"] + parent)
+        nodes = cache.get_or_compute(
+            view, lambda: drilldown.drilldown(level, start_date, end_date, department, section, item),
+            start_utc=start_utc, end_utc=end_utc, item=item
+        )
+        return jsonify({'success': True, 'level': level, 'nodes': nodes})
+
     @app.route('/api/items/search')
     @login_required
     def search_items():
-        """Return item suggestions from ItemLibrary with part/customer for auto-fill."""
+        """Return item suggestions with part/customer for auto-fill, most used by this user first."""
         query = request.args.get('q', '').strip()
-        if not query:
-            # Return all items if no query (for dropdown)
-            items = ItemLibrary.query.order_by(ItemLibrary.item_name).limit(50).all()
-            return jsonify([{
-                'item_name': item.item_name,
-                'part_number': item.part_number or '',
-                'customer': item.customer or '',
-                'display': f"{item.item_name} | {item.part_number or 'No Part#'} | {item.customer or 'No Customer'}"
-            } for item in items])
-
-        # Search items matching the query (from ItemLibrary table)
-        # Return ALL combinations even if item_name is the same
-        items = ItemLibrary.query.filter(
-            ItemLibrary.item_name.ilike(f"%{query}%")
-        ).order_by(ItemLibrary.item_name, ItemLibrary.part_number, ItemLibrary.customer).limit(50).all()
-
-        suggestions = [{
-            'item_name': item.item_name,
-            'part_number': item.part_number or '',
-            'customer': item.customer or '',
-            'display': f"{item.item_name} | {item.part_number or 'No Part#'} | {item.customer or 'No Customer'}"
-        } for item in items]
-        
-        return jsonify(suggestions)
+        return jsonify(item_library.suggestions(item_popularity.suggest(current_user.id, query)))
     
     @app.route('/report/delete/<int:report_id>', methods=['POST', 'DELETE'])
     @login_required
     def delete_report(report_id):
         from datetime import datetime, timedelta
-        report = Report.query.get_or_404(report_id)
+        report = report_archive.find(report_id)
+        if report is None:
+            abort(404)
         
         # Check ownership
         if report.user_id != current_user.id:
@@ -427,14 +682,72 @@ def create_app():
             return {'success': False, 'message': 'Report older than 2 days cannot be deleted'}, 403
         
         try:
-            category = report.category
+            category = category_lookup.display_name(report.category_id, report.category)
             db.session.delete(report)
+            snapshots.invalidate(report.id)
             db.session.commit()
+            cache.bump('reports')
             log_action(report.user_id, 'report_deleted', detail=f"Report #{report.id}", actor_id=current_user.id)
             return {'success': True, 'message': 'Report deleted successfully', 'category': category}
         except Exception as e:
             return {'success': False, 'message': str(e)}, 500
 
+    def local_date_range(start_str, end_str):
+        """GMT+7 (start, end) dates from request strings; defaults to the last 30 days."""
+        end_date = (datetime.utcnow() + timedelta(hours=7)).date()
+        if end_str:
+            try:
+                end_date = datetime.strptime(end_str, '%Y-%m-%d').date()
+            except ValueError:
+                pass
+        start_date = end_date - timedelta(days=29)
+        if start_str:
+            try:
+                start_date = datetime.strptime(start_str, '%Y-%m-%d').date()
+            except ValueError:
+                pass
+        if start_date > end_date:
+            start_date = end_date
+        return start_date, end_date
+
+    def monitoring_summary(start_date, end_date, filter_item=None):
+        """All-users summary for a GMT+7 date range (cached)."""
+        start_utc, end_utc = snapshots.local_range_to_utc(start_date, end_date)
+
+        def compute_summary():
+            # The default 30-day view is precomputed (see snapshots.py)
+            if not filter_item:
+                summary = snapshots.summary_from_snapshot(start_date, end_date)
+                if summary is not None:
+                    return summary
+            if analytics.engine.enabled:
+                return analytics.engine.summary_aggregates(start_utc, end_utc, item=filter_item)
+            return aggregates.summary_aggregates(start_utc, end_utc, item=filter_item)
+
+        return cache.get_or_compute(
+            'monitoring_summary', compute_summary,
+            start_utc=start_utc, end_utc=end_utc, item=filter_item
+        )
+
+    def user_range_stats(user_id, start_date, end_date, item_filter=None):
+        """Total, category counts and timeline of one user for a GMT+7 date range (cached)."""
+        start_utc, end_utc = snapshots.local_range_to_utc(start_date, end_date)
+
+        def compute_user_range():
+            # Default view of a favorite user may be precomputed (see snapshots.py)
+            if not item_filter:
+                stats = snapshots.user_range_from_snapshot(user_id, start_date, end_date)
+                if stats is not None:
+                    return stats
+            if analytics.engine.enabled:
+                return analytics.engine.user_range_aggregates(user_id, start_utc, end_utc, item=item_filter)
+            return aggregates.user_range_aggregates(user_id, start_utc, end_utc, item=item_filter)
+
+        return cache.get_or_compute(
+            'monitoring_user_range', compute_user_range,
+            user_id=user_id, start_utc=start_utc, end_utc=end_utc, item=item_filter
+        )
+
     @app.route('/monitoring')
     @app.route('/monitoring/<int:user_id>')
     @login_required
@@ -445,8 +758,6 @@ def create_app():
             return redirect(url_for('dashboard'))
         
         from datetime import datetime, timedelta
-        from sqlalchemy import func
-        from collections import defaultdict
         
         # Get all users (including admin), favorites first, then by name
         all_users = User.query.order_by(User.is_favorite.desc(), User.name).all()
@@ -454,12 +765,8 @@ def create_app():
         # Get all active categories
         categories = Category.query.filter_by(is_active=True).order_by(Category.name).all()
         
-        # Get all items worked on (for filter)
-        all_items = db.session.query(Report.item_name).filter(
-            Report.item_name.isnot(None),
-            Report.item_name != ''
-        ).distinct().order_by(Report.item_name).all()
-        all_items_list = [item[0] for item in all_items]
+        # Get all items worked on (for filter); only queried when the cached fragment is stale
+        all_items_list = Lazy(aggregates.distinct_items)
         
         selected_user = None
         user_stats = None
@@ -470,53 +777,33 @@ def create_app():
             
             # Get filter parameter
             item_filter = request.args.get('item')
-            start_date_str = request.args.get('start_date')
-            end_date_str = request.args.get('end_date')
-            now_gmt7 = datetime.utcnow() + timedelta(hours=7)
-            end_date_local = now_gmt7.date()
-            if end_date_str:
-                try:
-                    end_date_local = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-                except ValueError:
-                    pass
-            start_date_local = end_date_local - timedelta(days=29)
-            if start_date_str:
-                try:
-                    start_date_local = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-                except ValueError:
-                    pass
-            if start_date_local > end_date_local:
-                start_date_local = end_date_local
-            start_utc = datetime.combine(start_date_local, datetime.min.time()) - timedelta(hours=7)
-            end_utc = datetime.combine(end_date_local + timedelta(days=1), datetime.min.time()) - timedelta(hours=7)
-            
-            # Base query
-            query = Report.query.filter_by(user_id=selected_user.id)
-            if item_filter:
-                query = query.filter_by(item_name=item_filter)
-            query = query.filter(Report.created_at >= start_utc, Report.created_at < end_utc)
-            
+            start_date_local, end_date_local = local_date_range(
+                request.args.get('start_date'), request.args.get('end_date')
+            )
+            start_utc, end_utc = snapshots.local_range_to_utc(start_date_local, end_date_local)
+
+            def compute_user_items():
+                stats = snapshots.user_items_from_snapshot(selected_user.id)
+                if stats is not None:
+                    return stats
+                return aggregates.user_item_aggregates(selected_user.id)
+
+            range_stats = user_range_stats(selected_user.id, start_date_local, end_date_local, item_filter)
+            item_stats = cache.get_or_compute('monitoring_user_items', compute_user_items, user_id=selected_user.id)
+
             # Get total reports
-            total_reports = query.count()
+            total_reports = range_stats['total']
             
             # Get category counts (dynamic)
             category_counts = {}
             category_pcts = {}
             for category in categories:
-                count = query.filter_by(category=category.name).count()
+                count = range_stats['category_counts'].get(category.name, 0)
                 category_counts[category.name] = count
                 category_pcts[category.name] = round((count / total_reports * 100) if total_reports > 0 else 0, 1)
             
-            # Get timeline data (last 30 days) - using GMT+7
-            timeline_reports = query.all()
-            
-            # Group by date and category (convert to GMT+7)
-            timeline_data = defaultdict(lambda: defaultdict(int))
-            for report in timeline_reports:
-                gmt7_date = (report.created_at + timedelta(hours=7)).strftime('%Y-%m-%d')
-                timeline_data[gmt7_date][report.category] += 1
-            
             # Prepare timeline arrays for chart
+            timeline_data = range_stats['timeline']
             timeline_dates = []
             timeline_series = {cat.name: [] for cat in categories}
             
@@ -525,39 +812,28 @@ def create_app():
                 date_str = current_date.strftime('%Y-%m-%d')
                 timeline_dates.append(date_str)
                 for category in categories:
-                    timeline_series[category.name].append(timeline_data[date_str].get(category.name, 0))
+                    timeline_series[category.name].append(timeline_data.get(date_str, {}).get(category.name, 0))
                 current_date += timedelta(days=1)
             
-            # Get recent items worked on
-            recent_items = db.session.query(Report.item_name).filter(
-                Report.user_id == selected_user.id,
-                Report.item_name.isnot(None),
-                Report.item_name != ''
-            ).distinct().limit(10).all()
-
-            # Item contribution counts (for donut chart)
-            item_count_rows = db.session.query(Report.item_name, func.count(Report.id)).filter(
-                Report.user_id == selected_user.id,
-                Report.item_name.isnot(None),
-                Report.item_name != ''
-            ).group_by(Report.item_name).all()
-            item_labels = [row[0] for row in item_count_rows]
-            item_counts = [row[1] for row in item_count_rows]
-            
-            # Get all reports for detailed view
-            all_reports = query.order_by(Report.created_at.desc()).all()
+            # Get all reports for detailed view (archived months only when the range needs them)
+            report_filters = {'user_id': selected_user.id, 'start_date': start_date_local,
+                              'end_date': end_date_local}
+            if item_filter:
+                report_filters['item'] = item_filter
+            all_reports = report_query.rows(report_filters, report_query.LIST_FIELDS)
+            all_reports.sort(key=lambda r: r.created_at, reverse=True)
             
             user_stats = {
                 'user': selected_user,
                 'total_reports': total_reports,
                 'category_counts': category_counts,
                 'category_pcts': category_pcts,
-                'recent_items': [item[0] for item in recent_items],
+                'recent_items': item_stats['recent_items'],
                 'all_reports': all_reports,
                 'timeline_dates': timeline_dates,
                 'timeline_series': timeline_series,
-                'item_labels': item_labels,
-                'item_counts': item_counts,
+                'item_labels': item_stats['item_labels'],
+                'item_counts': item_stats['item_counts'],
                 'date_range_label': f"{start_date_local.strftime('%d/%m/%y')} - {end_date_local.strftime('%d/%m/%y')}",
                 'start_date_local': start_date_local.strftime('%Y-%m-%d'),
                 'end_date_local': end_date_local.strftime('%Y-%m-%d')
@@ -567,75 +843,26 @@ def create_app():
         # --- SUMMARY ALL USERS DATA ---
         # Get filter parameters for all users summary
         filter_item = request.args.get('filter_item')
-        all_start_date_str = request.args.get('all_start_date')
-        all_end_date_str = request.args.get('all_end_date')
-        
-        # Calculate date range for all users (default: last 30 days)
-        now_gmt7 = datetime.utcnow() + timedelta(hours=7)
-        all_end_date = now_gmt7.date()
-        if all_end_date_str:
-            try:
-                all_end_date = datetime.strptime(all_end_date_str, '%Y-%m-%d').date()
-            except ValueError:
-                pass
-        
-        all_start_date = all_end_date - timedelta(days=29)
-        if all_start_date_str:
-            try:
-                all_start_date = datetime.strptime(all_start_date_str, '%Y-%m-%d').date()
-            except ValueError:
-                pass
-        
-        if all_start_date > all_end_date:
-            all_start_date = all_end_date
-        
-        # Convert to UTC for database query
-        all_start_utc = datetime.combine(all_start_date, datetime.min.time()) - timedelta(hours=7)
-        all_end_utc = datetime.combine(all_end_date + timedelta(days=1), datetime.min.time()) - timedelta(hours=7)
-        
+        all_start_date, all_end_date = local_date_range(
+            request.args.get('all_start_date'), request.args.get('all_end_date')
+        )
+        summary = monitoring_summary(all_start_date, all_end_date, filter_item)
+
         # 1. Category distribution (all reports, optionally filtered by item and date range)
-        all_users_category_counts = {cat.name: 0 for cat in categories}
-        for user in all_users:
-            for report in user.reports:
-                # Apply date range filter
-                if not (all_start_utc <= report.created_at < all_end_utc):
-                    continue
-                # Apply item filter if specified
-                if filter_item and report.item_name != filter_item:
-                    continue
-                if report.category in all_users_category_counts:
-                    all_users_category_counts[report.category] += 1
+        all_users_category_counts = {
+            cat.name: summary['category_counts'].get(cat.name, 0) for cat in categories
+        }
 
         # 2. Report count per user (for bar chart, optionally filtered by item and date range)
-        all_users_report_counts = []
-        for user in all_users:
-            count = 0
-            for r in user.reports:
-                # Apply date range filter
-                if not (all_start_utc <= r.created_at < all_end_utc):
-                    continue
-                # Apply item filter
-                if filter_item and r.item_name != filter_item:
-                    continue
-                count += 1
-            all_users_report_counts.append((user.name, count))
-
-        # 3. Item name distribution (top items worked on, optionally filtered by date range)
-        all_items_counts = defaultdict(int)
-        for user in all_users:
-            for report in user.reports:
-                # Apply date range filter
-                if not (all_start_utc <= report.created_at < all_end_utc):
-                    continue
-                if not report.item_name or not report.item_name.strip():
-                    continue
-                if filter_item and report.item_name != filter_item:
-                    continue
-                all_items_counts[report.item_name] += 1
-        
-        # Get top 10 items sorted by count
-        if all_items_counts:
-            top_items = sorted(all_items_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+        # Only the top 10 are charted; departments and sections are drilled into on demand
+        all_users_report_counts = sorted(
+            ((user.name, summary['user_counts'].get(user.id, 0)) for user in all_users),
+            key=lambda pair: pair[1], reverse=True
+        )[:10]
+
+        # 3. Item name distribution - top 10 items sorted by count
+        if summary['item_counts']:
+            top_items = sorted(summary['item_counts'].items(), key=lambda x: x[1], reverse=True)[:10]
             all_users_item_names = [item[0] for item in top_items]
             all_users_item_counts = [item[1] for item in top_items]
         else:
@@ -645,32 +872,23 @@ def create_app():
         # 4. Timeline stacked chart (all users, filtered by date range and item)
         all_timeline_dates = []
         all_timeline_series = {cat.name: [] for cat in categories}
-        all_timeline_data = defaultdict(lambda: defaultdict(int))
-        
-        for user in all_users:
-            for report in user.reports:
-                # Apply date range filter
-                if not (all_start_utc <= report.created_at < all_end_utc):
-                    continue
-                # Apply item filter if specified
-                if filter_item and report.item_name != filter_item:
-                    continue
-                gmt7_date = (report.created_at + timedelta(hours=7)).strftime('%Y-%m-%d')
-                all_timeline_data[gmt7_date][report.category] += 1
+        all_timeline_data = summary['timeline']
         
         current_date_all = all_start_date
         while current_date_all <= all_end_date:
             date_str = current_date_all.strftime('%Y-%m-%d')
             all_timeline_dates.append(date_str)
             for category in categories:
-                all_timeline_series[category.name].append(all_timeline_data[date_str].get(category.name, 0))
+                all_timeline_series[category.name].append(all_timeline_data.get(date_str, {}).get(category.name, 0))
             current_date_all += timedelta(days=1)
 
         total_users = len(all_users)
-        total_reports_all = Report.query.count()
+        total_reports_all = report_archive.total_count()
+        user_report_counts = Lazy(report_archive.count_by_user)
 
         return render_template('monitoring.html',
             all_users=all_users,
+            user_report_counts=user_report_counts,
             selected_user=selected_user,
             user_stats=user_stats,
             categories=categories,
@@ -684,9 +902,38 @@ def create_app():
             all_users_timeline_dates=all_timeline_dates,
             all_users_timeline_series=all_timeline_series,
             all_start_date=all_start_date.strftime('%Y-%m-%d'),
-            all_end_date=all_end_date.strftime('%Y-%m-%d')
+            all_end_date=all_end_date.strftime('%Y-%m-%d'),
+            pivot_dimensions=pivot.DIMENSIONS
         )
 
+    @app.route('/digests/')
+    @app.route('/digests/<path:filename>')
+    @login_required
+    def digests(filename='index.html'):
+        """Static daily digests written by generate_digests.py."""
+        if not current_user.is_admin:
+            flash('Access denied. Admin only.', 'danger')
+            return redirect(url_for('dashboard'))
+        if filename.endswith('/'):
+            filename += 'index.html'
+        return send_from_directory(app.config['DIGEST_DIR'], filename)
+
+    @app.route('/admin/cache/stats')
+    @login_required
+    def cache_stats():
+        """Hit ratio, evictions and size of the monitoring result cache."""
+        if not current_user.is_admin:
+            return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+        return jsonify({'success': True, 'cache': cache.stats()})
+
+    @app.route('/admin/admission/stats')
+    @login_required
+    def admission_stats():
+        """Running, queued, rejected and timed-out requests per admission class, with queue waits."""
+        if not current_user.is_admin:
+            return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+        return jsonify({'success': True, 'admission': admission.stats()})
+
     @app.route('/audit-log')
     @login_required
     def audit_log():
@@ -715,23 +962,32 @@ def create_app():
         start_utc = datetime.combine(start_date_local, datetime.min.time()) - timedelta(hours=7)
         end_utc = datetime.combine(end_date_local + timedelta(days=1), datetime.min.time()) - timedelta(hours=7)
 
-        query = AuditLog.query.filter(AuditLog.created_at >= start_utc, AuditLog.created_at < end_utc)
-
         if current_user.is_admin:
-            if filter_user_id:
-                query = query.filter(AuditLog.user_id == filter_user_id)
             available_users = User.query.order_by(User.name).all()
         else:
             filter_user_id = current_user.id
-            query = query.filter(AuditLog.user_id == current_user.id)
             available_users = [current_user]
 
-        logs = query.order_by(AuditLog.created_at.desc()).all()
+        # Newest first, one page at a time; includes archived entries when the range needs them
+        cursor = request.args.get('cursor')
+        try:
+            logs, next_cursor = audit_page(
+                start_utc, end_utc, user_id=filter_user_id, cursor=cursor,
+                retention_days=app.config['AUDIT_LOG_RETENTION_DAYS']
+            )
+        except ValueError:
+            cursor = None
+            logs, next_cursor = audit_page(
+                start_utc, end_utc, user_id=filter_user_id,
+                retention_days=app.config['AUDIT_LOG_RETENTION_DAYS']
+            )
         date_range_label = f"{start_date_local.strftime('%d/%m/%y')} - {end_date_local.strftime('%d/%m/%y')}"
 
         return render_template(
             'audit_log.html',
             logs=logs,
+            next_cursor=next_cursor,
+            is_first_page=not cursor,
             users=available_users,
             filter_user_id=filter_user_id,
             start_date=start_date_local.strftime('%Y-%m-%d'),
@@ -759,16 +1015,24 @@ def create_app():
                     return render_template('settings.html', form=form)
                 
                 # Verify current password
-                if not check_password_hash(current_user.password, form.current_password.data):
+                try:
+                    ok, _ = hasher.verify(current_user.password_hash, form.current_password.data)
+                except HashingBusy as busy:
+                    flash('Server is busy, please try again in a few seconds.', 'warning')
+                    response = make_response(render_template('settings.html', form=form), 503)
+                    response.headers['Retry-After'] = str(busy.retry_after)
+                    return response
+                if not ok:
                     flash('Current password is incorrect.', 'danger')
                     return render_template('settings.html', form=form)
                 
                 # Update password
-                current_user.password = generate_password_hash(form.new_password.data)
+                current_user.set_password(form.new_password.data)
                 flash('Password updated successfully!', 'success')
                 log_action(current_user.id, 'password_changed', detail='User changed password')
             
             db.session.commit()
+            cache.bump('users')
             log_action(current_user.id, 'profile_updated', detail='Updated profile settings')
             flash('Settings updated.', 'success')
             return redirect(url_for('settings'))
@@ -781,20 +1045,63 @@ def create_app():
             flash('Access denied. Admin only.', 'danger')
             return redirect(url_for('dashboard'))
         
-        # Get search query
+        # Rows are loaded page by page from /api/admin/users
         search = request.args.get('search', '')
         
-        # Query users
+        return render_template('admin_users.html', search=search)
+
+    @app.route('/api/admin/users')
+    @login_required
+    def api_admin_users():
+        """Keyset-paginated user list with server-side search."""
+        if not current_user.is_admin:
+            return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+        
+        search = request.args.get('q', '').strip()
+        cursor = request.args.get('cursor')
+        query = User.query
         if search:
-            users = User.query.filter(
+            query = query.filter(
                 (User.name.ilike(f'%{search}%')) |
                 (User.employee_id.ilike(f'%{search}%')) |
                 (User.department.ilike(f'%{search}%'))
-            ).order_by(User.name).all()
-        else:
-            users = User.query.order_by(User.name).all()
+            )
+        total = query.count() if not cursor else None
+        
+        try:
+            users, next_cursor = keyset_page(
+                query, [User.name, User.id], key=lambda u: (u.name, u.id),
+                cursor=cursor, limit=page_size(request.args.get('limit')), nullable=True
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        # Report counts for this page only, in one grouped query
+        user_ids = [u.id for u in users]
+        report_counts = report_archive.count_by_user(user_ids) if user_ids else {}
         
-        return render_template('admin_users.html', users=users, search=search)
+        return jsonify({
+            'success': True,
+            'users': [{
+                'id': u.id,
+                'employee_id': u.employee_id,
+                'name': u.name,
+                'department': u.department,
+                'section': u.section,
+                'job': u.job,
+                'shift': u.shift,
+                'is_admin': u.is_admin,
+                'is_self': u.id == current_user.id,
+                'report_count': report_counts.get(u.id, 0),
+                'edit_url': url_for('admin_edit_user', user_id=u.id)
+            } for u in users],
+            'next_cursor': next_cursor,
+            'total': total
+        })
+
+    def report_count(user_id):
+        """Hot and archived reports of one user, counted in SQL."""
+        return report_archive.count_by_user([user_id]).get(user_id, 0)
 
     @app.route('/admin/users/<int:user_id>/edit', methods=['GET', 'POST'])
     @login_required
@@ -817,7 +1124,8 @@ def create_app():
                 existing = User.query.filter_by(employee_id=form.employee_id.data).first()
                 if existing:
                     flash('Employee ID already exists!', 'danger')
-                    return render_template('admin_edit_user.html', form=form, user=user)
+                    return render_template('admin_edit_user.html', form=form, user=user,
+                                           report_count=report_count(user.id))
             
             user.name = form.name.data
             user.employee_id = form.employee_id.data
@@ -834,6 +1142,7 @@ def create_app():
                 changed_password = True
             
             db.session.commit()
+            cache.bump('users')
             changes = []
             if changed_password:
                 changes.append('password')
@@ -844,7 +1153,7 @@ def create_app():
             flash(f'User {user.name} updated successfully!', 'success')
             return redirect(url_for('admin_users'))
         
-        return render_template('admin_edit_user.html', form=form, user=user)
+        return render_template('admin_edit_user.html', form=form, user=user, report_count=report_count(user.id))
 
     @app.route('/admin/users/<int:user_id>/delete', methods=['POST'])
     @login_required
@@ -859,14 +1168,18 @@ def create_app():
             return {'success': False, 'message': 'Cannot delete your own account!'}, 400
         
         try:
-            # Delete all user's reports first
-            Report.query.filter_by(user_id=user.id).delete()
+            # Delete all user's reports (including archived months) and templates first
+            report_archive.delete_for_user(user.id)
+            ReportTemplate.query.filter_by(user_id=user.id).delete()
             
             # Delete user
             username = user.name
             target_id = user.id
             db.session.delete(user)
+            snapshots.invalidate()
             db.session.commit()
+            cache.bump('history')
+            cache.bump('users')
             log_action(None, 'user_deleted', detail=f"Deleted user {username} (ID {target_id})", actor_id=current_user.id)
             
             return {'success': True, 'message': f'User {username} deleted successfully'}
@@ -951,21 +1264,10 @@ def create_app():
         
         categories = Category.query.order_by(Category.name).all()
         
-        # Get all users for user management tab
+        # Users and items tabs load on demand from /api/admin/users and /api/admin/items
         search = request.args.get('search', '').strip()
-        if search:
-            users = User.query.filter(
-                (User.name.ilike(f'%{search}%')) |
-                (User.employee_id.ilike(f'%{search}%')) |
-                (User.department.ilike(f'%{search}%'))
-            ).order_by(User.name).all()
-        else:
-            users = User.query.order_by(User.name).all()
         
-        # Get all items for item library tab
-        items = ItemLibrary.query.order_by(ItemLibrary.item_name).all()
-        
-        return render_template('admin_categories.html', categories=categories, users=users, items=items, search=search)
+        return render_template('admin_categories.html', categories=categories, search=search)
 
     @app.route('/admin/category/add', methods=['POST'])
     @login_required
@@ -989,6 +1291,7 @@ def create_app():
             category = Category(name=name, color=color, icon=icon)
             db.session.add(category)
             db.session.commit()
+            category_lookup.invalidate()
             
             return {'success': True, 'message': 'Category added successfully', 
                    'category': {'id': category.id, 'name': category.name, 'color': category.color, 'icon': category.icon}}
@@ -1009,6 +1312,7 @@ def create_app():
             color = request.form.get('color')
             icon = request.form.get('icon')
             
+            renamed = bool(name) and name != category.name
             if name:
                 category.name = name
             if color:
@@ -1016,7 +1320,14 @@ def create_app():
             if icon:
                 category.icon = icon
             
+            # Reports reference the category by id, so a rename only touches this row;
+            # cached aggregates keyed by the old name are dropped
+            if renamed:
+                snapshots.invalidate()
             db.session.commit()
+            category_lookup.invalidate()
+            if renamed:
+                cache.bump('history')
             return {'success': True, 'message': 'Category updated successfully'}
         except Exception as e:
             db.session.rollback()
@@ -1032,8 +1343,16 @@ def create_app():
         
         try:
             category_name = category.name
+            # Keep the current name on linked reports before unlinking them
+            for model in (Report, ReportArchive):
+                model.query.filter_by(category_id=category.id).update(
+                    {'category': category_name, 'category_id': None}, synchronize_session=False
+                )
             db.session.delete(category)
+            snapshots.invalidate()
             db.session.commit()
+            category_lookup.invalidate()
+            cache.bump('history')
             return {'success': True, 'message': f'Category "{category_name}" deleted successfully'}
         except Exception as e:
             db.session.rollback()
@@ -1050,6 +1369,7 @@ def create_app():
         try:
             category.is_active = not category.is_active
             db.session.commit()
+            category_lookup.invalidate()
             return {'success': True, 'message': f'Category {"activated" if category.is_active else "deactivated"}', 'is_active': category.is_active}
         except Exception as e:
             db.session.rollback()
@@ -1066,6 +1386,7 @@ def create_app():
         try:
             user.is_favorite = not user.is_favorite
             db.session.commit()
+            cache.bump('users')
             return jsonify({
                 'success': True, 
                 'message': f'User {"added to" if user.is_favorite else "removed from"} favorites', 
@@ -1077,6 +1398,44 @@ def create_app():
 
     # ===== ITEM LIBRARY ROUTES =====
     
+    @app.route('/api/admin/items')
+    @login_required
+    def api_admin_items():
+        """Keyset-paginated item library with server-side search."""
+        if not current_user.is_admin:
+            return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+        
+        search = request.args.get('q', '').strip()
+        cursor = request.args.get('cursor')
+        query = ItemLibrary.query
+        if search:
+            query = query.filter(
+                (ItemLibrary.item_name.ilike(f'%{search}%')) |
+                (ItemLibrary.part_number.ilike(f'%{search}%')) |
+                (ItemLibrary.customer.ilike(f'%{search}%'))
+            )
+        total = query.count() if not cursor else None
+        
+        try:
+            items, next_cursor = keyset_page(
+                query, [ItemLibrary.item_name, ItemLibrary.id], key=lambda i: (i.item_name, i.id),
+                cursor=cursor, limit=page_size(request.args.get('limit'))
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'items': [{
+                'id': i.id,
+                'item_name': i.item_name,
+                'part_number': i.part_number,
+                'customer': i.customer
+            } for i in items],
+            'next_cursor': next_cursor,
+            'total': total
+        })
+
     @app.route('/admin/items/upload', methods=['POST'])
     @login_required
     def upload_items():
@@ -1100,37 +1459,75 @@ def create_app():
             sheet = workbook.active
             
             count = 0
+            batch = []
             for row in sheet.iter_rows(min_row=2, values_only=True):  # Skip header
-                if not row[0]:  # Skip if item_name is empty
+                if not row or not row[0]:  # Skip if item_name is empty
                     continue
                 
                 item_name = str(row[0]).strip()
                 part_number = str(row[1]).strip() if len(row) > 1 and row[1] else None
                 customer = str(row[2]).strip() if len(row) > 2 and row[2] else None
+                batch.append((item_name, part_number, customer))
                 
-                # Check if exact combination already exists (item_name + part_number + customer)
-                existing = ItemLibrary.query.filter_by(
-                    item_name=item_name,
-                    part_number=part_number,
-                    customer=customer
-                ).first()
-                
-                if not existing:
-                    item = ItemLibrary(
-                        item_name=item_name,
-                        part_number=part_number,
-                        customer=customer
-                    )
-                    db.session.add(item)
-                    count += 1
+                # Existing combinations (item_name + part_number + customer) are skipped by the unique index
+                if len(batch) >= 1000:
+                    count += insert_ignore(batch)
+                    batch = []
+            count += insert_ignore(batch)
             
             db.session.commit()
+            item_popularity.invalidate_library()
             return jsonify({'success': True, 'message': f'{count} items uploaded successfully', 'count': count})
         
         except Exception as e:
             db.session.rollback()
             return jsonify({'success': False, 'message': f'Error reading Excel file: {str(e)}'})
     
+    @app.route('/admin/reports/import', methods=['POST'])
+    @login_required
+    def import_reports():
+        """Import historical reports from .xlsx/.csv, streaming progress as JSON lines."""
+        if not current_user.is_admin:
+            return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+
+        file = request.files.get('file')
+        if file is None or file.filename == '':
+            return jsonify({'success': False, 'message': 'No file selected'}), 400
+        # The request's files are closed before a streamed response is sent
+        upload = tempfile.TemporaryFile()
+        file.save(upload)
+        upload.seek(0)
+        try:
+            records = report_import.read_rows(upload, file.filename)
+        except Exception as e:
+            upload.close()
+            return jsonify({'success': False, 'message': f'Error reading file: {str(e)}'}), 400
+        actor_id = current_user.id
+        filename = secure_filename(file.filename)
+
+        def generate():
+            result = report_import.ImportResult()
+            try:
+                for result in report_import.import_reports(records, result=result):
+                    yield json.dumps({'imported': result.imported, 'skipped': result.skipped}) + '\n'
+                if result.imported:
+                    log_action(actor_id, 'reports_imported', detail=f"{result.imported} reports from {filename}")
+                    report_import.rebuild_rollups()
+                yield json.dumps(dict(result.as_dict(), success=True, done=True)) + '\n'
+            except Exception as e:
+                db.session.rollback()
+                if result.imported:
+                    # The chunks written before the error stay
+                    log_action(actor_id, 'reports_imported',
+                               detail=f"{result.imported} reports from {filename} (stopped: {e})")
+                    report_import.rebuild_rollups()
+                yield json.dumps(dict(result.as_dict(), success=False, done=True, message=str(e))) + '\n'
+            finally:
+                records.close()
+                upload.close()
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
     @app.route('/admin/items/add', methods=['POST'])
     @login_required
     def add_item():
@@ -1163,6 +1560,7 @@ def create_app():
             )
             db.session.add(item)
             db.session.commit()
+            item_popularity.invalidate_library()
             
             return jsonify({'success': True, 'message': 'Item added successfully'})
         
@@ -1187,7 +1585,10 @@ def create_app():
             if not item.item_name:
                 return jsonify({'success': False, 'message': 'Item name is required'})
             
+            # Linked reports are counted under the new name
+            snapshots.invalidate()
             db.session.commit()
+            cache.bump('history')
             return jsonify({'success': True, 'message': 'Item updated successfully'})
         
         except Exception as e:
@@ -1203,8 +1604,13 @@ def create_app():
         
         try:
             item = ItemLibrary.query.get_or_404(item_id)
+            # Linked reports fall back to their item_name strings
+            for model in (Report, ReportArchive):
+                model.query.filter_by(item_id=item.id).update({'item_id': None}, synchronize_session=False)
             db.session.delete(item)
+            snapshots.invalidate()
             db.session.commit()
+            cache.bump('history')
             
             return jsonify({'success': True, 'message': 'Item deleted successfully'})
         
@@ -1220,8 +1626,12 @@ def create_app():
             return jsonify({'success': False, 'message': 'Unauthorized'}), 403
         
         try:
+            for model in (Report, ReportArchive):
+                model.query.filter(model.item_id.isnot(None)).update({'item_id': None}, synchronize_session=False)
             ItemLibrary.query.delete()
+            snapshots.invalidate()
             db.session.commit()
+            cache.bump('history')
             
             return jsonify({'success': True, 'message': 'All items cleared successfully'})
         
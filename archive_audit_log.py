@@ -0,0 +1,21 @@
+"""Move audit log entries older than AUDIT_LOG_RETENTION_DAYS to the archive table.
+
+Run daily from cron, e.g.:
+    30 2 * * * cd /path/to/app && python archive_audit_log.py
+"""
+import sys
+from app import create_app
+from audit import archive_entries
+
+
+def main():
+    app = create_app()
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    with app.app_context():
+        retention_days = app.config['AUDIT_LOG_RETENTION_DAYS']
+        moved = archive_entries(retention_days=retention_days, batch_size=batch_size)
+        print(f"✅ Archived {moved} audit log entries older than {retention_days} days")
+
+
+if __name__ == '__main__':
+    main()
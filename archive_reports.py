@@ -0,0 +1,23 @@
+"""Move reports from closed months (past the 2-day edit window) to report_archive.
+
+Run nightly from cron, e.g.:
+    0 3 * * * cd /path/to/app && python archive_reports.py
+
+On a SQLite database created before report ids were AUTOINCREMENT, run
+migrate_report_autoincrement.py once first.
+"""
+import sys
+from app import create_app
+from report_archive import archive_closed_months, closed_cutoff
+
+
+def main():
+    app = create_app()
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with app.app_context():
+        moved = archive_closed_months(batch_size=batch_size)
+        print(f"✅ Archived {moved} reports created before {closed_cutoff():%Y-%m-%d %H:%M} UTC")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,13 @@
+"""ASGI entrypoint: async read-only API tier in front of the Flask app.
+Run with: uvicorn asgi:application --host 0.0.0.0 --port 8562 --workers 4
+
+/api/items/search and /api/report/<id> are served by async_api.py on an async
+database engine; every other request runs the Flask app in a thread pool.
+Install requirements-async.txt first.
+"""
+from asgiref.wsgi import WsgiToAsgi
+from app import create_app
+from async_api import AsyncAPI
+
+app = create_app()
+application = AsyncAPI(app, fallback=WsgiToAsgi(app))
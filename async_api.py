@@ -0,0 +1,179 @@
+"""Async read-only API tier (ASGI) for item autocomplete and report detail.
+
+These two endpoints are called on every keystroke and every click in the
+report list, and spend almost all their time waiting on the database. Served
+here on an async engine (aiosqlite / asyncpg), one event loop holds hundreds of
+them in flight instead of one waitress thread each.
+
+The report detail SQL is shared with the Flask view
+(report_archive.detail_statement), and item suggestions come from the same
+in-memory ranking (item_popularity.py), so both tiers answer identically.
+Suggestions are answered on the event loop; the ranking's database reads
+(library reload, top-up, hourly rebuild) run in a background task every
+``REFRESH_INTERVAL`` seconds instead. The user
+is taken from the Flask session cookie; requests without a valid session, and
+all other paths, are passed on to ``fallback`` (the Flask app, see asgi.py),
+which handles remember-me cookies and the login redirect as usual.
+
+Needs the packages in requirements-async.txt.
+"""
+import asyncio
+import re
+from urllib.parse import parse_qs
+
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+
+import serialization
+import item_library
+import item_popularity
+import report_archive
+from models import db, User, Report, ReportArchive
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'postgres': 'postgresql+asyncpg',
+}
+
+REPORT_DETAIL_PATH = re.compile(r'^/api/report/(\d+)$')
+REFRESH_INTERVAL = item_popularity.TOP_UP_INTERVAL  # seconds
+
+
+def async_url(url):
+    """Database URL with the async driver for its backend."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f'No async driver configured for {backend} databases')
+    query = dict(url.query)
+    # psycopg2 options asyncpg doesn't understand
+    query.pop('sslmode', None)
+    query.pop('channel_binding', None)
+    return url.set(drivername=ASYNC_DRIVERS[backend], query=query)
+
+
+class AsyncAPI:
+    """ASGI app serving the read-only endpoints; everything else goes to ``fallback``."""
+
+    def __init__(self, flask_app, fallback):
+        self.flask_app = flask_app
+        self.fallback = fallback
+        self.engine = None
+        self.refresher = None
+        self.ranking_loaded = None
+        with flask_app.app_context():
+            # Resolved URL (relative SQLite paths point into the instance folder)
+            self.url = async_url(db.engine.url)
+        self.serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+        self.cookie_name = flask_app.config['SESSION_COOKIE_NAME']
+        self.max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+
+    def _engine(self):
+        if self.engine is None:
+            from sqlalchemy.ext.asyncio import create_async_engine
+            options = {} if self.url.get_backend_name() == 'sqlite' else {'pool_size': 20, 'max_overflow': 30}
+            self.engine = create_async_engine(self.url, pool_pre_ping=True, **options)
+        return self.engine
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            path = scope['path']
+            detail = REPORT_DETAIL_PATH.match(path)
+            if path == '/api/items/search' or detail:
+                user_id = await self.current_user_id(scope)
+                if user_id is not None:
+                    if detail:
+                        return await self.report_detail(send, user_id, int(detail.group(1)))
+                    return await self.search_items(scope, send, user_id)
+        return await self.fallback(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self._start_refresher()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.refresher is not None:
+                    self.refresher.cancel()
+                if self.engine is not None:
+                    await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _session_cookie(self, scope):
+        for name, value in scope['headers']:
+            if name != b'cookie':
+                continue
+            for part in value.decode('latin-1').split(';'):
+                key, _, cookie = part.strip().partition('=')
+                if key == self.cookie_name:
+                    return cookie
+        return None
+
+    async def current_user_id(self, scope):
+        """Id of the logged-in user from the Flask session, or None."""
+        cookie = self._session_cookie(scope)
+        if not cookie or self.serializer is None:
+            return None
+        try:
+            session = self.serializer.loads(cookie, max_age=self.max_age)
+            user_id = int(session['_user_id'])
+        except Exception:
+            return None
+        async with self._engine().connect() as conn:
+            found = await conn.scalar(select(User.id).where(User.id == user_id))
+        return found
+
+    def _refresh_ranking(self):
+        with self.flask_app.app_context():
+            item_popularity.refresh()
+
+    def _start_refresher(self):
+        """Start the background ranking refresh (also when the server sends no lifespan events)."""
+        if self.refresher is None or self.refresher.done():
+            if self.ranking_loaded is None:
+                self.ranking_loaded = asyncio.Event()
+            self.refresher = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self._refresh_ranking)
+            except Exception as exc:
+                self.flask_app.logger.error(f"Item ranking refresh failed: {exc}")
+            # Waiting requests answer from whatever is loaded, even after a failure
+            self.ranking_loaded.set()
+            await asyncio.sleep(REFRESH_INTERVAL)
+
+    async def search_items(self, scope, send, user_id):
+        args = parse_qs(scope['query_string'].decode('latin-1'))
+        query = args.get('q', [''])[0].strip()
+        self._start_refresher()
+        if not item_popularity.loaded():
+            await self.ranking_loaded.wait()  # first build only
+        rows = item_popularity.suggest(user_id, query, reload=False)
+        await self.respond(send, 200, item_library.suggestions(rows))
+
+    async def report_detail(self, send, user_id, report_id):
+        async with self._engine().connect() as conn:
+            for model in (Report, ReportArchive):
+                row = (await conn.execute(report_archive.detail_statement(model, report_id))).first()
+                if row is not None:
+                    return await self.respond(send, 200, report_archive.detail_payload(row, user_id))
+        await self.respond(send, 404, {'success': False, 'message': 'Report not found'})
+
+    async def respond(self, send, status, payload):
+        body = serialization.dumps(payload)
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,82 @@
+"""Audit log paging and retention.
+
+Entries older than the retention period are moved in batches from
+``audit_log`` to ``audit_log_archive`` by ``archive_audit_log.py``. The audit
+page reads both tables through :func:`audit_page` when the requested range
+reaches past the retention cutoff, so archived entries stay visible.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, undefer
+from models import db, AuditLog, AuditLogArchive
+from report_archive import reuses_ids
+from pagination import keyset_page, encode_cursor
+
+DEFAULT_RETENTION_DAYS = 90
+PAGE_SIZE = 100
+
+
+def audit_page(start_utc, end_utc, user_id=None, cursor=None, limit=PAGE_SIZE,
+               retention_days=DEFAULT_RETENTION_DAYS, now=None):
+    """Newest-first page of entries in [start_utc, end_utc). Returns (logs, next_cursor).
+
+    Raises ValueError for a malformed cursor.
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(days=retention_days)
+    sources = [AuditLog]
+    if start_utc < cutoff:
+        sources.append(AuditLogArchive)
+
+    logs = []
+    has_more = False
+    for model in sources:
+        query = model.query.options(
+            joinedload(model.user), joinedload(model.actor), undefer(model.detail)
+        ).filter(model.created_at >= start_utc, model.created_at < end_utc)
+        if user_id:
+            query = query.filter(model.user_id == user_id)
+        rows, next_cursor = keyset_page(
+            query, [model.created_at, model.id], key=lambda log: (log.created_at, log.id),
+            cursor=cursor, limit=limit, descending=True
+        )
+        logs.extend(rows)
+        has_more = has_more or next_cursor is not None
+
+    if len(sources) > 1:
+        logs.sort(key=lambda log: (log.created_at, log.id), reverse=True)
+    if len(logs) > limit:
+        logs = logs[:limit]
+        has_more = True
+    next_cursor = encode_cursor((logs[-1].created_at, logs[-1].id)) if has_more and logs else None
+    return logs, next_cursor
+
+
+def archive_entries(retention_days=DEFAULT_RETENTION_DAYS, batch_size=1000, now=None):
+    """Move entries older than the retention period to the archive table.
+
+    Each batch is copied and deleted in its own transaction, so the job can be
+    interrupted and resumed. Returns the number of entries moved. Raises
+    RuntimeError on a SQLite audit_log table that can reuse ids (run
+    migrate_audit_log_autoincrement.py first).
+    """
+    if reuses_ids(AuditLog.__table__):
+        raise RuntimeError('The audit_log table can reuse ids of archived entries; '
+                           'run migrate_audit_log_autoincrement.py before archiving')
+    cutoff = (now or datetime.utcnow()) - timedelta(days=retention_days)
+    hot = AuditLog.__table__
+    archive = AuditLogArchive.__table__
+    columns = [c.name for c in archive.columns]
+    moved = 0
+    while True:
+        ids = [row[0] for row in db.session.query(AuditLog.id).filter(
+            AuditLog.created_at < cutoff
+        ).order_by(AuditLog.created_at, AuditLog.id).limit(batch_size)]
+        if not ids:
+            break
+        db.session.execute(archive.insert().from_select(
+            columns, select(*[hot.c[name] for name in columns]).where(hot.c.id.in_(ids))
+        ))
+        db.session.execute(hot.delete().where(hot.c.id.in_(ids)))
+        db.session.commit()
+        moved += len(ids)
+    return moved
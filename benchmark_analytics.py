@@ -0,0 +1,133 @@
+"""Monitoring aggregates: SQL + Python loops vs the columnar NumPy engine.
+
+Seeds a throwaway SQLite database with --reports reports spread over a year,
+then times aggregates.summary_aggregates / user_range_aggregates against
+analytics.engine for a 30-day and a 365-day range, checks both give the same
+result, and times loading the arrays from the database and from a
+memory-mapped snapshot.
+
+Usage:
+    python benchmark_analytics.py [--reports 1000000] [--users 800] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BATCH_SIZE = 50000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reports', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=800)
+    parser.add_argument('--items', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=3)
+    return parser.parse_args()
+
+
+def seed(args):
+    from models import db, User, Report, Category, ItemLibrary
+    db.session.execute(User.__table__.insert(), [
+        {'name': f'Operator {i}', 'employee_id': f'op{i:04d}', 'department': 'Production'}
+        for i in range(args.users)
+    ])
+    db.session.execute(ItemLibrary.__table__.insert(), [
+        {'item_name': f'Item {i}', 'part_number': f'P{i:05d}', 'customer': f'Customer {i % 20}'}
+        for i in range(args.items)
+    ])
+    user_ids = [row[0] for row in db.session.query(User.id)]
+    item_ids = [row[0] for row in db.session.query(ItemLibrary.id)]
+    categories = [(c.id, c.name) for c in Category.query.all()]
+    start = datetime.utcnow() - timedelta(days=365)
+    step = 365 * 24 * 3600 / args.reports
+    for offset in range(0, args.reports, BATCH_SIZE):
+        rows = []
+        for i in range(offset, min(offset + BATCH_SIZE, args.reports)):
+            category_id, category = categories[i % len(categories)]
+            linked = i % 10 != 0  # some reports not linked to the library yet
+            rows.append({
+                'user_id': user_ids[i % len(user_ids)], 'time': '08:00',
+                'category': category, 'category_id': category_id,
+                'title': f'Report {i}', 'notes': '',
+                'item_name': f'Item {i % args.items}' if linked else f'Loose item {i % 50}',
+                'item_id': item_ids[i % args.items] if linked else None,
+                'created_at': start + timedelta(seconds=i * step),
+            })
+        db.session.execute(Report.__table__.insert(), rows)
+        db.session.commit()
+        print(f"  seeded {min(offset + BATCH_SIZE, args.reports):,} reports", end='\r')
+    print()
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{workdir}/analytics.db"
+    os.environ['RESULT_CACHE_ENABLED'] = '0'
+    os.environ['ANALYTICS_ENGINE'] = '1'
+    sys.path.insert(0, HERE)
+    from app import create_app
+    import aggregates
+    import analytics
+    from models import User
+
+    app = create_app()
+    with app.app_context():
+        if not analytics.engine.enabled:
+            print('NumPy is not installed; pip install numpy to run this benchmark')
+            return
+        print(f"Seeding {args.reports:,} reports...")
+        seed(args)
+        engine = analytics.engine
+
+        _, load_time = timed(engine.get_columns, 1)
+        print(f"Load from database: {load_time:.2f} s, {len(engine.columns):,} rows, "
+              f"{engine.columns.nbytes / 1024 / 1024:.1f} MB")
+
+        engine.snapshot_dir = os.path.join(workdir, 'snapshot')
+        engine.refresh_snapshot()
+        engine.columns = None
+        _, map_time = timed(engine.get_columns, 1)
+        print(f"Map from .npy snapshot: {map_time * 1000:.1f} ms (mapped: {engine.stats()['mapped']})")
+
+        user_id = User.query.filter_by(employee_id='op0001').first().id
+        end_date = (datetime.utcnow() + timedelta(hours=7)).date()
+        for days in (30, 365):
+            start_date = end_date - timedelta(days=days - 1)
+            start_utc = datetime.combine(start_date, datetime.min.time()) - timedelta(hours=7)
+            end_utc = datetime.combine(end_date + timedelta(days=1), datetime.min.time()) - timedelta(hours=7)
+            print(f"\n{days}-day range:")
+            for label, loops, columnar in (
+                ('summary (all users)',
+                 lambda: aggregates.summary_aggregates(start_utc, end_utc),
+                 lambda: engine.summary_aggregates(start_utc, end_utc)),
+                ('summary, one item',
+                 lambda: aggregates.summary_aggregates(start_utc, end_utc, item='Item 7'),
+                 lambda: engine.summary_aggregates(start_utc, end_utc, item='Item 7')),
+                ('one user',
+                 lambda: aggregates.user_range_aggregates(user_id, start_utc, end_utc),
+                 lambda: engine.user_range_aggregates(user_id, start_utc, end_utc)),
+            ):
+                expected, loop_time = timed(loops, args.repeat)
+                result, columnar_time = timed(columnar, args.repeat)
+                same = 'same result' if result == expected else 'RESULTS DIFFER'
+                print(f"  {label:<22} loops {loop_time * 1000:8.1f} ms  columnar {columnar_time * 1000:7.1f} ms  "
+                      f"({loop_time / columnar_time:5.1f}x, {same})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""Autocomplete and report-detail latency: waitress vs the async API tier.
+
+Seeds a throwaway SQLite database, then starts ``python wsgi.py`` and
+``uvicorn asgi:application`` in turn and hits /api/items/search and
+/api/report/<id> from many concurrent clients. The async tier should keep p95
+flat as the client count grows past the waitress thread count.
+
+Usage:
+    python benchmark_async_api.py [--clients 200] [--seconds 10] [--threads 16]
+"""
+import argparse
+import http.client
+import importlib.util
+import os
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--threads', type=int, default=16, help='waitress threads')
+    parser.add_argument('--reports', type=int, default=20000)
+    return parser.parse_args()
+
+
+def seed(database_url, report_count):
+    os.environ['DATABASE_URL'] = database_url
+    sys.path.insert(0, HERE)
+    from app import create_app
+    from models import db, User, Report, ItemLibrary
+
+    app = create_app()
+    with app.app_context():
+        db.session.execute(User.__table__.insert(), [
+            {'name': f'Operator {i}', 'employee_id': f'op{i:04d}', 'department': 'Production'}
+            for i in range(200)
+        ])
+        db.session.execute(ItemLibrary.__table__.insert(), [
+            {'item_name': f'Item {i}', 'part_number': f'P{i:05d}', 'customer': f'Customer {i % 20}'}
+            for i in range(2000)
+        ])
+        user_ids = [row[0] for row in db.session.query(User.id)]
+        start = datetime.utcnow() - timedelta(days=30)
+        db.session.execute(Report.__table__.insert(), [
+            {'user_id': user_ids[i % len(user_ids)], 'time': '08:00', 'category': 'Produksi',
+             'title': f'Report {i}', 'notes': 'Checked line', 'item_name': f'Item {i % 2000}',
+             'created_at': start + timedelta(minutes=2 * i)}
+            for i in range(report_count)
+        ])
+        db.session.commit()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def request(port, method, path, body=None, cookie=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    headers = {}
+    if body:
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+    if cookie:
+        headers['Cookie'] = cookie
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    data = response.read()
+    conn.close()
+    return response, data
+
+
+def login(port):
+    response, page = request(port, 'GET', '/login')
+    cookie = response.getheader('Set-Cookie').split(';', 1)[0]
+    token = re.search(rb'name="csrf_token" type="hidden" value="([^"]+)"', page).group(1).decode()
+    body = urlencode({'csrf_token': token, 'employee_id': 'admin', 'password': 'admin123'})
+    response, _ = request(port, 'POST', '/login', body=body, cookie=cookie)
+    return response.getheader('Set-Cookie').split(';', 1)[0]
+
+
+def wait_for(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            request(port, 'GET', '/login')
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+def run(command, port, args, env):
+    server = subprocess.Popen(command, cwd=HERE, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(port)
+        cookie = login(port)
+        latencies, errors = [], []
+        stop = threading.Event()
+
+        def client(n):
+            rng = random.Random(n)
+            while not stop.is_set():
+                if rng.random() < 0.7:
+                    path = f'/api/items/search?q=Item%20{rng.randrange(200)}'
+                else:
+                    path = f'/api/report/{rng.randrange(1, args.reports + 1)}'
+                started = time.perf_counter()
+                try:
+                    response, _ = request(port, 'GET', path, cookie=cookie)
+                except OSError:
+                    errors.append(path)
+                    continue
+                if response.status == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors.append(path)
+
+        clients = [threading.Thread(target=client, args=(n,)) for n in range(args.clients)]
+        for thread in clients:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in clients:
+            thread.join()
+        return latencies, len(errors)
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+def summarize(label, latencies, errors, seconds):
+    if not latencies:
+        print(f"  {label}: no requests completed ({errors} errors)")
+        return
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    p99 = ordered[int(len(ordered) * 0.99) - 1]
+    print(f"  {label}: {len(ordered) / seconds:7.1f} req/s  p50 {statistics.median(ordered) * 1000:6.1f} ms  "
+          f"p95 {p95 * 1000:6.1f} ms  p99 {p99 * 1000:6.1f} ms  errors {errors}")
+
+
+def main():
+    args = parse_args()
+    database_url = f"sqlite:///{tempfile.mkdtemp()}/async_api.db"
+    seed(database_url, args.reports)
+    env = dict(os.environ, DATABASE_URL=database_url, RESULT_CACHE_ENABLED='0')
+    print(f"Search/detail mix with {args.clients} clients for {args.seconds:.0f}s")
+
+    port = free_port()
+    waitress_env = dict(env, PORT=str(port), HOST='127.0.0.1', WAITRESS_THREADS=str(args.threads),
+                        WAITRESS_CONNECTION_LIMIT=str(args.clients * 2))
+    latencies, errors = run([sys.executable, 'wsgi.py'], port, args, waitress_env)
+    summarize(f'waitress ({args.threads} threads)', latencies, errors, args.seconds)
+
+    missing = [name for name in ('uvicorn', 'aiosqlite', 'asgiref') if importlib.util.find_spec(name) is None]
+    if missing:
+        print(f"  async tier skipped: install requirements-async.txt (missing {', '.join(missing)})")
+        return
+    port = free_port()
+    command = [sys.executable, '-m', 'uvicorn', 'asgi:application', '--host', '127.0.0.1',
+               '--port', str(port), '--log-level', 'warning']
+    latencies, errors = run(command, port, args, env)
+    summarize('uvicorn + async API', latencies, errors, args.seconds)
+
+
+if __name__ == '__main__':
+    main()
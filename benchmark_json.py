@@ -0,0 +1,59 @@
+"""Compare JSON payload size and encode time for the dashboard report list.
+
+Encodes the same N report rows as:
+  - dict per row with the stdlib json module (Flask's old default)
+  - dict per row with serialization.dumps (orjson/msgspec when installed)
+  - columnar payload with serialization.dumps
+
+Usage:
+    python benchmark_json.py [rows] [repeats]
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+import serialization
+
+FIELDS = ('id', 'created_at', 'category', 'title')
+CATEGORIES = ['Produksi', 'Quality Check', 'Maintenance', 'Meeting', 'Training', 'Problem']
+
+
+def sample_rows(count):
+    start = datetime(2024, 1, 1)
+    return [
+        (i, (start + timedelta(minutes=7 * i)).strftime('%Y-%m-%d %H:%M:%S'),
+         CATEGORIES[i % len(CATEGORIES)], f'Line {i % 12} check, shift {i % 3 + 1}')
+        for i in range(1, count + 1)
+    ]
+
+
+def measure(encode, build, repeats):
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        payload = encode(build())
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return len(payload), best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    rows = sample_rows(count)
+
+    cases = [
+        ('rows + json (stdlib)', serialization.stdlib_dumps, lambda: serialization.rows_to_dicts(rows, FIELDS)),
+        (f'rows + {serialization.BACKEND}', serialization.dumps, lambda: serialization.rows_to_dicts(rows, FIELDS)),
+        (f'columnar + {serialization.BACKEND}', serialization.dumps, lambda: serialization.columnar(rows, FIELDS)),
+    ]
+    print(f"{count} rows, best of {repeats} (build + encode)")
+    baseline = None
+    for name, encode, build in cases:
+        size, seconds = measure(encode, build, repeats)
+        baseline = baseline or (size, seconds)
+        print(f"  {name:<24} {size / 1024:>9.1f} KiB  {seconds * 1000:>8.1f} ms  "
+              f"({size / baseline[0]:.0%} size, {baseline[1] / seconds:.1f}x speed)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Peak Python memory per request of the report list pages.
+
+/dashboard and /monitoring/<user_id> now read their report tables as
+projections (report_query.rows with a notes preview) instead of full Report
+objects with their notes. For comparison each page is also requested with
+report_query.rows swapped for the previous loading (every column of every
+matching Report object, notes included), rendering the same template.
+
+Seeds one operator with --reports reports carrying --notes-size characters of
+notes on a throwaway SQLite database, requests each page --requests times per
+variant through the Flask test client and prints the tracemalloc peak and
+latency per request.
+
+Usage:
+    python benchmark_list_memory.py [--reports 5000] [--notes-size 2000] [--requests 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BATCH_SIZE = 5000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reports', type=int, default=5000)
+    parser.add_argument('--notes-size', type=int, default=2000, help='characters of notes per report')
+    parser.add_argument('--requests', type=int, default=5, help='requests per page and variant')
+    return parser.parse_args()
+
+
+def create_bench_app(args):
+    os.environ['DATABASE_URL'] = f"sqlite:///{tempfile.mkdtemp()}/list_memory.db"
+    os.environ['ADMISSION_CONTROL'] = '0'
+    sys.path.insert(0, HERE)
+    from app import create_app
+    from models import db, User, Report
+
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        operator = User(employee_id='bench', name='Bench Operator', department='Produksi')
+        operator.set_password('bench123')
+        db.session.add(operator)
+        db.session.commit()
+        # All within the default 30-day monitoring range
+        now = datetime.utcnow()
+        step = timedelta(days=29) / max(args.reports, 1)
+        sentence = 'Checked the line, adjusted the feeder and logged the defects. '
+        notes = (sentence * (args.notes_size // len(sentence) + 1))[:args.notes_size]
+        for offset in range(0, args.reports, BATCH_SIZE):
+            db.session.execute(Report.__table__.insert(), [
+                {'user_id': operator.id, 'time': '08:00', 'category': 'Produksi', 'title': f'Report {i}',
+                 'notes': notes, 'item_name': f'Item {i % 200}', 'part_number': f'P{i % 200:04d}',
+                 'customer': 'Customer', 'created_at': now - step * i}
+                for i in range(offset, min(offset + BATCH_SIZE, args.reports))
+            ])
+        db.session.commit()
+        operator_id = operator.id
+    return app, operator_id
+
+
+def previous_rows(filters, fields):
+    """The loading the list pages used before: full Report objects, notes included."""
+    import report_archive
+    import report_query
+    from sqlalchemy.orm import undefer
+    start_utc, _ = report_query.utc_range(filters)
+    reports = []
+    for model in report_archive.sources(start_utc):
+        reports.extend(model.query.options(undefer(model.notes)).filter(
+            *report_query.filter_clauses(model, filters)).all())
+    return reports
+
+
+def measure(client, path, requests):
+    peaks, latencies = [], []
+    for _ in range(requests):
+        tracemalloc.reset_peak()
+        started = time.perf_counter()
+        response = client.get(path)
+        latencies.append(time.perf_counter() - started)
+        _, peak = tracemalloc.get_traced_memory()
+        if response.status_code != 200:
+            raise SystemExit(f"{path} answered {response.status_code}")
+        peaks.append(peak)
+    return statistics.median(peaks), statistics.median(latencies)
+
+
+def main():
+    args = parse_args()
+    print(f"Seeding {args.reports:,} reports with {args.notes_size:,} characters of notes...")
+    app, operator_id = create_bench_app(args)
+    import report_query
+    current_rows = report_query.rows
+
+    operator = app.test_client()
+    operator.post('/login', data={'employee_id': 'bench', 'password': 'bench123'})
+    admin = app.test_client()
+    admin.post('/login', data={'employee_id': 'admin', 'password': 'admin123'})
+    pages = (('dashboard', '/dashboard', operator), ('monitoring user', f'/monitoring/{operator_id}', admin))
+
+    tracemalloc.start()
+    # Latencies include the tracemalloc overhead
+    print(f"\n{'page':<16} {'previous':>12} {'projection':>12} {'reduction':>10} {'latency':>22}")
+    for label, path, client in pages:
+        client.get(path)  # warm caches and templates
+        report_query.rows = previous_rows
+        try:
+            previous_peak, previous_latency = measure(client, path, args.requests)
+        finally:
+            report_query.rows = current_rows
+        peak, latency = measure(client, path, args.requests)
+        print(f"{label:<16} {previous_peak / 2**20:9.1f} MiB {peak / 2**20:9.1f} MiB "
+              f"{(1 - peak / previous_peak) * 100:9.0f}% {previous_latency * 1000:8.0f} -> {latency * 1000:5.0f} ms")
+    tracemalloc.stop()
+
+
+if __name__ == '__main__':
+    main()
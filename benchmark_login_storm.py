@@ -0,0 +1,151 @@
+"""Load benchmark: other routes while a login storm is running.
+
+Starts the app under waitress on a throwaway SQLite database seeded with
+operators whose hashes use cheap legacy parameters (so every first login also
+exercises the re-hash upgrade), then measures /api/items/search throughput and
+latency, first alone and then while login threads hammer /login.
+
+Usage:
+    python benchmark_login_storm.py [--users 300] [--seconds 10] [--login-threads 32]
+                                    [--server-threads 16] [--unbounded]
+
+--unbounded lets every server thread hash at once (the old behaviour) for comparison.
+"""
+import argparse
+import http.client
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+LEGACY_METHOD = 'pbkdf2:sha256:1000'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=300)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--login-threads', type=int, default=32)
+    parser.add_argument('--other-threads', type=int, default=4)
+    parser.add_argument('--server-threads', type=int, default=16)
+    parser.add_argument('--unbounded', action='store_true')
+    return parser.parse_args()
+
+
+def start_server(args):
+    os.environ['DATABASE_URL'] = f"sqlite:///{tempfile.mkdtemp()}/login_storm.db"
+    if args.unbounded:
+        os.environ['PASSWORD_HASH_WORKERS'] = str(args.server_threads)
+        os.environ['PASSWORD_HASH_QUEUE_LIMIT'] = '100000'
+    from waitress.server import create_server
+    from werkzeug.security import generate_password_hash
+    from app import create_app
+    from models import db, User, ItemLibrary
+
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        legacy_hash = generate_password_hash('operator123', LEGACY_METHOD)
+        db.session.execute(User.__table__.insert(), [
+            {'name': f'Operator {i}', 'employee_id': f'op{i:04d}', 'password_hash': legacy_hash,
+             'department': 'Production', 'shift': str(i % 3 + 1)}
+            for i in range(args.users)
+        ])
+        db.session.execute(ItemLibrary.__table__.insert(), [
+            {'item_name': f'Item {i}', 'part_number': f'P{i:05d}', 'customer': f'Customer {i % 20}'}
+            for i in range(2000)
+        ])
+        db.session.commit()
+
+    logging.getLogger('waitress.queue').setLevel(logging.ERROR)  # expected to back up during the storm
+    server = create_server(app, host='127.0.0.1', port=0, threads=args.server_threads)
+    threading.Thread(target=server.run, daemon=True).start()
+    return server.effective_port
+
+
+def request(port, method, path, body=None, cookie=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    headers = {'Content-Type': 'application/x-www-form-urlencoded'} if body else {}
+    if cookie:
+        headers['Cookie'] = cookie
+    started = time.perf_counter()
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    response.read()
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return response, elapsed
+
+
+def login(port, employee_id, password='operator123'):
+    body = urlencode({'employee_id': employee_id, 'password': password})
+    return request(port, 'POST', '/login', body=body)
+
+
+def run_others(port, cookie, threads, stop, latencies):
+    def worker(n):
+        i = n
+        while not stop.is_set():
+            _, elapsed = request(port, 'GET', f'/api/items/search?q=Item%20{i % 100}', cookie=cookie)
+            latencies.append(elapsed)
+            i += threads
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for worker_thread in workers:
+        worker_thread.start()
+    return workers
+
+
+def run_logins(port, users, threads, stop, outcomes):
+    counter = iter(range(10 ** 9))
+
+    def worker():
+        while not stop.is_set():
+            i = next(counter) % users
+            response, elapsed = login(port, f'op{i:04d}')
+            outcomes.append((response.status, elapsed))
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for worker_thread in workers:
+        worker_thread.start()
+    return workers
+
+
+def summarize(label, latencies, seconds):
+    if not latencies:
+        print(f"  {label}: no requests completed")
+        return
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"  {label}: {len(latencies) / seconds:7.1f} req/s  "
+          f"p50 {statistics.median(ordered) * 1000:6.1f} ms  p95 {p95 * 1000:6.1f} ms")
+
+
+def main():
+    args = parse_args()
+    port = start_server(args)
+    response, _ = login(port, 'admin', 'admin123')
+    cookie = response.getheader('Set-Cookie').split(';', 1)[0]
+    mode = 'unbounded hashing' if args.unbounded else 'bounded hashing pool'
+    print(f"Login storm benchmark ({mode}, {args.server_threads} server threads, {args.users} operators)")
+
+    for label, login_threads in (('search only', 0), ('search during login storm', args.login_threads)):
+        stop = threading.Event()
+        latencies, outcomes = [], []
+        workers = run_others(port, cookie, args.other_threads, stop, latencies)
+        workers += run_logins(port, args.users, login_threads, stop, outcomes)
+        time.sleep(args.seconds)
+        stop.set()
+        for worker_thread in workers:
+            worker_thread.join()
+        summarize(label, latencies, args.seconds)
+        if outcomes:
+            ok = [elapsed for status, elapsed in outcomes if status == 302]
+            busy = sum(1 for status, _ in outcomes if status == 503)
+            summarize('logins accepted', ok, args.seconds)
+            print(f"  logins rejected with 503: {busy}, other: {len(outcomes) - len(ok) - busy}")
+
+
+if __name__ == '__main__':
+    main()
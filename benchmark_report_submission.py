@@ -0,0 +1,169 @@
+"""Report submissions per second: single transaction vs the previous sequence.
+
+POST /report/new now upserts the item, inserts the report and its audit row in
+one transaction and takes the category color from memory. For comparison the
+benchmark app also gets /bench/legacy-report, the sequence it replaced
+(item lookup, insert and lookup again, report commit, audit log commit,
+category query). Both are posted through the Flask test client from
+--threads threads for --seconds each, half of them with an item that is
+already in the library and half with a new one.
+
+Prints submissions per second, p50/p95 latency, and statements and commits
+per submission. Runs on a throwaway SQLite database, and also on Postgres
+when --postgres is given (use an empty scratch database: tables are created
+and test rows written).
+
+Usage:
+    python benchmark_report_submission.py [--seconds 10] [--threads 4] [--postgres postgresql://...]
+"""
+import argparse
+import itertools
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--postgres', default='', help='database URL of an empty Postgres database')
+    return parser.parse_args()
+
+
+def create_bench_app(database_url):
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['ADMISSION_CONTROL'] = '0'
+    sys.path.insert(0, HERE)
+    from flask import request
+    from flask_login import login_required, current_user
+    from sqlalchemy import event, func
+    from app import create_app
+    from cache import cache
+    from item_library import insert_ignore, normalize_triple
+    from models import db, Report, AuditLog, Category, ItemLibrary
+    import category_lookup
+
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    def lookup(item_name, part_number, customer):
+        return ItemLibrary.query.filter(
+            ItemLibrary.item_name == item_name,
+            func.coalesce(ItemLibrary.part_number, '') == (part_number or ''),
+            func.coalesce(ItemLibrary.customer, '') == (customer or '')
+        ).first()
+
+    @app.route('/bench/legacy-report', methods=['POST'])
+    @login_required
+    def legacy_report():
+        """The submission sequence before it became one transaction."""
+        form = request.form
+        item_name, part_number, customer = normalize_triple(form.get('item_name'), form.get('part_number'),
+                                                            form.get('customer'))
+        item = lookup(item_name, part_number, customer)
+        if item is None:
+            insert_ignore([(item_name, part_number, customer)])
+            item = lookup(item_name, part_number, customer)
+        report = Report(user_id=current_user.id, time=form['time'], category=form['category'],
+                        category_id=category_lookup.category_id(form['category']), title=form['title'],
+                        notes='', item_name=item_name, part_number=part_number, customer=customer,
+                        item_id=item.id)
+        db.session.add(report)
+        db.session.commit()
+        cache.bump('reports')
+        db.session.add(AuditLog(user_id=current_user.id, actor_id=current_user.id, action='report_created',
+                                detail=f'Report #{report.id}: {report.title}'))
+        db.session.commit()
+        category = Category.query.filter_by(name=form['category']).first()
+        return {'success': True, 'report_id': report.id, 'category_color': category.color}
+
+    counters = {'statements': 0, 'commits': 0}
+    with app.app_context():
+        db.session.execute(ItemLibrary.__table__.insert(), [
+            {'item_name': f'Item {i}', 'part_number': f'P{i:05d}', 'customer': 'Customer'} for i in range(1000)
+        ])
+        db.session.commit()
+
+        def count_statement(*args):
+            counters['statements'] += 1
+
+        def count_commit(*args):
+            counters['commits'] += 1
+        event.listen(db.engine, 'before_cursor_execute', count_statement)
+        event.listen(db.engine, 'commit', count_commit)
+    return app, counters
+
+
+def run(app, counters, path, args, new_items):
+    latencies, failures = [], []
+    stop = threading.Event()
+    lock = threading.Lock()
+
+    def worker(n):
+        client = app.test_client()
+        client.post('/login', data={'employee_id': 'admin', 'password': 'admin123'})
+        i = n
+        while not stop.is_set():
+            # Every other submission names an item that is not in the library yet
+            item = f'New {next(new_items)}' if i % 2 else f'Item {i % 1000}'
+            part_number = '' if i % 2 else f'P{i % 1000:05d}'
+            data = {'time': '08:00', 'category': 'Produksi', 'title': 'Benchmark', 'item_name': item,
+                    'part_number': part_number, 'customer': 'Customer'}
+            started = time.perf_counter()
+            response = client.post(path, data=data)
+            elapsed = time.perf_counter() - started
+            with lock:
+                (latencies if response.status_code == 200 else failures).append(elapsed)
+            i += args.threads
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(1)  # logins done
+    before = dict(counters)
+    count_before = len(latencies)
+    started = time.perf_counter()
+    time.sleep(args.seconds)
+    elapsed = time.perf_counter() - started
+    count = len(latencies) - count_before
+    after = dict(counters)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    measured = sorted(latencies[count_before:count_before + count])
+    return {
+        'rate': count / elapsed,
+        'p50': statistics.median(measured) if measured else 0.0,
+        'p95': measured[int(len(measured) * 0.95) - 1] if measured else 0.0,
+        # Includes the user load done by login_required
+        'statements': (after['statements'] - before['statements']) / max(count, 1),
+        'commits': (after['commits'] - before['commits']) / max(count, 1),
+        'failures': len(failures),
+    }
+
+
+def main():
+    args = parse_args()
+    backends = [('SQLite', f"sqlite:///{tempfile.mkdtemp()}/submissions.db")]
+    if args.postgres:
+        backends.append(('Postgres', args.postgres))
+    new_items = itertools.count()
+    print(f"Report submissions, {args.threads} threads, {args.seconds:.0f}s per run")
+    for label, database_url in backends:
+        app, counters = create_bench_app(database_url)
+        print(f"\n{label}")
+        for name, path in (('previous sequence', '/bench/legacy-report'), ('single transaction', '/report/new')):
+            result = run(app, counters, path, args, new_items)
+            print(f"  {name:<19} {result['rate']:7.1f} submissions/s  p50 {result['p50'] * 1000:6.1f} ms  "
+                  f"p95 {result['p95'] * 1000:6.1f} ms  {result['statements']:4.1f} statements  "
+                  f"{result['commits']:3.1f} commits per submission  failures {result['failures']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,331 @@
+"""Shift-start load test: virtual operators and admins against a local server.
+
+Seeds a throwaway SQLite database (operators, item library, a month of report
+history), then for each configuration starts ``python wsgi.py`` (waitress) on a
+fresh copy of it and replays the first minutes of a shift:
+
+- operators arrive spread over ``--ramp`` seconds, log in, load the dashboard
+  and then repeat: type an item name (one /api/items/search per keystroke,
+  starting with the empty-field lookup) and submit a report
+- a few admins log in and keep reloading /monitoring (30-day or one-year
+  ranges) and the department drill-down
+
+For every step it prints request count, error rate (503s counted separately),
+and p50/p95/p99/max latency, plus overall throughput.
+
+Configurations are ``current`` (the environment as it is) and ``optimized``
+(pre-forked workers, shared result cache, admission control and, with NumPy
+installed, the columnar engine); --env KEY=VALUE adds overrides to every run.
+
+Usage:
+    python benchmark_shift_start.py [--operators 100] [--admins 2] [--seconds 60] [--ramp 15]
+                                    [--configs current,optimized] [--env KEY=VALUE ...]
+"""
+import argparse
+import http.client
+import importlib.util
+import os
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from urllib.parse import quote, urlencode
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PASSWORD = 'operator123'
+CATEGORIES = ('Produksi', 'Quality Check', 'Maintenance', 'Problem')
+SHIFTS = ('Pagi', 'Siang', 'Malam')
+DEPARTMENTS = ('Production', 'Quality', 'Warehouse', 'Maintenance')
+ITEMS = 2000
+STEPS = ('login', 'dashboard', 'item search', 'submit report', 'monitoring', 'drilldown')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--operators', type=int, default=100)
+    parser.add_argument('--admins', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=60)
+    parser.add_argument('--ramp', type=float, default=15, help='seconds over which operators arrive')
+    parser.add_argument('--think', type=float, default=2.0, help='mean pause between reports (seconds)')
+    parser.add_argument('--reports', type=int, default=50000, help='historical reports to seed')
+    parser.add_argument('--server-threads', type=int, default=16)
+    parser.add_argument('--configs', default='current,optimized')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE')
+    return parser.parse_args()
+
+
+def configurations(work_dir):
+    """Environment overrides per configuration name."""
+    optimized = {
+        'WAITRESS_WORKERS': str(max(2, min(4, os.cpu_count() or 1))),
+        'RESULT_CACHE_ENABLED': '1',
+        'RESULT_CACHE_STORE': os.path.join(work_dir, 'result_cache.db'),
+        'FRAGMENT_CACHE_ENABLED': '1',
+        'ADMISSION_CONTROL': '1',
+    }
+    if importlib.util.find_spec('numpy') is not None:
+        optimized['ANALYTICS_ENGINE'] = '1'
+    return {'current': {}, 'optimized': optimized}
+
+
+def seed(path, args):
+    """Create the template database: operators, item library and report history."""
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    sys.path.insert(0, HERE)
+    from werkzeug.security import generate_password_hash
+    from app import create_app
+    from models import db, User, Report, ItemLibrary, Category
+
+    app = create_app()
+    with app.app_context():
+        password_hash = generate_password_hash(PASSWORD, app.config['PASSWORD_HASH_METHOD'])
+        db.session.execute(User.__table__.insert(), [
+            {'name': f'Operator {i}', 'employee_id': f'op{i:04d}', 'password_hash': password_hash,
+             'department': DEPARTMENTS[i % len(DEPARTMENTS)], 'section': f'Line {i % 8}',
+             'shift': SHIFTS[i % len(SHIFTS)]}
+            for i in range(args.operators)
+        ])
+        db.session.execute(ItemLibrary.__table__.insert(), [
+            {'item_name': f'Item {i}', 'part_number': f'P{i:05d}', 'customer': f'Customer {i % 20}'}
+            for i in range(ITEMS)
+        ])
+        db.session.commit()
+        user_ids = [row[0] for row in db.session.query(User.id).filter(User.employee_id.like('op%'))]
+        item_ids = [row[0] for row in db.session.query(ItemLibrary.id).order_by(ItemLibrary.id)]
+        category_ids = dict(db.session.query(Category.name, Category.id))
+        rng = random.Random(1)
+        start = datetime.utcnow() - timedelta(days=30)
+        step = timedelta(days=30) / max(args.reports, 1)
+        for offset in range(0, args.reports, 10000):
+            rows = []
+            for i in range(offset, min(offset + 10000, args.reports)):
+                item = min(int(rng.paretovariate(1.2)) - 1, ITEMS - 1)
+                category = CATEGORIES[i % len(CATEGORIES)]
+                rows.append({
+                    'user_id': user_ids[i % len(user_ids)], 'time': '08:00', 'category': category,
+                    'category_id': category_ids.get(category), 'title': f'Report {i}', 'notes': '',
+                    'item_name': f'Item {item}', 'part_number': f'P{item:05d}', 'customer': f'Customer {item % 20}',
+                    'item_id': item_ids[item], 'created_at': start + step * i,
+                })
+            db.session.execute(Report.__table__.insert(), rows)
+        db.session.commit()
+        db.engine.dispose()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def request(port, method, path, body=None, cookie=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    headers = {}
+    if body:
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+    if cookie:
+        headers['Cookie'] = cookie
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    data = response.read()
+    conn.close()
+    return response, data
+
+
+def wait_for(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            request(port, 'GET', '/login')
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+class Recorder:
+    """Latency, status and errors per step."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)  # unexpected status or no response
+        self.dropped = defaultdict(int)  # no response (connection failed)
+        self.busy = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def timed(self, step, port, method, path, body=None, cookie=None, expect=200):
+        started = time.perf_counter()
+        try:
+            response, data = request(port, method, path, body=body, cookie=cookie)
+        except OSError:
+            with self.lock:
+                self.errors[step] += 1
+                self.dropped[step] += 1
+            return None, b''
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.latencies[step].append(elapsed)
+            if response.status == 503:
+                self.busy[step] += 1
+            elif response.status != expect:
+                self.errors[step] += 1
+        return response, data
+
+
+def login(recorder, port, employee_id, password):
+    response, page = request(port, 'GET', '/login')
+    cookie = response.getheader('Set-Cookie').split(';', 1)[0]
+    token = re.search(rb'name="csrf_token" type="hidden" value="([^"]+)"', page).group(1).decode()
+    body = urlencode({'csrf_token': token, 'employee_id': employee_id, 'password': password})
+    response, _ = recorder.timed('login', port, 'POST', '/login', body=body, cookie=cookie, expect=302)
+    if response is None or response.status != 302:
+        return None
+    return response.getheader('Set-Cookie').split(';', 1)[0]
+
+
+def operator(recorder, port, number, args, stop):
+    rng = random.Random(number)
+    time.sleep(rng.uniform(0, args.ramp))
+    cookie = None
+    while cookie is None and not stop.is_set():
+        cookie = login(recorder, port, f'op{number:04d}', PASSWORD)
+        if cookie is None:
+            time.sleep(1)
+    if stop.is_set():
+        return
+    recorder.timed('dashboard', port, 'GET', '/dashboard', cookie=cookie)
+    favourites = [min(int(rng.paretovariate(1.2)) - 1, ITEMS - 1) for _ in range(5)]
+    while not stop.is_set():
+        item = rng.choice(favourites) if rng.random() < 0.8 else rng.randrange(ITEMS)
+        name = f'Item {item}'
+        # Focus (empty field) then one lookup per keystroke past the debounce
+        for length in [0] + list(range(3, len(name) + 1)):
+            if stop.is_set():
+                return
+            recorder.timed('item search', port, 'GET', f'/api/items/search?q={quote(name[:length])}', cookie=cookie)
+            time.sleep(rng.uniform(0.2, 0.4))
+        body = urlencode({
+            'time': datetime.now().strftime('%H:%M'), 'category': rng.choice(CATEGORIES),
+            'title': f'Check {name}', 'notes': '', 'item_name': name,
+            'part_number': f'P{item:05d}', 'customer': f'Customer {item % 20}',
+        })
+        recorder.timed('submit report', port, 'POST', '/report/new', body=body, cookie=cookie)
+        stop.wait(rng.expovariate(1 / args.think))
+
+
+def admin(recorder, port, number, stop):
+    rng = random.Random(-number - 1)
+    cookie = login(recorder, port, 'admin', 'admin123')
+    if cookie is None:
+        return
+    today = (datetime.utcnow() + timedelta(hours=7)).date()
+    while not stop.is_set():
+        days = rng.choice((30, 30, 365))
+        start = (today - timedelta(days=days - 1)).isoformat()
+        recorder.timed('monitoring', port, 'GET', f'/monitoring?start_date={start}&end_date={today}', cookie=cookie)
+        recorder.timed('drilldown', port, 'GET',
+                       f'/api/monitoring/drilldown?level=department&start_date={start}&end_date={today}',
+                       cookie=cookie)
+        stop.wait(rng.uniform(1, 3))
+
+
+def run(name, overrides, template, work_dir, args):
+    database = os.path.join(work_dir, f'{name}.db')
+    shutil.copy(template, database)
+    port = free_port()
+    env = dict(os.environ, **overrides, DATABASE_URL=f'sqlite:///{database}', PORT=str(port),
+               HOST='127.0.0.1', WAITRESS_THREADS=str(args.server_threads))
+    for item in args.env:
+        key, _, value = item.partition('=')
+        env[key] = value
+    server = subprocess.Popen([sys.executable, 'wsgi.py'], cwd=HERE, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(port)
+        recorder = Recorder()
+        stop = threading.Event()
+        clients = [threading.Thread(target=operator, args=(recorder, port, i, args, stop))
+                   for i in range(args.operators)]
+        clients += [threading.Thread(target=admin, args=(recorder, port, i, stop)) for i in range(args.admins)]
+        started = time.perf_counter()
+        for thread in clients:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in clients:
+            thread.join()
+        return recorder, time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def report(name, overrides, recorder, elapsed):
+    settings = ', '.join(f'{k}={v}' for k, v in overrides.items()) or 'environment as is'
+    print(f"\n[{name}] {settings}")
+    print(f"  {'step':<14}{'requests':>9}{'req/s':>8}{'errors':>8}{'503':>6}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    total = errors = 0
+    summary = {}
+    for step in STEPS:
+        ordered = sorted(recorder.latencies[step])
+        count = len(ordered) + recorder.dropped[step]
+        total += len(ordered)
+        errors += recorder.errors[step] + recorder.busy[step]
+        if not ordered:
+            continue
+        summary[step] = percentile(ordered, 0.95)
+        print(f"  {step:<14}{len(ordered):>9}{len(ordered) / elapsed:>8.1f}"
+              f"{recorder.errors[step] / count:>7.1%} {recorder.busy[step]:>5}"
+              f"{percentile(ordered, 0.5) * 1000:>9.1f}{summary[step] * 1000:>9.1f}"
+              f"{percentile(ordered, 0.99) * 1000:>9.1f}{ordered[-1] * 1000:>9.1f}")
+    submitted = len(recorder.latencies['submit report']) - recorder.errors['submit report']
+    print(f"  throughput: {total / elapsed:.1f} req/s, {submitted / elapsed:.1f} reports/s, "
+          f"error rate {errors / max(total, 1):.2%}")
+    return summary
+
+
+def main():
+    args = parse_args()
+    work_dir = tempfile.mkdtemp(prefix='shift_start_')
+    template = os.path.join(work_dir, 'template.db')
+    print(f"Seeding {args.operators} operators, {ITEMS} items and {args.reports} reports...")
+    seed(template, args)
+    available = configurations(work_dir)
+    names = [name.strip() for name in args.configs.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        sys.exit(f"Unknown configuration(s): {', '.join(unknown)} (choose from {', '.join(available)})")
+
+    print(f"Shift start: {args.operators} operators (arriving over {args.ramp:.0f}s) and {args.admins} admins "
+          f"for {args.seconds:.0f}s, {args.server_threads} server threads, {os.cpu_count()} cores")
+    results = {}
+    for name in names:
+        recorder, elapsed = run(name, available[name], template, work_dir, args)
+        results[name] = report(name, available[name], recorder, elapsed)
+
+    if len(results) > 1:
+        first, *others = names
+        print(f"\np95 speed-up over {first} (above 1 is faster):")
+        for step in STEPS:
+            if step not in results[first]:
+                continue
+            ratios = [f"{name} {results[first][step] / results[name][step]:.2f}x"
+                      for name in others if results[name].get(step)]
+            print(f"  {step:<14}{', '.join(ratios)}")
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
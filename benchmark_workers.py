@@ -0,0 +1,150 @@
+"""Throughput of the CPU-bound monitoring page for different worker counts.
+
+Seeds a throwaway SQLite database, then for each worker count starts
+``python wsgi.py`` with WAITRESS_WORKERS=N and hits /monitoring from client
+threads for a fixed time. Throughput should scale with the worker count up to
+the number of cores.
+
+Usage:
+    python benchmark_workers.py [--workers 1,2,4,8] [--seconds 10] [--clients 16]
+"""
+import argparse
+import http.client
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--reports', type=int, default=20000)
+    parser.add_argument('--path', default='/monitoring')
+    return parser.parse_args()
+
+
+def seed(database_url, report_count):
+    os.environ['DATABASE_URL'] = database_url
+    sys.path.insert(0, HERE)
+    from app import create_app
+    from models import db, User, Report
+
+    app = create_app()
+    with app.app_context():
+        db.session.execute(User.__table__.insert(), [
+            {'name': f'Operator {i}', 'employee_id': f'op{i:04d}', 'department': 'Production'}
+            for i in range(200)
+        ])
+        user_ids = [row[0] for row in db.session.query(User.id)]
+        start = datetime.utcnow() - timedelta(days=30)
+        categories = ['Produksi', 'Quality Check', 'Maintenance', 'Meeting', 'Training', 'Problem']
+        db.session.execute(Report.__table__.insert(), [
+            {'user_id': user_ids[i % len(user_ids)], 'time': '08:00', 'category': categories[i % 6],
+             'title': f'Report {i}', 'notes': '', 'item_name': f'Item {i % 300}',
+             'created_at': start + timedelta(minutes=2 * i)}
+            for i in range(report_count)
+        ])
+        db.session.commit()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def request(port, method, path, body=None, cookie=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    headers = {}
+    if body:
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+    if cookie:
+        headers['Cookie'] = cookie
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    data = response.read()
+    conn.close()
+    return response, data
+
+
+def login(port):
+    response, page = request(port, 'GET', '/login')
+    cookie = response.getheader('Set-Cookie').split(';', 1)[0]
+    token = re.search(rb'name="csrf_token" type="hidden" value="([^"]+)"', page).group(1).decode()
+    body = urlencode({'csrf_token': token, 'employee_id': 'admin', 'password': 'admin123'})
+    response, _ = request(port, 'POST', '/login', body=body, cookie=cookie)
+    return response.getheader('Set-Cookie').split(';', 1)[0]
+
+
+def wait_for(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            request(port, 'GET', '/login')
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+def run(workers, args, env):
+    port = free_port()
+    env = dict(env, PORT=str(port), HOST='127.0.0.1', WAITRESS_WORKERS=str(workers))
+    server = subprocess.Popen([sys.executable, 'wsgi.py'], cwd=HERE, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(port)
+        cookie = login(port)
+        latencies = []
+        stop = threading.Event()
+
+        def client():
+            while not stop.is_set():
+                started = time.perf_counter()
+                response, _ = request(port, 'GET', args.path, cookie=cookie)
+                if response.status == 200:
+                    latencies.append(time.perf_counter() - started)
+
+        clients = [threading.Thread(target=client) for _ in range(args.clients)]
+        for thread in clients:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in clients:
+            thread.join()
+        return len(latencies) / args.seconds, statistics.median(latencies) if latencies else 0
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+def main():
+    args = parse_args()
+    database_url = f"sqlite:///{tempfile.mkdtemp()}/workers.db"
+    seed(database_url, args.reports)
+    env = dict(os.environ, DATABASE_URL=database_url, RESULT_CACHE_ENABLED='0', FRAGMENT_CACHE_ENABLED='0')
+
+    print(f"GET {args.path} with {args.clients} clients for {args.seconds:.0f}s "
+          f"({os.cpu_count()} cores, caches off)")
+    baseline = None
+    for workers in [int(n) for n in args.workers.split(',')]:
+        throughput, median = run(workers, args, env)
+        baseline = baseline or throughput
+        print(f"  {workers:>2} worker(s): {throughput:7.1f} req/s  p50 {median * 1000:7.1f} ms  "
+              f"({throughput / baseline:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""Result cache for expensive aggregate queries (monitoring summary, per-user stats).
+
+Two tiers:
+- an in-process LRU bounded by the approximate pickled size of its entries
+- an optional shared SQLite store so several worker processes reuse results
+
+Keys carry data versions. Report writes bump the ``reports`` version so open
+date ranges are recomputed; ranges that closed before the 2-day edit window
+only depend on the ``history`` version, which is bumped by destructive admin
+actions (e.g. deleting a user and their reports), so they stay cached.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+# Reports older than this can no longer be edited or deleted by their owner
+EDIT_WINDOW = timedelta(days=2)
+
+
+class LRUCache:
+    """Thread-safe LRU evicting least recently used entries past max_bytes."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, max_entries=10000):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            self._data.move_to_end(key)
+            return True, entry[0]
+
+    def set(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (value, size)
+            self._bytes += size
+            while self._data and (self._bytes > self.max_bytes or len(self._data) > self.max_entries):
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+
+class SQLiteStore:
+    """Shared on-disk store for cached results and data versions."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache_entry ('
+            'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+            'reports_version INTEGER, created_at REAL NOT NULL)'
+        )
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache_version ('
+            'name TEXT PRIMARY KEY, value INTEGER NOT NULL)'
+        )
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def after_fork(self):
+        """Drop connections inherited from the parent process."""
+        self._local = threading.local()
+
+    def get(self, key):
+        row = self._conn().execute('SELECT value FROM cache_entry WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, blob, reports_version=None):
+        conn = self._conn()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache_entry (key, value, reports_version, created_at) VALUES (?, ?, ?, ?)',
+            (key, blob, reports_version, time.time())
+        )
+        conn.commit()
+
+    def get_version(self, name):
+        row = self._conn().execute('SELECT value FROM cache_version WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else 0
+
+    def bump_version(self, name):
+        conn = self._conn()
+        conn.execute(
+            'INSERT INTO cache_version (name, value) VALUES (?, 1) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + 1',
+            (name,)
+        )
+        conn.commit()
+        return self.get_version(name)
+
+    def purge(self, reports_version=None):
+        """Drop entries keyed to an older reports version (or everything)."""
+        conn = self._conn()
+        if reports_version is None:
+            conn.execute('DELETE FROM cache_entry')
+        else:
+            conn.execute(
+                'DELETE FROM cache_entry WHERE reports_version IS NOT NULL AND reports_version < ?',
+                (reports_version,)
+            )
+        conn.commit()
+
+
+class ResultCache:
+    """Two-tier cache for aggregate results keyed by view, filters and data version."""
+
+    def __init__(self):
+        self.lru = LRUCache()
+        self.store = None
+        self.enabled = True
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.store_hits = 0
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RESULT_CACHE_ENABLED', True)
+        self.lru = LRUCache(
+            max_bytes=app.config.get('RESULT_CACHE_MAX_BYTES', 32 * 1024 * 1024),
+            max_entries=app.config.get('RESULT_CACHE_MAX_ENTRIES', 10000),
+        )
+        store_path = app.config.get('RESULT_CACHE_STORE')
+        if store_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(store_path)), exist_ok=True)
+                self.store = SQLiteStore(store_path)
+            except Exception as exc:
+                app.logger.error(f"Result cache store unavailable, using in-process cache only: {exc}")
+                self.store = None
+        app.extensions['result_cache'] = self
+
+    def after_fork(self):
+        """Reset per-process state in a forked worker (see prefork.py)."""
+        self._lock = threading.Lock()
+        if self.store is not None:
+            self.store.after_fork()
+
+    # --- data versions ---
+
+    def version(self, name):
+        if self.store is not None:
+            try:
+                return self.store.get_version(name)
+            except sqlite3.Error:
+                pass
+        return self._versions.get(name, 0)
+
+    def bump(self, name):
+        """Invalidate entries depending on ``name`` ('reports', 'history', 'categories', 'users',
+        'analytics', the columnar engine's arrays, or 'items', the item library)."""
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+        if self.store is not None:
+            try:
+                new_version = self.store.bump_version(name)
+                if name == 'history':
+                    self.store.purge()
+                elif new_version % 100 == 0:
+                    self.store.purge(new_version)
+            except sqlite3.Error:
+                pass
+        if name == 'history':
+            self.lru.clear()
+
+    # --- keys ---
+
+    def make_key(self, view, user_id=None, start_utc=None, end_utc=None, item=None, now=None):
+        """Build a key for an aggregate over [start_utc, end_utc).
+
+        Returns (key, reports_version); reports_version is None for closed ranges.
+        """
+        now = now or datetime.utcnow()
+        closed = end_utc is not None and end_utc <= now - EDIT_WINDOW
+        reports_version = None if closed else self.version('reports')
+        parts = [
+            view,
+            '' if user_id is None else str(user_id),
+            start_utc.isoformat() if start_utc else '',
+            end_utc.isoformat() if end_utc else '',
+            item or '',
+            f"h{self.version('history')}",
+            'closed' if closed else f'r{reports_version}',
+        ]
+        return '|'.join(parts), reports_version
+
+    # --- lookup ---
+
+    def get_or_compute(self, view, compute, user_id=None, start_utc=None, end_utc=None, item=None):
+        """Return the cached aggregate for the key, computing and storing it on a miss."""
+        if not self.enabled:
+            return compute()
+        key, reports_version = self.make_key(view, user_id, start_utc, end_utc, item)
+        return self._lookup(key, compute, reports_version)
+
+    def get_or_render(self, key, render):
+        """Cached template fragment for ``key`` (see fragment_cache.py)."""
+        if not self.enabled:
+            return render()
+        return self._lookup(f'fragment|{key}', render, self.version('reports'))
+
+    def _lookup(self, key, compute, reports_version):
+        found, value = self.lru.get(key)
+        if found:
+            self.hits += 1
+            return value
+        if self.store is not None:
+            try:
+                blob = self.store.get(key)
+            except sqlite3.Error:
+                blob = None
+            if blob is not None:
+                value = pickle.loads(blob)
+                self.lru.set(key, value, len(blob))
+                self.hits += 1
+                self.store_hits += 1
+                return value
+        self.misses += 1
+        value = compute()
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self.lru.set(key, value, len(blob))
+        if self.store is not None:
+            try:
+                self.store.set(key, blob, reports_version)
+            except sqlite3.Error:
+                pass
+        return value
+
+    def clear(self):
+        self.lru.clear()
+        if self.store is not None:
+            try:
+                self.store.purge()
+            except sqlite3.Error:
+                pass
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'store_hits': self.store_hits,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.lru.evictions,
+            'entries': len(self.lru),
+            'size_bytes': self.lru.size_bytes,
+            'max_bytes': self.lru.max_bytes,
+            'shared_store': self.store.path if self.store is not None else None,
+            'reports_version': self.version('reports'),
+            'history_version': self.version('history'),
+        }
+
+
+cache = ResultCache()
@@ -0,0 +1,119 @@
+"""Cached Category lookups for report writes, aggregations and display.
+
+Reports reference ``Category.id``; the ``category`` name string on Report is
+kept for compatibility. Aggregations group on the id and turn it into the
+current name at the end, so renaming a category only touches its own row.
+The id/name maps are cached per process and reloaded when the 'categories'
+data version changes (see cache.py) or after ``MAX_AGE``. The version is read
+once per request, since with a shared cache store each read is a query.
+"""
+import threading
+import time
+from flask import g, has_request_context
+from sqlalchemy import func, select
+from cache import cache
+from models import db, Category
+
+MAX_AGE = 60  # seconds; bounds staleness when processes don't share a cache store
+
+_lock = threading.Lock()
+_state = {'version': None, 'loaded_at': 0.0, 'ids': {}, 'names': {}, 'colors': {}}
+
+
+def _version():
+    if not has_request_context():
+        return cache.version('categories')
+    if 'categories_version' not in g:
+        g.categories_version = cache.version('categories')
+    return g.categories_version
+
+
+def _maps():
+    version = _version()
+    if _state['version'] != version or time.monotonic() - _state['loaded_at'] > MAX_AGE:
+        rows = db.session.query(Category.id, Category.name, Category.color).all()
+        with _lock:
+            _state.update(
+                version=version,
+                loaded_at=time.monotonic(),
+                ids={name: category_id for category_id, name, _ in rows},
+                names={category_id: name for category_id, name, _ in rows},
+                colors={name: color for _, name, color in rows},
+            )
+    return _state['ids'], _state['names']
+
+
+def invalidate():
+    """Call after adding, renaming or deleting a category."""
+    cache.bump('categories')
+    _state['version'] = None
+    if has_request_context():
+        g.pop('categories_version', None)
+
+
+def category_id(name):
+    """Category id for a name, or None for unknown names."""
+    if not name:
+        return None
+    ids, _ = _maps()
+    if name in ids:
+        return ids[name]
+    # Added by another process since the map was loaded
+    return db.session.query(Category.id).filter(Category.name == name).scalar()
+
+
+def color(name, default='secondary'):
+    """Badge color of a category by name."""
+    _maps()
+    return _state['colors'].get(name) or default
+
+
+def names_by_id():
+    """{category_id: current name}."""
+    return _maps()[1]
+
+
+def display_name(category_id, fallback=None):
+    """Current name of a report's category; ``fallback`` (the stored string) if unlinked."""
+    if category_id is None:
+        return fallback
+    return names_by_id().get(category_id, fallback)
+
+
+def by_name(counts):
+    """Re-key counts from category id (or name, for unlinked reports) to current name."""
+    names = names_by_id()
+    merged = {}
+    for key, count in counts.items():
+        name = names.get(key) if isinstance(key, int) else key
+        if name:
+            merged[name] = merged.get(name, 0) + count
+    return merged
+
+
+def backfill_category_ids(model, batch_size=5000):
+    """Set ``category_id`` from the category name on reports not linked yet.
+
+    Works through id ranges of ``batch_size`` and commits after each one.
+    Returns the number of reports updated.
+    """
+    table = model.__table__
+    category = Category.__table__
+    match = select(category.c.id).where(category.c.name == table.c.category).scalar_subquery()
+
+    low, high = db.session.query(func.min(table.c.id), func.max(table.c.id)).one()
+    if low is None:
+        return 0
+    updated = 0
+    while low <= high:
+        result = db.session.execute(table.update().where(
+            table.c.id >= low,
+            table.c.id < low + batch_size,
+            table.c.category_id.is_(None),
+            match.isnot(None),
+            table.c.category.isnot(None)
+        ).values(category_id=match))
+        db.session.commit()
+        updated += max(result.rowcount, 0)
+        low += batch_size
+    return updated
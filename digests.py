@@ -0,0 +1,227 @@
+"""Nightly per-department and per-user digests (static HTML and XLSX).
+
+:func:`collect` reads one GMT+7 day of reports in a single joined query and
+groups them by department. Each department is rendered in a worker process
+(no database access there, only plain rows), producing under
+``<out>/<YYYY-MM-DD>/<department>/``:
+
+- ``index.html``: totals, category split, per-user counts and all reports
+- ``<department>.xlsx``: the same as sheets
+- ``users/<employee_id>.html``: one page per user
+
+Runs are incremental: ``manifest.json`` keeps a fingerprint of each
+department's rows, and departments whose rows are unchanged (and whose files
+still exist) are skipped. Reports stay editable for 2 days, so re-running the
+job for a recent day only re-renders what was edited. Pages of users no longer
+in a re-rendered department, and directories of departments with no reports
+left that day, are removed.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from sqlalchemy import func, select
+
+import report_archive
+from models import db, User, Category, ItemLibrary
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+MANIFEST = 'manifest.json'
+NO_DEPARTMENT = 'No Department'
+FIELDS = ('id', 'user_id', 'user_name', 'employee_id', 'department', 'section', 'shift',
+          'time', 'category', 'title', 'notes', 'item_name', 'part_number', 'customer', 'created_at')
+
+
+def previous_day(now=None):
+    """Yesterday in GMT+7."""
+    return ((now or datetime.utcnow()) + timedelta(hours=7)).date() - timedelta(days=1)
+
+
+def slug(value):
+    """File-system safe, unique name for a department or employee id.
+
+    The hash suffix keeps names apart that sanitize alike ("R&D" and "R D").
+    """
+    safe = re.sub(r'[^A-Za-z0-9._-]+', '-', value).strip('-') or 'unnamed'
+    return f"{safe}-{hashlib.sha1(value.encode('utf-8')).hexdigest()[:8]}"
+
+
+def _statement(model, start_utc, end_utc):
+    return select(
+        model.id, model.user_id, User.name, User.employee_id,
+        func.coalesce(User.department, ''), func.coalesce(User.section, ''), func.coalesce(User.shift, ''),
+        model.time, func.coalesce(Category.name, model.category),
+        model.title, model.notes,
+        func.coalesce(ItemLibrary.item_name, model.item_name), model.part_number, model.customer,
+        model.created_at
+    ).join(User, User.id == model.user_id).outerjoin(
+        Category, Category.id == model.category_id
+    ).outerjoin(
+        ItemLibrary, ItemLibrary.id == model.item_id
+    ).where(model.created_at >= start_utc, model.created_at < end_utc)
+
+
+def collect(day):
+    """{department: [row dict, ...]} for the reports of one GMT+7 day, oldest first."""
+    start_utc = datetime.combine(day, datetime.min.time()) - timedelta(hours=7)
+    end_utc = start_utc + timedelta(days=1)
+    departments = defaultdict(list)
+    for model in report_archive.sources(start_utc):
+        for row in db.session.execute(_statement(model, start_utc, end_utc)):
+            report = dict(zip(FIELDS, row))
+            report['created_at'] = (report['created_at'] + timedelta(hours=7)).strftime('%Y-%m-%d %H:%M')
+            departments[report['department'] or NO_DEPARTMENT].append(report)
+    for reports in departments.values():
+        reports.sort(key=lambda r: (r['created_at'], r['id']))
+    return departments
+
+
+def fingerprint(reports):
+    """Hash of a department's rows; changes when any report or user detail changes."""
+    return hashlib.sha256(json.dumps(reports, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def _summary(reports):
+    users = {}
+    for r in reports:
+        user = users.setdefault(r['user_id'], {
+            'name': r['user_name'] or r['employee_id'], 'employee_id': r['employee_id'],
+            'section': r['section'], 'shift': r['shift'], 'reports': [],
+        })
+        user['reports'].append(r)
+    for user in users.values():
+        user['slug'] = slug(user['employee_id'])
+        user['categories'] = Counter(r['category'] or '-' for r in user['reports']).most_common()
+    return {
+        'total': len(reports),
+        'categories': Counter(r['category'] or '-' for r in reports).most_common(),
+        'items': Counter(r['item_name'] for r in reports if r['item_name']).most_common(10),
+        'users': sorted(users.values(), key=lambda u: (-len(u['reports']), u['name'] or '')),
+    }
+
+
+def _environment():
+    return Environment(loader=FileSystemLoader(TEMPLATE_DIR), autoescape=select_autoescape(['html']))
+
+
+def _write_xlsx(path, department, day, summary, reports):
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Summary')
+    sheet.append([f'{department} — {day}'])
+    sheet.append(['Total reports', summary['total']])
+    sheet.append([])
+    sheet.append(['Category', 'Reports'])
+    for category, count in summary['categories']:
+        sheet.append([category, count])
+    sheet = workbook.create_sheet('Users')
+    sheet.append(['Employee ID', 'Name', 'Section', 'Shift', 'Reports'])
+    for user in summary['users']:
+        sheet.append([user['employee_id'], user['name'], user['section'], user['shift'], len(user['reports'])])
+    sheet = workbook.create_sheet('Reports')
+    sheet.append(['Created (GMT+7)', 'Employee ID', 'Name', 'Time', 'Category', 'Title',
+                  'Item', 'Part Number', 'Customer', 'Notes'])
+    for r in reports:
+        sheet.append([r['created_at'], r['employee_id'], r['user_name'], r['time'], r['category'], r['title'],
+                      r['item_name'], r['part_number'], r['customer'], r['notes']])
+    tmp = f'{path}.tmp'
+    workbook.save(tmp)
+    os.replace(tmp, path)
+
+
+def _write_text(path, text):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def render_department(out_dir, day, department, reports):
+    """Write one department's HTML, XLSX and user pages (runs in a worker process)."""
+    day = str(day)
+    directory = os.path.join(out_dir, day, slug(department))
+    os.makedirs(os.path.join(directory, 'users'), exist_ok=True)
+    summary = _summary(reports)
+    env = _environment()
+    template = env.get_template('digest.html')
+    xlsx_name = f'{slug(department)}.xlsx'
+    _write_text(os.path.join(directory, 'index.html'), template.render(
+        title=department, day=day, summary=summary, reports=reports, xlsx=xlsx_name, user=None
+    ))
+    pages = set()
+    for user in summary['users']:
+        pages.add(f"{user['slug']}.html")
+        _write_text(os.path.join(directory, 'users', f"{user['slug']}.html"), template.render(
+            title=f"{user['name']} ({department})", day=day, summary=summary, reports=user['reports'],
+            xlsx=None, user=user
+        ))
+    # Users who moved department or whose reports were deleted since the last run
+    for name in set(os.listdir(os.path.join(directory, 'users'))) - pages:
+        os.remove(os.path.join(directory, 'users', name))
+    _write_xlsx(os.path.join(directory, xlsx_name), department, day, summary, reports)
+    return department, summary['total']
+
+
+def _load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_index(out_dir, day, manifest):
+    env = _environment()
+    template = env.get_template('digest_index.html')
+    day_entries = manifest.get(str(day), {})
+    departments = sorted(
+        ({'name': name, 'slug': slug(name), 'total': entry['total']} for name, entry in day_entries.items()),
+        key=lambda d: d['name']
+    )
+    _write_text(os.path.join(out_dir, str(day), 'index.html'),
+                template.render(day=str(day), departments=departments, days=None))
+    _write_text(os.path.join(out_dir, 'index.html'),
+                template.render(day=None, departments=None, days=sorted(manifest, reverse=True)))
+
+
+def generate(day, out_dir, workers=None, force=False):
+    """Render the digests of ``day`` into ``out_dir``. Returns (rendered, skipped) department names."""
+    departments = collect(day)
+    manifest = _load_manifest(out_dir)
+    previous = manifest.get(str(day), {})
+    current = {}
+    pending = []
+    for department, reports in departments.items():
+        digest = fingerprint(reports)
+        current[department] = {'fingerprint': digest, 'total': len(reports)}
+        index = os.path.join(out_dir, str(day), slug(department), 'index.html')
+        if not force and previous.get(department, {}).get('fingerprint') == digest and os.path.exists(index):
+            continue
+        pending.append((department, reports))
+
+    rendered = []
+    if pending:
+        os.makedirs(out_dir, exist_ok=True)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(render_department, out_dir, day, department, reports)
+                       for department, reports in pending]
+            rendered = [future.result()[0] for future in futures]
+
+    manifest[str(day)] = current
+    day_dir = os.path.join(out_dir, str(day))
+    os.makedirs(day_dir, exist_ok=True)
+    # Departments with no reports left that day (or written under an older slug)
+    keep = {slug(department) for department in current}
+    for entry in os.scandir(day_dir):
+        if entry.is_dir() and entry.name not in keep:
+            shutil.rmtree(entry.path)
+    _write_index(out_dir, day, manifest)
+    _write_text(os.path.join(out_dir, MANIFEST), json.dumps(manifest, indent=1, sort_keys=True))
+    skipped = sorted(set(current) - set(rendered))
+    return rendered, skipped
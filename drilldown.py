@@ -0,0 +1,121 @@
+"""Department → section → user drill-down for the monitoring summary.
+
+Each level is one GROUP BY over reports joined to their users, restricted to
+the parent node that was expanded, so the page only ever loads the level the
+admin opens instead of a bar per user.
+
+Days are shift days: the night shift (Malam, 23:00–07:00 GMT+7) runs over
+midnight, so its reports count toward the date the shift started. A report
+made at 02:00 on the 5th by a Malam operator belongs to the 4th.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import select, union_all, func, case, cast, or_, Date
+
+import report_archive
+from aggregates import item_filter
+from models import db, User
+
+LEVELS = ('department', 'section', 'user')
+# Hours after local midnight that still belong to the previous day's shift
+# (an hour past the end of Malam, for reports written after the shift)
+SHIFT_DAY_START = {'Malam': 8}
+GMT7_HOURS = 7
+BLANK = '(none)'
+
+
+def shift_day(columns, dialect):
+    """GMT+7 date of the shift a report belongs to (``columns`` has created_at; needs User joined)."""
+    if dialect == 'sqlite':
+        modifier = case(
+            *[(User.shift == shift, f'{GMT7_HOURS - hours:+d} hours') for shift, hours in SHIFT_DAY_START.items()],
+            else_=f'+{GMT7_HOURS} hours'
+        )
+        return func.date(columns.created_at, modifier)
+    offset = case(
+        *[(User.shift == shift, timedelta(hours=GMT7_HOURS - hours)) for shift, hours in SHIFT_DAY_START.items()],
+        else_=timedelta(hours=GMT7_HOURS)
+    )
+    return cast(columns.created_at + offset, Date)
+
+
+def utc_bounds(start_date, end_date):
+    """created_at range covering the shift days ``start_date``..``end_date``."""
+    start_utc = datetime.combine(start_date, datetime.min.time()) - timedelta(hours=GMT7_HOURS)
+    end_utc = (datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+               - timedelta(hours=GMT7_HOURS) + timedelta(hours=max(SHIFT_DAY_START.values())))
+    return start_utc, end_utc
+
+
+def _group_column(level):
+    if level == 'user':
+        return User.id
+    return func.coalesce(getattr(User, level), '')
+
+
+def _parent_filters(department, section):
+    filters = []
+    for column, value in ((User.department, department), (User.section, section)):
+        if value is None:
+            continue
+        filters.append(or_(column.is_(None), column == '') if value == '' else column == value)
+    return filters
+
+
+def drilldown(level, start_date, end_date, department=None, section=None, item=None):
+    """Report and active-user counts per node of ``level`` under the given parent.
+
+    ``start_date`` / ``end_date`` are GMT+7 shift days (inclusive). A parent
+    value of '' selects users with no department/section. Returns a list of
+    node dicts, largest first, each with a per-shift breakdown.
+    """
+    dialect = db.session.get_bind().dialect.name
+    # Coarse created_at bounds keep the index range scan; the shift day decides exactly
+    start_utc, end_utc = utc_bounds(start_date, end_date)
+    if dialect == 'sqlite':
+        first_day, last_day = start_date.isoformat(), end_date.isoformat()
+    else:
+        first_day, last_day = start_date, end_date
+
+    # Hot and archive rows in one derived table, so users are counted once
+    parts = []
+    for model in report_archive.sources(start_utc):
+        part = select(model.id, model.user_id, model.created_at).where(
+            model.created_at >= start_utc, model.created_at < end_utc
+        )
+        if item:
+            part = part.where(item_filter(model, item))
+        parts.append(part)
+    reports = (parts[0] if len(parts) == 1 else union_all(*parts)).subquery()
+
+    group_column = _group_column(level)
+    shift_column = func.coalesce(User.shift, '')
+    day = shift_day(reports.c, dialect)
+    query = db.session.query(
+        group_column, shift_column, func.count(reports.c.id), func.count(func.distinct(reports.c.user_id))
+    ).join(User, User.id == reports.c.user_id).filter(
+        day >= first_day, day <= last_day, *_parent_filters(department, section)
+    ).group_by(group_column, shift_column)
+
+    nodes = defaultdict(lambda: {'reports': 0, 'users': 0, 'shifts': {}})
+    for key, shift, count, users in query:
+        node = nodes[key]
+        node['reports'] += count
+        node['users'] += users  # a user has one shift, so per-shift counts add up
+        node['shifts'][shift or BLANK] = count
+
+    labels = {}
+    if level == 'user' and nodes:
+        labels = {user_id: name or employee_id for user_id, name, employee_id in
+                  db.session.query(User.id, User.name, User.employee_id).filter(User.id.in_(list(nodes)))}
+    result = []
+    for key, node in nodes.items():
+        result.append({
+            'key': key,
+            'label': labels.get(key, str(key)) if level == 'user' else (key or BLANK),
+            'reports': node['reports'],
+            'users': node['users'],
+            'shifts': node['shifts'],
+        })
+    result.sort(key=lambda node: (-node['reports'], node['label']))
+    return result
@@ -1,50 +1,28 @@
 """
 Fix ItemLibrary duplicates - ensure each combination of item_name + part_number + customer is unique
-This script will scan all reports and recreate ItemLibrary with proper unique combinations
+Removes duplicate rows, builds the unique index on the combination and merges every
+distinct combination found in reports. Existing (admin-curated) items are kept.
+For regular incremental syncs use sync_item_library.py.
 """
 from app import app, db
-from models import ItemLibrary, Report
+from models import ItemLibrary
+from item_library import ensure_unique_index, sync_from_reports
 
 def fix_item_library():
     with app.app_context():
         print("Starting ItemLibrary cleanup...")
         
-        # Step 1: Clear current ItemLibrary
-        deleted_count = ItemLibrary.query.delete()
-        print(f"Deleted {deleted_count} old items from ItemLibrary")
+        # Steps 1-2: Remove duplicate combinations (keep the oldest entry) and make sure
+        # the unique index exists on older databases
+        deleted_count = ensure_unique_index()
+        print(f"Deleted {deleted_count} duplicate items from ItemLibrary")
         
-        # Step 2: Scan all reports and collect unique combinations
-        unique_combinations = set()
-        reports = Report.query.all()
+        # Step 3: Merge unique combinations from all reports
+        scanned, added_count = sync_from_reports(full=True)
+        print(f"Found {scanned} distinct combinations in reports, added {added_count} new items to ItemLibrary")
         
-        for report in reports:
-            if report.item_name:
-                # Create tuple of (item_name, part_number, customer)
-                combo = (
-                    report.item_name,
-                    report.part_number or None,
-                    report.customer or None
-                )
-                unique_combinations.add(combo)
-        
-        print(f"Found {len(unique_combinations)} unique combinations from {len(reports)} reports")
-        
-        # Step 3: Insert unique combinations into ItemLibrary
-        added_count = 0
-        for item_name, part_number, customer in sorted(unique_combinations):
-            new_item = ItemLibrary(
-                item_name=item_name,
-                part_number=part_number,
-                customer=customer
-            )
-            db.session.add(new_item)
-            added_count += 1
-        
-        db.session.commit()
-        print(f"Added {added_count} unique items to ItemLibrary")
-        
-        # Step 4: Display sample of recreated items
-        print("\nSample of recreated items:")
+        # Step 4: Display sample of library items
+        print("\nSample of library items:")
         sample_items = ItemLibrary.query.limit(10).all()
         for item in sample_items:
             print(f"  - {item.item_name} | {item.part_number or 'No Part#'} | {item.customer or 'No Customer'}")
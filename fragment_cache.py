@@ -0,0 +1,91 @@
+"""Template fragment caching and the Jinja bytecode cache.
+
+Wrap a rarely changing part of a template in a ``cache`` block::
+
+    {% cache 'category_options', data_version('categories') %}
+      {% for category in categories %}...{% endfor %}
+    {% endcache %}
+
+All arguments together form the key, so pass every value the fragment
+depends on, plus ``data_version(...)`` for the data it renders. Rendered
+HTML is stored in the result cache (cache.py), so it is shared between
+workers when RESULT_CACHE_STORE is set. Data versions: 'reports', 'history',
+'categories' and 'users'.
+
+View data that is only needed inside a cached fragment can be wrapped in
+:class:`Lazy` so the query only runs when the fragment is rendered.
+"""
+import os
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from cache import cache
+
+
+class FragmentCacheExtension(Extension):
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        call = self.call_method('_render', [nodes.List(parts)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, parts, caller):
+        if not self.environment.fragment_cache_enabled:
+            return caller()
+        key = '|'.join(str(part) for part in parts)
+        return Markup(cache.get_or_render(key, lambda: str(caller())))
+
+
+class Lazy:
+    """Sequence/mapping computed on first use."""
+
+    def __init__(self, compute):
+        self._compute = compute
+        self._value = None
+        self._done = False
+
+    @property
+    def value(self):
+        if not self._done:
+            self._value = self._compute()
+            self._done = True
+        return self._value
+
+    def __iter__(self):
+        return iter(self.value)
+
+    def __len__(self):
+        return len(self.value)
+
+    def __bool__(self):
+        return bool(self.value)
+
+    def __getitem__(self, key):
+        return self.value[key]
+
+    def get(self, key, default=None):
+        return self.value.get(key, default)
+
+
+def data_version(*names):
+    """Version tag for the named data sets, for use in fragment keys."""
+    return '.'.join(f'{name}{cache.version(name)}' for name in names)
+
+
+def init_app(app):
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.fragment_cache_enabled = app.config.get('FRAGMENT_CACHE_ENABLED', True)
+    app.jinja_env.globals['data_version'] = data_version
+
+    directory = app.config.get('TEMPLATE_BYTECODE_CACHE_DIR')
+    if directory:
+        try:
+            os.makedirs(directory, exist_ok=True)
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+        except OSError as exc:
+            app.logger.error(f"Template bytecode cache unavailable: {exc}")
@@ -0,0 +1,35 @@
+"""Build the daily per-department and per-user digests (HTML + XLSX).
+
+Run nightly from cron after midnight GMT+7, e.g.:
+    30 0 * * * cd /path/to/app && python generate_digests.py
+
+Options:
+    --date YYYY-MM-DD   day to build (default: yesterday, GMT+7)
+    --workers N         rendering processes (default: CPU count)
+    --force             re-render departments even if unchanged
+"""
+import argparse
+from datetime import datetime
+from app import create_app
+import digests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--date', type=lambda s: datetime.strptime(s, '%Y-%m-%d').date())
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--force', action='store_true')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        day = args.date or digests.previous_day()
+        out_dir = app.config['DIGEST_DIR']
+        rendered, skipped = digests.generate(day, out_dir, workers=args.workers, force=args.force)
+        for department in rendered:
+            print(f"✓ {department}")
+        print(f"✅ Digests for {day}: {len(rendered)} rendered, {len(skipped)} unchanged → {out_dir}")
+
+
+if __name__ == '__main__':
+    main()
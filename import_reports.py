@@ -0,0 +1,65 @@
+"""Import historical reports from an .xlsx or .csv file.
+
+The first row holds the column names: Employee ID, Date, Time, Category,
+Title, Notes, Item, Part Number, Customer (Employee ID, Date, Category and
+Title are required; dates and times are GMT+7). See report_import.py.
+
+Usage:
+    python import_reports.py reports.xlsx [--chunk-size 5000] [--dry-run]
+"""
+import argparse
+import sys
+import time
+
+from app import create_app
+from models import db, AuditLog
+import report_import
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path')
+    parser.add_argument('--chunk-size', type=int, default=report_import.CHUNK_SIZE)
+    parser.add_argument('--dry-run', action='store_true', help='check the rows without writing them')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    app = create_app()
+    with app.app_context(), open(args.path, 'rb') as stream:
+        try:
+            records = report_import.read_rows(stream, args.path)
+        except ValueError as exc:
+            sys.exit(f"❌ {exc}")
+
+        started = time.monotonic()
+        if args.dry_run:
+            result = report_import.check_rows(records)
+        else:
+            for result in report_import.import_reports(records, chunk_size=args.chunk_size):
+                elapsed = max(time.monotonic() - started, 1e-9)
+                print(f"\r  {result.imported} imported, {result.skipped} skipped "
+                      f"({result.imported / elapsed * 60:,.0f} rows/min)", end='', flush=True)
+            print()
+
+        for line, message in result.errors:
+            print(f"  line {line}: {message}")
+        if result.skipped > len(result.errors):
+            print(f"  ... and {result.skipped - len(result.errors)} more skipped rows")
+        if args.dry_run:
+            print(f"✓ Dry run: {result.imported} rows valid, {result.skipped} would be skipped")
+            return
+
+        print(f"✓ Imported {result.imported} reports ({result.first_date} to {result.last_date}) "
+              f"in {time.monotonic() - started:.1f}s")
+        if result.imported:
+            db.session.add(AuditLog(action='reports_imported',
+                                    detail=f"{result.imported} reports from {args.path}"))
+            db.session.commit()
+            report_import.rebuild_rollups()
+            print("✅ Monitoring snapshots and caches rebuilt")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,7 @@
 import openpyxl
 from app import create_app
 from models import db, User
+from cache import cache
 
 
 def import_users_from_excel(excel_file='User parin.xlsx', sheet_name='ID karyawan'):
@@ -91,6 +92,7 @@ def import_users_from_excel(excel_file='User parin.xlsx', sheet_name='ID karyawa
             
             # Commit all changes
             db.session.commit()
+            cache.bump('users')  # refresh cached user lists (shared store only)
             
             print(f"\n{'='*60}")
             print(f"Import completed!")
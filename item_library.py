@@ -0,0 +1,310 @@
+"""ItemLibrary maintenance: conflict-ignoring bulk inserts and incremental sync from reports.
+
+The library has a unique index on (item_name, part_number, customer), so new
+triples are inserted with ``ON CONFLICT DO NOTHING`` instead of a lookup per
+row. :func:`sync_from_reports` reads distinct triples with SQL ``DISTINCT``,
+streams them in chunks, and remembers the highest report id it has seen, so
+later runs only scan newer reports plus those still inside the edit window.
+Existing library entries, including admin-curated ones, are never removed.
+Reports reference their library entry through ``Report.item_id``.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, or_, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateIndex
+from models import db, Report, ReportArchive, ItemLibrary, SyncState
+import report_archive
+
+UNIQUE_INDEX = 'uq_item_library_triple'
+SYNC_STATE_NAME = 'item_library_sync'
+CHUNK_SIZE = 1000
+SEARCH_LIMIT = 50
+EDIT_WINDOW = timedelta(days=2)
+
+
+def normalize_triple(item_name, part_number, customer):
+    """Strip values and store blanks as NULL, like the report and admin forms do."""
+    item_name = (item_name or '').strip()
+    return item_name, (part_number or '').strip() or None, (customer or '').strip() or None
+
+
+_indexed_databases = set()  # database URLs known to have UNIQUE_INDEX
+
+
+def has_unique_index():
+    """Whether the database has the unique triple index (assumed on backends it can't check)."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        sql = "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name"
+    elif dialect == 'postgresql':
+        sql = "SELECT 1 FROM pg_indexes WHERE indexname = :name"
+    else:
+        return True
+    return db.session.execute(text(sql), {'name': UNIQUE_INDEX}).scalar() is not None
+
+
+def require_unique_index():
+    """Raise RuntimeError unless the unique triple index exists (checked once per database).
+
+    Conflict-ignoring inserts rely on it; without it they would add duplicates.
+    """
+    url = str(db.session.get_bind().url)
+    if url in _indexed_databases:
+        return
+    if not has_unique_index():
+        raise RuntimeError(f'item_library has no {UNIQUE_INDEX} index, so duplicate items cannot be '
+                           'prevented; run migrate_item_library_unique.py')
+    _indexed_databases.add(url)
+
+
+def ensure_unique_index():
+    """Remove duplicate library rows, then build the unique triple index if it is missing.
+
+    Returns the number of duplicate rows deleted.
+    """
+    deleted = remove_duplicates()
+    index = next(index for index in ItemLibrary.__table__.indexes if index.name == UNIQUE_INDEX)
+    db.session.execute(CreateIndex(index, if_not_exists=True))
+    db.session.commit()
+    return deleted
+
+
+def insert_ignore(triples):
+    """Insert (item_name, part_number, customer) triples, skipping existing ones.
+
+    Runs in the caller's transaction. Returns the number of rows inserted when
+    the backend reports it. Raises RuntimeError when the unique triple index is
+    missing (see :func:`require_unique_index`).
+    """
+    rows = []
+    for triple in triples:
+        item_name, part_number, customer = normalize_triple(*triple)
+        if item_name:
+            rows.append({'item_name': item_name, 'part_number': part_number, 'customer': customer})
+    if not rows:
+        return 0
+    require_unique_index()
+
+    now = datetime.utcnow()
+    for row in rows:
+        row['created_at'] = row['updated_at'] = now
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        result = db.session.execute(insert(ItemLibrary.__table__).values(rows).on_conflict_do_nothing())
+        return max(result.rowcount, 0)
+
+    # Other backends: one savepoint per row
+    inserted = 0
+    for row in rows:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(ItemLibrary.__table__.insert().values(**row))
+            inserted += 1
+        except IntegrityError:
+            pass
+    return inserted
+
+
+def _lookup_id(item_name, part_number, customer):
+    # Oldest row first: databases not yet migrated may still hold duplicates
+    return db.session.query(ItemLibrary.id).filter(
+        ItemLibrary.item_name == item_name,
+        func.coalesce(ItemLibrary.part_number, '') == (part_number or ''),
+        func.coalesce(ItemLibrary.customer, '') == (customer or '')
+    ).order_by(ItemLibrary.id).limit(1).scalar()
+
+
+def _upsert_id(row, dialect):
+    """Insert a normalized triple unless it exists, returning its id in one statement."""
+    table = ItemLibrary.__table__
+    if dialect == 'postgresql':
+        # The CTE inserts; the second branch finds an existing row without locking it
+        inserted = postgresql.insert(table).values(**row).on_conflict_do_nothing().returning(table.c.id).cte('inserted')
+        existing = select(table.c.id).where(
+            table.c.item_name == row['item_name'],
+            func.coalesce(table.c.part_number, '') == (row['part_number'] or ''),
+            func.coalesce(table.c.customer, '') == (row['customer'] or '')
+        )
+        return db.session.execute(select(inserted.c.id).union_all(existing).limit(1)).scalar()
+    return db.session.execute(sqlite.insert(table).values(**row).on_conflict_do_nothing().returning(table.c.id)).scalar()
+
+
+def resolve_item_id(item_name, part_number=None, customer=None):
+    """ItemLibrary id for a triple, adding the triple to the library if it is new.
+
+    Runs in the caller's transaction. On Postgres this is one round trip, an
+    upsert against the unique triple index; SQLite (no network round trips)
+    looks the triple up first and upserts only new ones. Returns None when
+    there is no item name.
+    """
+    item_name, part_number, customer = normalize_triple(item_name, part_number, customer)
+    if not item_name:
+        return None
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        item_id = _lookup_id(item_name, part_number, customer)
+        if item_id is not None:
+            return item_id
+    if dialect in ('sqlite', 'postgresql'):
+        require_unique_index()
+        now = datetime.utcnow()
+        row = {'item_name': item_name, 'part_number': part_number, 'customer': customer,
+               'created_at': now, 'updated_at': now}
+        item_id = _upsert_id(row, dialect)
+        # Inserted by a concurrent transaction that committed during this statement
+        return item_id if item_id is not None else _lookup_id(item_name, part_number, customer)
+    item_id = _lookup_id(item_name, part_number, customer)
+    if item_id is None:
+        insert_ignore([(item_name, part_number, customer)])
+        item_id = _lookup_id(item_name, part_number, customer)
+    return item_id
+
+
+def ids_for_name(item_name):
+    """Library ids of every (part_number, customer) variant of an item name."""
+    return [row[0] for row in db.session.query(ItemLibrary.id).filter(ItemLibrary.item_name == item_name)]
+
+
+def names_for_ids(item_ids):
+    """{item_id: item_name} for the given library ids."""
+    item_ids = list(item_ids)
+    if not item_ids:
+        return {}
+    return dict(db.session.query(ItemLibrary.id, ItemLibrary.item_name).filter(ItemLibrary.id.in_(item_ids)))
+
+
+def suggestions(rows):
+    """JSON list for /api/items/search from (item_name, part_number, customer) rows."""
+    return [{
+        'item_name': item_name,
+        'part_number': part_number,
+        'customer': customer,
+        'display': f"{item_name} | {part_number or 'No Part#'} | {customer or 'No Customer'}"
+    } for item_name, part_number, customer in rows]
+
+
+def _distinct_triples(model, extra_filter=None):
+    query = select(
+        model.item_name,
+        func.nullif(func.trim(model.part_number), ''),
+        func.nullif(func.trim(model.customer), '')
+    ).where(model.item_name.isnot(None), func.trim(model.item_name) != '')
+    if extra_filter is not None:
+        query = query.where(extra_filter)
+    return query.distinct()
+
+
+def _high_water_mark():
+    state = db.session.get(SyncState, SYNC_STATE_NAME)
+    return state.value if state else None
+
+
+def sync_from_reports(full=False, chunk_size=CHUNK_SIZE, now=None):
+    """Merge distinct report item triples into ItemLibrary.
+
+    ``full`` rescans every report (hot and archived); otherwise only reports
+    above the stored high-water mark or still editable are read.
+    Returns (triples_scanned, items_inserted).
+    """
+    max_id = db.session.query(func.max(Report.id)).scalar() or 0
+    mark = None if full else _high_water_mark()
+
+    if mark is None:
+        queries = [_distinct_triples(model) for model in report_archive.sources()]
+    else:
+        # Edits within the window can change the item of an already-synced report
+        recent = (now or datetime.utcnow()) - EDIT_WINDOW
+        queries = [_distinct_triples(Report, or_(Report.id > mark, Report.created_at >= recent))]
+
+    scanned = inserted = 0
+    for query in queries:
+        result = db.session.execute(query.execution_options(yield_per=chunk_size))
+        for chunk in result.partitions(chunk_size):
+            scanned += len(chunk)
+            inserted += insert_ignore(chunk)
+
+    state = db.session.get(SyncState, SYNC_STATE_NAME)
+    if state is None:
+        state = SyncState(name=SYNC_STATE_NAME)
+        db.session.add(state)
+    state.value = max_id
+    db.session.commit()
+
+    # Link reports written without an item_id (e.g. by older code) to their library entry
+    if mark is None:
+        for model in report_archive.sources():
+            backfill_item_ids(model)
+    else:
+        backfill_item_ids(Report, min_id=mark + 1)
+    return scanned, inserted
+
+
+def backfill_item_ids(model=Report, min_id=None, batch_size=5000):
+    """Set ``item_id`` on reports that have an item name but no library link yet.
+
+    Works through id ranges of ``batch_size`` and commits after each one.
+    Run :func:`sync_from_reports` first so every triple is in the library.
+    Returns the number of reports updated.
+    """
+    table = model.__table__
+    library = ItemLibrary.__table__
+    # min() keeps the subquery single-valued should duplicate library rows exist
+    match = select(func.min(library.c.id)).where(
+        library.c.item_name == func.trim(table.c.item_name),
+        func.coalesce(library.c.part_number, '') == func.coalesce(func.trim(table.c.part_number), ''),
+        func.coalesce(library.c.customer, '') == func.coalesce(func.trim(table.c.customer), '')
+    ).scalar_subquery()
+
+    low, high = db.session.query(func.min(table.c.id), func.max(table.c.id)).one()
+    if low is None:
+        return 0
+    if min_id is not None:
+        low = max(low, min_id)
+    updated = 0
+    while low <= high:
+        result = db.session.execute(table.update().where(
+            table.c.id >= low,
+            table.c.id < low + batch_size,
+            table.c.item_id.is_(None),
+            match.isnot(None),
+            table.c.item_name.isnot(None),
+            func.trim(table.c.item_name) != ''
+        ).values(item_id=match))
+        db.session.commit()
+        updated += max(result.rowcount, 0)
+        low += batch_size
+    return updated
+
+
+def remove_duplicates():
+    """Delete duplicate library rows (keeping the oldest) so the unique index can be built.
+
+    Reports linked to a deleted duplicate are relinked to the row that is kept.
+    """
+    keep = db.session.query(func.min(ItemLibrary.id)).group_by(
+        ItemLibrary.item_name,
+        func.coalesce(ItemLibrary.part_number, ''),
+        func.coalesce(ItemLibrary.customer, '')
+    )
+    library = ItemLibrary.__table__
+    duplicate = library.alias('duplicate')
+    for model in (Report, ReportArchive):
+        table = model.__table__
+        columns = [c['name'] for c in inspect(db.engine).get_columns(table.name)]
+        if 'item_id' not in columns:
+            continue  # before migrate_report_item_id.py nothing is linked yet
+        oldest = select(func.min(library.c.id)).where(
+            duplicate.c.id == table.c.item_id,
+            library.c.item_name == duplicate.c.item_name,
+            func.coalesce(library.c.part_number, '') == func.coalesce(duplicate.c.part_number, ''),
+            func.coalesce(library.c.customer, '') == func.coalesce(duplicate.c.customer, '')
+        ).scalar_subquery()
+        db.session.execute(table.update().where(
+            table.c.item_id.isnot(None), ~table.c.item_id.in_(keep)
+        ).values(item_id=oldest))
+    deleted = ItemLibrary.query.filter(~ItemLibrary.id.in_(keep)).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
@@ -0,0 +1,223 @@
+"""Usage-ranked item suggestions for the report form (/api/items/search).
+
+Suggestions are ranked by the user's own recent use of an item, then by how
+much everyone uses it, then by name; an empty query returns the items the user
+reported on most recently. Everything is answered from memory, per process:
+
+- the library (id -> item_name, part_number, customer), reloaded after the
+  'history' or 'items' data version changes, or after ``LIBRARY_MAX_AGE``
+- time-decayed use scores per item, globally and per user, and the last time
+  each user reported on each item
+
+Scores halve every ``HALF_LIFE``. A use at time t adds
+2 ** ((t - epoch) / HALF_LIFE), so a new use never rescales the others and the
+order stays right as time passes. Scores are built from the last ``WINDOW`` of
+reports with one GROUP BY on user, item and day, then kept up to date
+incrementally: :func:`record` adds this process's own reports as they are
+written, and reports written by other processes are read by id above the
+highest one seen (after the 'reports' version changes, at most every
+``TOP_UP_INTERVAL``). A rebuild every ``REBUILD_AGE`` drops edited and deleted
+reports and moves the epoch forward.
+"""
+import heapq
+import threading
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, select
+
+import report_archive
+from cache import cache
+from item_library import SEARCH_LIMIT
+from models import db, Report, ItemLibrary
+
+HALF_LIFE = timedelta(days=14)
+WINDOW = timedelta(days=90)
+REBUILD_AGE = 3600  # seconds
+LIBRARY_MAX_AGE = 300  # seconds; bounds staleness of uploads made by other processes
+TOP_UP_INTERVAL = 5  # seconds
+
+_lock = threading.Lock()
+_state = {
+    'library_version': None, 'library_loaded_at': 0.0, 'library': {}, 'names': {},
+    'built_at': None, 'epoch': None, 'max_report_id': 0, 'reports_version': None, 'topped_up_at': 0.0,
+    'recorded': set(), 'global': {}, 'users': {}, 'last_used': {},
+}
+
+
+def _library_version():
+    return cache.version('history'), cache.version('items')
+
+
+def _library_row(item_id, item_name, part_number, customer):
+    return item_id, (item_name or '', part_number or '', customer or '')
+
+
+def _refresh_library():
+    version = _library_version()
+    if _state['library_version'] == version and time.monotonic() - _state['library_loaded_at'] <= LIBRARY_MAX_AGE:
+        return
+    rows = db.session.query(ItemLibrary.id, ItemLibrary.item_name, ItemLibrary.part_number, ItemLibrary.customer)
+    library = dict(_library_row(*row) for row in rows)
+    with _lock:
+        _state.update(
+            library_version=version,
+            library_loaded_at=time.monotonic(),
+            library=library,
+            names={item_id: triple[0].lower() for item_id, triple in library.items()},
+        )
+
+
+def _add_missing_items(item_ids):
+    """Load library rows added (e.g. by a report) since the library was read."""
+    missing = [item_id for item_id in item_ids if item_id not in _state['library']]
+    if not missing:
+        return
+    rows = db.session.query(
+        ItemLibrary.id, ItemLibrary.item_name, ItemLibrary.part_number, ItemLibrary.customer
+    ).filter(ItemLibrary.id.in_(missing)).all()
+    with _lock:
+        for row in rows:
+            item_id, triple = _library_row(*row)
+            _state['library'][item_id] = triple
+            _state['names'][item_id] = triple[0].lower()
+
+
+def _weight(at, epoch):
+    return 2.0 ** ((at - epoch).total_seconds() / HALF_LIFE.total_seconds())
+
+
+def _add_use(scores, user_id, item_id, at, epoch, uses=1):
+    global_scores, user_scores, last_used = scores
+    weight = uses * _weight(at, epoch)
+    global_scores[item_id] = global_scores.get(item_id, 0.0) + weight
+    mine = user_scores.setdefault(user_id, {})
+    mine[item_id] = mine.get(item_id, 0.0) + weight
+    recent = last_used.setdefault(user_id, {})
+    if at > recent.get(item_id, datetime.min):
+        recent[item_id] = at
+
+
+def _rebuild(now=None):
+    now = now or datetime.utcnow()
+    start_utc = now - WINDOW
+    reports_version = cache.version('reports')
+    max_report_id = db.session.query(func.max(Report.id)).scalar() or 0
+    scores = ({}, {}, {})
+    for model in report_archive.sources(start_utc):
+        day = func.date(model.created_at)
+        query = select(
+            model.user_id, model.item_id, day, func.count(model.id), func.max(model.created_at)
+        ).where(model.created_at >= start_utc, model.item_id.isnot(None)).group_by(model.user_id, model.item_id, day)
+        if model is Report:
+            query = query.where(Report.id <= max_report_id)
+        for user_id, item_id, report_day, uses, last in db.session.execute(query):
+            if isinstance(report_day, str):
+                report_day = date.fromisoformat(report_day)
+            # Uses within a day count at midday; the latest one decides recency
+            _add_use(scores, user_id, item_id, datetime.combine(report_day, datetime.min.time()) + timedelta(hours=12),
+                     start_utc, uses)
+            scores[2][user_id][item_id] = last
+    with _lock:
+        _state.update(
+            built_at=time.monotonic(), epoch=start_utc, max_report_id=max_report_id,
+            reports_version=reports_version, topped_up_at=time.monotonic(), recorded=set(),
+            **dict(zip(('global', 'users', 'last_used'), scores))
+        )
+
+
+def _top_up():
+    """Add reports other processes wrote since the scores were read."""
+    reports_version = cache.version('reports')
+    if reports_version == _state['reports_version'] or time.monotonic() - _state['topped_up_at'] < TOP_UP_INTERVAL:
+        return
+    rows = db.session.execute(
+        select(Report.id, Report.user_id, Report.item_id, Report.created_at)
+        .where(Report.id > _state['max_report_id']).order_by(Report.id)
+    ).all()
+    _add_missing_items({row.item_id for row in rows if row.item_id is not None})
+    with _lock:
+        scores = (_state['global'], _state['users'], _state['last_used'])
+        for report_id, user_id, item_id, created_at in rows:
+            # Skip rows another thread applied meanwhile, and this process's own (see record())
+            if report_id <= _state['max_report_id'] or report_id in _state['recorded']:
+                _state['recorded'].discard(report_id)
+                continue
+            if item_id is not None:
+                _add_use(scores, user_id, item_id, created_at, _state['epoch'])
+        if rows:
+            _state['max_report_id'] = max(_state['max_report_id'], rows[-1].id)
+        _state.update(reports_version=reports_version, topped_up_at=time.monotonic())
+
+
+def refresh():
+    """Reload the library and scores as needed; reads the database."""
+    _refresh_library()
+    if _state['built_at'] is None or time.monotonic() - _state['built_at'] > REBUILD_AGE:
+        _rebuild()
+    else:
+        _top_up()
+
+
+def loaded():
+    """Whether the scores have been built, i.e. ``suggest(reload=False)`` has data."""
+    return _state['built_at'] is not None
+
+
+def record(user_id, item_id, created_at, report_id):
+    """Count a report this process just wrote, so its author sees the item ranked at once."""
+    if item_id is None or _state['built_at'] is None:
+        return  # not loaded yet; the first build reads it
+    _add_missing_items([item_id])
+    with _lock:
+        if report_id <= _state['max_report_id']:
+            return
+        _add_use((_state['global'], _state['users'], _state['last_used']), user_id, item_id, created_at, _state['epoch'])
+        _state['recorded'].add(report_id)
+
+
+def invalidate_library():
+    """Call after adding items to the library outside of report writes."""
+    cache.bump('items')
+    _state['library_version'] = None
+
+
+def suggest(user_id, query='', limit=SEARCH_LIMIT, reload=True):
+    """Up to ``limit`` (item_name, part_number, customer) triples for ``query``, blanks as ''.
+
+    Matches item names containing ``query`` (case-insensitive), ranked by the
+    user's decayed use, then everyone's, then name. An empty query returns the
+    user's most recently used items, topped up with the most used overall and
+    then with library items in name order. With ``reload=False`` the answer
+    comes from memory only and nothing is read from the database.
+    """
+    if reload:
+        refresh()
+    with _lock:
+        library = _state['library']
+        global_scores = _state['global']
+        if not query:
+            recent = _state['last_used'].get(user_id, {})
+            ids = heapq.nlargest(limit, (i for i in recent if i in library), key=recent.get)
+            if len(ids) < limit:
+                chosen = set(ids)
+                ids += heapq.nlargest(limit - len(ids), (i for i in global_scores if i in library and i not in chosen),
+                                      key=global_scores.get)
+            if len(ids) < limit:
+                chosen = set(ids)
+                ids += heapq.nsmallest(limit - len(ids), (i for i in library if i not in chosen), key=library.get)
+        else:
+            needle = query.lower()
+            mine = _state['users'].get(user_id, {})
+            ids = heapq.nsmallest(limit, (i for i, name in _state['names'].items() if needle in name),
+                                  key=lambda i: (-mine.get(i, 0.0), -global_scores.get(i, 0.0), library[i]))
+        return [library[i] for i in ids]
+
+
+def stats():
+    """Sizes of the in-memory structures (for benchmarks and debugging)."""
+    return {
+        'items': len(_state['library']),
+        'scored_items': len(_state['global']),
+        'users': len(_state['users']),
+        'max_report_id': _state['max_report_id'],
+    }
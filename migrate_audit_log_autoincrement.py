@@ -0,0 +1,26 @@
+"""Rebuild the SQLite audit_log table with AUTOINCREMENT so ids are never reused.
+
+archive_audit_log.py moves old entries to audit_log_archive. Without
+AUTOINCREMENT SQLite hands out max(id) + 1, so once the newest entries are
+gone a new entry can get the id of an archived one. Postgres sequences never
+reuse ids; there this script does nothing.
+
+The table is rebuilt the same way as report (see
+migrate_report_autoincrement.py). Back up instance/app.db first and stop the
+app while it runs. Safe to rerun.
+"""
+from app import create_app
+from models import db, AuditLog, AuditLogArchive
+from migrate_report_autoincrement import rebuild_table
+
+
+def migrate():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        rebuild_table(AuditLog, AuditLogArchive)
+        print('Audit log autoincrement migration completed!')
+
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,40 @@
+"""Create indexes declared on the models that are missing from an existing database.
+
+db.create_all() only creates indexes together with new tables, so run this
+after pulling model changes that add an index to an existing table.
+"""
+from sqlalchemy.schema import CreateIndex
+from app import create_app
+from models import db
+from item_library import ensure_unique_index
+
+
+def create_indexes(tables=None, column=None):
+    """CREATE INDEX IF NOT EXISTS for every index on ``tables`` (default: all tables).
+
+    ``column`` limits it to indexes on that column name, for migrations that
+    must not touch columns added by later ones. IF NOT EXISTS is used instead
+    of reflection because expression indexes (e.g. uq_item_library_triple)
+    are not reflected.
+    """
+    for table in tables or db.metadata.sorted_tables:
+        for index in table.indexes:
+            if column is not None and column not in [c.name for c in index.columns]:
+                continue
+            db.session.execute(CreateIndex(index, if_not_exists=True))
+            print(f"✓ {table.name}: {index.name}")
+    db.session.commit()
+
+
+def migrate_indexes():
+    app = create_app()
+    with app.app_context():
+        # The unique item index cannot be built while duplicate items exist
+        deleted = ensure_unique_index()
+        print(f"✓ Deleted {deleted} duplicate items")
+        create_indexes()
+        print('Index migration completed!')
+
+
+if __name__ == '__main__':
+    migrate_indexes()
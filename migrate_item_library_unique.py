@@ -0,0 +1,28 @@
+"""Make ItemLibrary entries unique per (item_name, part_number, customer).
+
+Steps:
+1. Delete duplicate library rows, keeping the oldest; reports linked to a
+   duplicate are relinked to it
+2. Create the uq_item_library_triple unique index
+
+Conflict-ignoring inserts (uploads, report submissions, the library sync)
+rely on the index and refuse to run without it, so run this first when
+upgrading an existing database. Safe to rerun.
+"""
+from app import create_app
+from models import db
+from item_library import ensure_unique_index, UNIQUE_INDEX
+
+
+def migrate():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        deleted = ensure_unique_index()
+        print(f"✓ Deleted {deleted} duplicate items")
+        print(f"✓ item_library: {UNIQUE_INDEX}")
+        print('Item library unique index migration completed!')
+
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,62 @@
+"""Rebuild the SQLite report table with AUTOINCREMENT so ids are never reused.
+
+Without AUTOINCREMENT SQLite hands out max(id) + 1, so once the newest
+reports are deleted or archived a new report can get the id of an archived
+one, and lookups by id (find(), detail and export links) return the wrong
+report. Postgres sequences never reuse ids; there this script does nothing.
+
+Steps (SQLite, only when the table was created without AUTOINCREMENT):
+1. Rename report to report_old and drop its indexes
+2. Create report from the model (AUTOINCREMENT, all indexes) and copy the rows
+3. Start the id sequence after the highest id in report and report_archive
+4. Drop report_old
+
+Back up instance/app.db first and stop the app while it runs. Safe to rerun.
+"""
+from sqlalchemy import func, inspect, text
+from app import create_app
+from models import db, Report, ReportArchive
+from report_archive import reuses_ids
+
+
+def rebuild_table(model, archive_model):
+    """Rebuild ``model``'s table with AUTOINCREMENT, ids continuing after ``archive_model``'s."""
+    table = model.__table__
+    if not reuses_ids(table):
+        print(f"✓ {table.name} never reuses ids")
+        return False
+
+    inspector = inspect(db.engine)
+    existing = {c['name'] for c in inspector.get_columns(table.name)}
+    columns = ', '.join(c.name for c in table.columns if c.name in existing)
+    indexes = [index['name'] for index in inspector.get_indexes(table.name)]
+    high = max(db.session.query(func.max(model.id)).scalar() or 0,
+               db.session.query(func.max(archive_model.id)).scalar() or 0)
+    db.session.commit()
+
+    with db.engine.begin() as connection:
+        connection.execute(text(f"ALTER TABLE {table.name} RENAME TO {table.name}_old"))
+        for name in indexes:
+            connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        table.create(connection)
+        connection.execute(text(
+            f"INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {table.name}_old"
+        ))
+        connection.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {'name': table.name})
+        connection.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"),
+                           {'name': table.name, 'seq': high})
+        connection.execute(text(f"DROP TABLE {table.name}_old"))
+    print(f"✓ Rebuilt {table.name} with AUTOINCREMENT; new ids start after {high}")
+    return True
+
+
+def migrate():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        rebuild_table(Report, ReportArchive)
+        print('Report autoincrement migration completed!')
+
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,42 @@
+"""Add Report.category_id and link existing reports to their Category row.
+
+Steps:
+1. ALTER TABLE report / report_archive ADD COLUMN category_id (if missing)
+2. Backfill category_id from the category name in batches of id ranges
+3. Create the category_id indexes
+
+Reports whose category name no longer exists stay unlinked and keep being
+counted by name. Safe to rerun; only reports with a NULL category_id are touched.
+Runs after migrate_report_item_id.py (see "Upgrading an Existing Database" in
+README.md).
+"""
+import sys
+from sqlalchemy import func
+from app import create_app
+from models import db, Report, ReportArchive
+from category_lookup import backfill_category_ids
+from migrate_indexes import create_indexes
+from migrate_report_item_id import add_column
+
+
+def migrate():
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        for model in (Report, ReportArchive):
+            add_column(model.__table__, model.__table__.c.category_id)
+
+        for model in (Report, ReportArchive):
+            updated = backfill_category_ids(model, batch_size=batch_size)
+            unlinked = db.session.query(func.count(model.id)).filter(
+                model.category_id.is_(None), model.category.isnot(None)
+            ).scalar()
+            print(f"✓ {model.__tablename__}: linked {updated} reports, {unlinked} with an unknown category name")
+
+        create_indexes([Report.__table__, ReportArchive.__table__], column='category_id')
+        print('Report category_id migration completed!')
+
+
+if __name__ == '__main__':
+    migrate()
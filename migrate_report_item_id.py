@@ -0,0 +1,64 @@
+"""Add Report.item_id and link existing reports to their ItemLibrary entry.
+
+Steps:
+1. ALTER TABLE report / report_archive ADD COLUMN item_id (if missing)
+2. Remove duplicate library rows and create the unique triple index, which
+   the sync's conflict-ignoring inserts rely on
+3. Full item library sync: adds missing triples, then backfills item_id in
+   batches of id ranges
+4. Create the item_id indexes
+
+Safe to rerun; only reports with a NULL item_id are touched. For the order
+of the upgrade migrations see "Upgrading an Existing Database" in README.md.
+"""
+from sqlalchemy import func, inspect, text
+from app import create_app
+from models import db, Report, ReportArchive
+from item_library import ensure_unique_index, sync_from_reports
+from migrate_indexes import create_indexes
+
+
+def add_column(table, column):
+    """ALTER TABLE ... ADD COLUMN for a model column missing from the database."""
+    existing = [c['name'] for c in inspect(db.engine).get_columns(table.name)]
+    if column.name in existing:
+        print(f"✓ {table.name}.{column.name} already exists")
+        return False
+    ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(db.engine.dialect)}"
+    for fk in column.foreign_keys:
+        ddl += f" REFERENCES {fk.column.table.name}({fk.column.name})"
+        if fk.ondelete:
+            ddl += f" ON DELETE {fk.ondelete}"
+    db.session.execute(text(ddl))
+    db.session.commit()
+    print(f"✓ Added {table.name}.{column.name}")
+    return True
+
+
+def migrate():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        for model in (Report, ReportArchive):
+            add_column(model.__table__, model.__table__.c.item_id)
+
+        deleted = ensure_unique_index()
+        print(f"✓ Deleted {deleted} duplicate items")
+
+        scanned, inserted = sync_from_reports(full=True)
+        print(f"✓ Item library synced: {scanned} triples scanned, {inserted} new items")
+
+        for model in (Report, ReportArchive):
+            # Count ids only, so columns added by later migrations aren't selected
+            linked = db.session.query(func.count(model.id)).filter(model.item_id.isnot(None)).scalar()
+            unlinked = db.session.query(func.count(model.id)).filter(
+                model.item_id.is_(None), model.item_name.isnot(None), model.item_name != ''
+            ).scalar()
+            print(f"✓ {model.__tablename__}: {linked} reports linked, {unlinked} with an item still unlinked")
+
+        create_indexes([Report.__table__, ReportArchive.__table__], column='item_id')
+        print('Report item_id migration completed!')
+
+
+if __name__ == '__main__':
+    migrate()
@@ -1,14 +1,15 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
 from flask_login import UserMixin
+from passwords import hasher
 
 db = SQLAlchemy()
 
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(120))
+    name = db.Column(db.String(120), index=True)
     employee_id = db.Column(db.String(50), unique=True, nullable=False)
     password_hash = db.Column(db.String(200))
     department = db.Column(db.String(120))
@@ -19,11 +20,12 @@ class User(UserMixin, db.Model):
     is_favorite = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    reports = db.relationship('Report', backref='user', lazy=True)
-    templates = db.relationship('ReportTemplate', backref='user', lazy=True)
+    # Queries, not lists: a user's reports are counted or filtered in SQL, never loaded whole
+    reports = db.relationship('Report', backref='user', lazy='dynamic')
+    templates = db.relationship('ReportTemplate', backref='user', lazy='dynamic')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hasher.hash(password)
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -44,12 +46,49 @@ class Report(db.Model):
     time = db.Column(db.String(20))
     category = db.Column(db.String(50))
     title = db.Column(db.String(200))
-    notes = db.Column(db.Text)
+    # Unbounded; loaded on first access. List views select a preview (report_query.FIELDS)
+    notes = db.deferred(db.Column(db.Text))
     item_name = db.Column(db.String(200), nullable=True)
     part_number = db.Column(db.String(200), nullable=True)
     customer = db.Column(db.String(200), nullable=True)
+    # ItemLibrary entry for (item_name, part_number, customer); the strings are kept for compatibility
+    item_id = db.Column(db.Integer, db.ForeignKey('item_library.id', ondelete='SET NULL'), nullable=True, index=True)
+    # Category by id so renames don't orphan reports; the name string is kept for compatibility
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id', ondelete='SET NULL'), nullable=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_report_created_at', 'created_at'),
+        db.Index('ix_report_user_created', 'user_id', 'created_at'),
+        # Ids move to report_archive, so SQLite must never hand one out again
+        # (existing databases: migrate_report_autoincrement.py)
+        {'sqlite_autoincrement': True},
+    )
+
+
+class ReportArchive(db.Model):
+    """Reports from closed months moved out of the report table (see report_archive.py)"""
+    __tablename__ = 'report_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    time = db.Column(db.String(20))
+    category = db.Column(db.String(50))
+    title = db.Column(db.String(200))
+    notes = db.deferred(db.Column(db.Text))
+    item_name = db.Column(db.String(200), nullable=True)
+    part_number = db.Column(db.String(200), nullable=True)
+    customer = db.Column(db.String(200), nullable=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('item_library.id', ondelete='SET NULL'), nullable=True, index=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id', ondelete='SET NULL'), nullable=True, index=True)
+    created_at = db.Column(db.DateTime)
+
+    user = db.relationship('User', lazy=True)
+
+    __table_args__ = (
+        db.Index('ix_report_archive_created_at', 'created_at'),
+        db.Index('ix_report_archive_user_created', 'user_id', 'created_at'),
+    )
+
 
 class ReportTemplate(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -70,19 +109,79 @@ class AuditLog(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     actor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     action = db.Column(db.String(100), nullable=False)
-    detail = db.Column(db.Text)
+    # Loaded on first access; audit.audit_page undefers it for the log table
+    detail = db.deferred(db.Column(db.Text))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     user = db.relationship('User', foreign_keys=[user_id], backref='audit_logs', lazy=True)
     actor = db.relationship('User', foreign_keys=[actor_id], lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_audit_log_created_id', 'created_at', 'id'),
+        db.Index('ix_audit_log_user_created_id', 'user_id', 'created_at', 'id'),
+        # Ids move to audit_log_archive, so SQLite must never hand one out again
+        # (existing databases: migrate_audit_log_autoincrement.py)
+        {'sqlite_autoincrement': True},
+    )
+
+
+class AuditLogArchive(db.Model):
+    """Audit log entries moved out of audit_log by the retention job (see audit.py)"""
+    __tablename__ = 'audit_log_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    actor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    action = db.Column(db.String(100), nullable=False)
+    detail = db.deferred(db.Column(db.Text))
+    created_at = db.Column(db.DateTime)
+
+    user = db.relationship('User', foreign_keys=[user_id], lazy=True)
+    actor = db.relationship('User', foreign_keys=[actor_id], lazy=True)
+
+    __table_args__ = (
+        db.Index('ix_audit_log_archive_created_id', 'created_at', 'id'),
+        db.Index('ix_audit_log_archive_user_created_id', 'user_id', 'created_at', 'id'),
+    )
+
 
 class ItemLibrary(db.Model):
     """Library of items with part numbers and customers for quick reporting"""
     id = db.Column(db.Integer, primary_key=True)
-    item_name = db.Column(db.String(200), nullable=False)
+    item_name = db.Column(db.String(200), nullable=False, index=True)
     part_number = db.Column(db.String(200), nullable=True)
     customer = db.Column(db.String(200), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+
+# One library entry per (item_name, part_number, customer); NULL and '' count as the same value
+db.Index(
+    'uq_item_library_triple',
+    ItemLibrary.item_name,
+    db.func.coalesce(ItemLibrary.part_number, ''),
+    db.func.coalesce(ItemLibrary.customer, ''),
+    unique=True
+)
+
+
+class MonitoringSnapshot(db.Model):
+    """Precomputed monitoring aggregates for a default view (see snapshots.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    view = db.Column(db.String(50), nullable=False)
+    user_id = db.Column(db.Integer, nullable=True)
+    start_date = db.Column(db.Date, nullable=False)  # GMT+7 dates
+    end_date = db.Column(db.Date, nullable=False)
+    max_report_id = db.Column(db.Integer, nullable=False, default=0)
+    data = db.Column(db.Text, nullable=False)  # JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_monitoring_snapshot_lookup', 'view', 'user_id', 'start_date', 'end_date'),
+    )
+
+
+class SyncState(db.Model):
+    """High-water marks of incremental background jobs (e.g. ItemLibrary sync)"""
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,91 @@
+"""Keyset (seek) pagination for JSON list endpoints.
+
+Pages are addressed by an opaque cursor holding the sort key of the last row
+sent, so every page is an index range scan (``WHERE (name, id) > (:name, :id)
+ORDER BY name, id LIMIT n``) instead of an OFFSET that rescans earlier rows.
+"""
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_, DateTime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Clamp a requested page size to [1, MAX_PAGE_SIZE]."""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, columns):
+    """Decode a cursor for ``columns``; raises ValueError if it is malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError('Invalid cursor')
+    decoded = []
+    for column, value in zip(columns, values):
+        if isinstance(value, (list, dict, bool)):
+            raise ValueError('Invalid cursor')
+        if value is not None and isinstance(column.type, DateTime):
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise ValueError('Invalid cursor')
+        decoded.append(value)
+    return decoded
+
+
+def _after(columns, values, descending):
+    # (c0, c1, ...) > (v0, v1, ...) expanded so it works on every backend
+    clauses = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        prefix = [columns[j] == values[j] for j in range(i)]
+        clauses.append(and_(*prefix, column < value if descending else column > value))
+    return or_(*clauses)
+
+
+def after_cursor(columns, cursor, descending=False):
+    """WHERE clause for the rows after ``cursor`` in ``columns`` order; raises ValueError."""
+    return _after(columns, decode_cursor(cursor, columns), descending)
+
+
+def keyset_page(query, columns, key, cursor=None, limit=DEFAULT_PAGE_SIZE, descending=False, nullable=False):
+    """Fetch one page of ``query`` ordered by ``columns``.
+
+    ``key(row)`` returns the sort values of a row. Returns (rows, next_cursor),
+    where next_cursor is None on the last page. With ``nullable`` the first
+    column may be NULL: those rows come after all others, ordered by the
+    remaining columns, so both parts still scan the first column's index
+    (and NULL ordering doesn't depend on the backend).
+    """
+    values = decode_cursor(cursor, columns) if cursor else None
+    order = [c.desc() for c in columns] if descending else list(columns)
+    rows = []
+    if values is None or values[0] is not None:
+        part = query.filter(columns[0].isnot(None)) if nullable else query
+        if values is not None:
+            part = part.filter(_after(columns, values, descending))
+        rows = part.order_by(*order).limit(limit + 1).all()
+    if nullable and len(rows) <= limit:
+        part = query.filter(columns[0].is_(None))
+        if values is not None and values[0] is None:
+            part = part.filter(_after(columns[1:], values[1:], descending))
+        rows += part.order_by(*order[1:]).limit(limit + 1 - len(rows)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(key(rows[-1]))
+    return rows, next_cursor
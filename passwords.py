@@ -0,0 +1,129 @@
+"""Password verification through a bounded worker pool.
+
+Hashing is deliberately slow (100+ ms), so a burst of logins at shift change
+would otherwise tie up every server thread. Verification runs on a small
+thread pool (hashlib releases the GIL while hashing) and at most
+PASSWORD_HASH_QUEUE_LIMIT verifications may be running or waiting at once;
+beyond that :class:`HashingBusy` is raised and the login page answers 503 with
+Retry-After instead of queueing.
+
+Hashes created with other parameters than PASSWORD_HASH_METHOD (a werkzeug
+method string such as ``scrypt:32768:8:1`` or ``pbkdf2:sha256:600000``) are
+replaced after the next successful login, so the cost can be tuned centrally.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHOD = 'scrypt'
+
+
+class HashingBusy(Exception):
+    """The hashing pool is saturated; retry after ``retry_after`` seconds."""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Password hashing busy, retry after {retry_after}s')
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.method = DEFAULT_METHOD
+        self.workers = 2
+        self.queue_limit = 8
+        self.timeout = 10
+        self.retry_after = 5
+        self._executor = None
+        self._pid = None
+        self._slots = threading.BoundedSemaphore(self.queue_limit)
+        self._lock = threading.Lock()
+        self._method_prefix = None
+        self.verified = 0
+        self.rejected = 0
+        self.rehashed = 0
+
+    def init_app(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD') or DEFAULT_METHOD
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 2)
+        self.queue_limit = app.config.get('PASSWORD_HASH_QUEUE_LIMIT', 8)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 10)
+        self.retry_after = app.config.get('PASSWORD_HASH_RETRY_AFTER', 5)
+        self._slots = threading.BoundedSemaphore(self.queue_limit)
+        self._method_prefix = None
+        app.extensions['password_hasher'] = self
+
+    def _pool(self):
+        # Created lazily and again after a fork, since threads don't survive fork()
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='pwhash')
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingBusy(self.retry_after)
+        try:
+            future = self._pool().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot is held until the hash finishes, even if the caller gives up waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            self.rejected += 1
+            raise HashingBusy(self.retry_after)
+
+    @property
+    def method_prefix(self):
+        """Method part of hashes made with the configured method, e.g. 'scrypt:32768:8:1'."""
+        if self._method_prefix is None:
+            self._method_prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return self._method_prefix
+
+    def needs_rehash(self, pwhash):
+        return pwhash.split('$', 1)[0] != self.method_prefix
+
+    def hash(self, password):
+        """Hash with the configured method (synchronous)."""
+        return generate_password_hash(password, self.method)
+
+    def _verify(self, pwhash, password):
+        if not check_password_hash(pwhash, password):
+            return False, None
+        if self.needs_rehash(pwhash):
+            return True, self.hash(password)
+        return True, None
+
+    def verify(self, pwhash, password):
+        """Check ``password`` on the pool. Returns (ok, new_hash).
+
+        ``new_hash`` is set when the stored hash used outdated parameters and
+        should be saved in its place. Raises :class:`HashingBusy`.
+        """
+        if not pwhash:
+            return False, None
+        ok, new_hash = self._run(self._verify, pwhash, password)
+        self.verified += 1
+        if new_hash:
+            self.rehashed += 1
+        return ok, new_hash
+
+    def stats(self):
+        return {
+            'method': self.method,
+            'workers': self.workers,
+            'queue_limit': self.queue_limit,
+            'verified': self.verified,
+            'rejected': self.rejected,
+            'rehashed': self.rehashed,
+        }
+
+
+hasher = PasswordHasher()
@@ -0,0 +1,164 @@
+"""Cross-tab of report counts over two dimensions, computed in the database.
+
+Both dimensions go into one ``GROUP BY`` per report table (the archive only
+when the range reaches it), so the database returns one row per non-empty
+cell instead of one row per report. Value dimensions are cut to the ``top``
+keys by total, with the rest summed into an "Other" row/column; time
+dimensions (GMT+7 day, week, month) are kept whole and in order.
+
+Names are resolved in SQL (current category and library item names through
+their ids, user attributes through a join), except ``user``, which is grouped
+by id and labelled with name and employee id afterwards.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from sqlalchemy import func
+
+import report_archive
+from report_query import filter_clauses, utc_range
+from models import db, User, Category, ItemLibrary
+
+DEFAULT_TOP = 10
+MAX_TOP = 50
+OTHER = 'Other'
+BLANK = '(none)'
+
+DIMENSIONS = {
+    'user': 'User',
+    'department': 'Department',
+    'section': 'Section',
+    'shift': 'Shift',
+    'category': 'Category',
+    'item': 'Item',
+    'part_number': 'Part Number',
+    'customer': 'Customer',
+    'day': 'Day',
+    'week': 'Week',
+    'month': 'Month',
+}
+TIME_DIMENSIONS = ('day', 'week', 'month')
+USER_DIMENSIONS = ('department', 'section', 'shift')
+
+
+def _local(model):
+    return model.created_at + timedelta(hours=7)
+
+
+def _period(model, dimension, dialect):
+    """GMT+7 day / week (its Monday) / month of created_at as a sortable string."""
+    if dialect == 'sqlite':
+        if dimension == 'day':
+            return func.strftime('%Y-%m-%d', model.created_at, '+7 hours')
+        if dimension == 'week':
+            # Forward to Sunday, back to that week's Monday
+            return func.date(model.created_at, '+7 hours', 'weekday 0', '-6 days')
+        return func.strftime('%Y-%m', model.created_at, '+7 hours')
+    if dimension == 'day':
+        return func.to_char(_local(model), 'YYYY-MM-DD')
+    if dimension == 'week':
+        return func.to_char(func.date_trunc('week', _local(model)), 'YYYY-MM-DD')
+    return func.to_char(_local(model), 'YYYY-MM')
+
+
+def _expression(model, dimension, dialect):
+    if dimension in TIME_DIMENSIONS:
+        return _period(model, dimension, dialect)
+    if dimension == 'user':
+        return model.user_id
+    if dimension in USER_DIMENSIONS:
+        return getattr(User, dimension)
+    if dimension == 'category':
+        return func.coalesce(Category.name, model.category)
+    if dimension == 'item':
+        return func.coalesce(ItemLibrary.item_name, model.item_name)
+    return getattr(model, dimension)
+
+
+def _grouped_counts(model, dimensions, filters, dialect):
+    keys = [_expression(model, d, dialect) for d in dimensions]
+    query = db.session.query(*keys, func.count(model.id))
+    if any(d in USER_DIMENSIONS for d in dimensions):
+        query = query.join(User, User.id == model.user_id)
+    if 'category' in dimensions:
+        query = query.outerjoin(Category, Category.id == model.category_id)
+    if 'item' in dimensions:
+        query = query.outerjoin(ItemLibrary, ItemLibrary.id == model.item_id)
+    return query.filter(*filter_clauses(model, filters)).group_by(*keys).all()
+
+
+def _label(value):
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return BLANK
+    return value
+
+
+def _user_names(user_ids):
+    rows = db.session.query(User.id, User.name, User.employee_id).filter(User.id.in_(list(user_ids))).all()
+    return {user_id: f'{name} ({employee_id})' if name else employee_id for user_id, name, employee_id in rows}
+
+
+def _keep(dimension, totals, top):
+    """Labels to show for a dimension, in display order; others go to OTHER."""
+    if dimension in TIME_DIMENSIONS:
+        return sorted(totals)
+    ranked = sorted(totals, key=lambda label: (-totals[label], str(label)))
+    return ranked[:top]
+
+
+def pivot(row_dimension, column_dimension, filters, top=DEFAULT_TOP):
+    """Cross-tab of report counts; ``filters`` as parsed by report_query.parse_filters.
+
+    Returns plain lists/dicts (cacheable): row and column labels, a cell
+    matrix, totals per row/column and the grand total.
+    """
+    dimensions = (row_dimension, column_dimension)
+    dialect = db.session.get_bind().dialect.name
+    start_utc, _ = utc_range(filters)
+
+    counts = defaultdict(int)
+    for model in report_archive.sources(start_utc):
+        for row_key, column_key, count in _grouped_counts(model, dimensions, filters, dialect):
+            counts[(row_key, column_key)] += count
+
+    # Users are grouped by id; label them with name and employee id
+    if 'user' in dimensions:
+        position = dimensions.index('user')
+        names = _user_names({key[position] for key in counts})
+        named = defaultdict(int)
+        for key, count in counts.items():
+            key = list(key)
+            key[position] = names.get(key[position], f'#{key[position]}')
+            named[tuple(key)] += count
+        counts = named
+
+    labelled = defaultdict(int)
+    for (row_key, column_key), count in counts.items():
+        labelled[(_label(row_key), _label(column_key))] += count
+
+    row_totals, column_totals = defaultdict(int), defaultdict(int)
+    for (row_label, column_label), count in labelled.items():
+        row_totals[row_label] += count
+        column_totals[column_label] += count
+    row_labels = _keep(row_dimension, row_totals, top)
+    column_labels = _keep(column_dimension, column_totals, top)
+    if len(row_labels) < len(row_totals):
+        row_labels.append(OTHER)
+    if len(column_labels) < len(column_totals):
+        column_labels.append(OTHER)
+
+    row_index = {label: i for i, label in enumerate(row_labels)}
+    column_index = {label: i for i, label in enumerate(column_labels)}
+    cells = [[0] * len(column_labels) for _ in row_labels]
+    for (row_label, column_label), count in labelled.items():
+        i = row_index.get(row_label, row_index.get(OTHER))
+        j = column_index.get(column_label, column_index.get(OTHER))
+        cells[i][j] += count
+
+    return {
+        'rows': {'dimension': row_dimension, 'labels': [str(label) for label in row_labels]},
+        'columns': {'dimension': column_dimension, 'labels': [str(label) for label in column_labels]},
+        'cells': cells,
+        'row_totals': [sum(row) for row in cells],
+        'column_totals': [sum(column) for column in zip(*cells)] if cells else [],
+        'total': sum(labelled.values()),
+    }
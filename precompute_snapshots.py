@@ -0,0 +1,22 @@
+"""Precompute monitoring snapshots for the default views.
+
+Run from cron ahead of the first admin visit, e.g.:
+    */15 * * * * cd /path/to/app && python precompute_snapshots.py
+"""
+from app import create_app
+from snapshots import precompute_all
+import analytics
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        count = precompute_all()
+        print(f"✅ Precomputed {count} monitoring snapshots")
+        if analytics.engine.enabled and analytics.engine.snapshot_dir:
+            rows = analytics.engine.refresh_snapshot()
+            print(f"✅ Wrote columnar snapshot of {rows} reports to {analytics.engine.snapshot_dir}")
+
+
+if __name__ == '__main__':
+    main()
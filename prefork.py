@@ -0,0 +1,233 @@
+"""Pre-fork launcher: N waitress worker processes sharing one listening socket.
+
+The master binds the socket, loads the app once and forks the workers, which
+inherit the socket and accept from it directly. Each worker disposes the
+database pool it inherited and serves with its own waitress thread pool, so
+CPU-bound work (template rendering, password hashing, Excel parsing) spreads
+over all cores.
+
+Signals to the master:
+- SIGTERM / SIGINT: stop accepting, let workers finish in-flight requests, exit
+- SIGHUP: graceful reload; the master re-executes itself (picking up new code)
+  and passes the listening socket on, so no connection is refused; old
+  workers drain and exit
+- SIGTTIN / SIGTTOU: add / remove a worker
+
+Workers are recycled after ``max_requests`` requests (plus random jitter so
+they don't all restart at once) to cap memory growth.
+"""
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+
+LISTEN_FD_ENV = 'PREFORK_LISTEN_FD'
+
+logger = logging.getLogger('prefork')
+
+
+def bind_socket(host, port, backlog=1024):
+    """Listening socket, reused from a reloading master when one is handed over."""
+    fd = os.environ.pop(LISTEN_FD_ENV, None)
+    if fd is not None:
+        sock = socket.socket(fileno=int(fd))
+    else:
+        sock = socket.create_server((host, port), backlog=backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def after_fork(app):
+    """Reset per-process resources inherited from the master."""
+    from models import db
+    from cache import cache
+    with app.app_context():
+        # Connections opened in the master must not be shared; close=False leaves them to the master
+        db.engine.dispose(close=False)
+    cache.after_fork()
+
+
+class RequestCounter:
+    """WSGI middleware calling ``on_limit`` once after ``limit`` requests."""
+
+    def __init__(self, app, limit, on_limit):
+        self.app = app
+        self.limit = limit
+        self.on_limit = on_limit
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.count += 1
+            reached = self.limit and self.count == self.limit
+        if reached:
+            self.on_limit()
+        return self.app(environ, start_response)
+
+
+class Worker:
+    """One worker process: waitress on the inherited socket, drained on shutdown."""
+
+    def __init__(self, app, sock, threads, max_requests, graceful_timeout, server_options):
+        self.app = app
+        self.sock = sock
+        self.threads = threads
+        self.max_requests = max_requests
+        self.graceful_timeout = graceful_timeout
+        self.server_options = server_options
+        self.stopping = threading.Event()
+        self.server = None
+
+    def run(self):
+        from waitress.server import create_server
+        signal.signal(signal.SIGTERM, lambda *_: self.stop())
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        after_fork(self.app)
+        wsgi_app = RequestCounter(self.app, self.max_requests, self.stop)
+        self.server = create_server(wsgi_app, sockets=[self.sock], threads=self.threads, **self.server_options)
+        threading.Thread(target=self._drain, name='prefork-drain', daemon=True).start()
+        self.server.run()
+
+    def stop(self):
+        self.stopping.set()
+
+    def _drain(self):
+        self.stopping.wait()
+        server = self.server
+        # Leave new connections to the other workers
+        server.accepting = False
+        deadline = time.monotonic() + self.graceful_timeout
+        while time.monotonic() < deadline:
+            channels = list(server.active_channels.values())
+            for channel in channels:
+                # Same rule waitress uses for idle keep-alive connections
+                if not channel.requests and not channel.total_outbufs_len:
+                    channel.will_close = True
+            server.pull_trigger()
+            dispatcher = server.task_dispatcher
+            if not channels and not dispatcher.queue and dispatcher.active_count == 0:
+                break
+            time.sleep(0.05)
+        os._exit(0)
+
+
+class Master:
+    def __init__(self, app, host, port, workers=2, threads=16, max_requests=0,
+                 max_requests_jitter=0, graceful_timeout=30, **server_options):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.worker_count = workers
+        self.threads = threads
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.server_options = server_options
+        self.workers = {}
+        self.sock = None
+        self._signals = []
+
+    def spawn(self):
+        limit = self.max_requests
+        if limit and self.max_requests_jitter:
+            limit += random.randint(0, self.max_requests_jitter)
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                Worker(self.app, self.sock, self.threads, limit, self.graceful_timeout, self.server_options).run()
+            except Exception:
+                logger.exception('Worker failed')
+                code = 1
+            finally:
+                os._exit(code)
+        self.workers[pid] = time.monotonic()
+        logger.info(f"Started worker {pid}")
+
+    def run(self):
+        self.sock = bind_socket(self.host, self.port)
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(signum, lambda signum, _: self._signals.append(signum))
+        host, port = self.sock.getsockname()[:2]
+        logger.info(f"Master {os.getpid()} serving on http://{host}:{port} with {self.worker_count} workers")
+
+        while True:
+            while len(self.workers) < self.worker_count:
+                self.spawn()
+            if self._signals:
+                signum = self._signals.pop(0)
+                if signum in (signal.SIGTERM, signal.SIGINT):
+                    self.shutdown()
+                    return
+                if signum == signal.SIGHUP:
+                    self.reload()
+                if signum == signal.SIGTTIN:
+                    self.worker_count += 1
+                if signum == signal.SIGTTOU and self.worker_count > 1:
+                    self.worker_count -= 1
+                    self._stop(next(iter(self.workers)))
+            self.reap()
+            time.sleep(0.2)
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            # Unknown pids are workers of a previous master image after a reload
+            if self.workers.pop(pid, None) is not None:
+                logger.info(f"Worker {pid} exited (status {status})")
+
+    def _stop(self, pid):
+        self.workers.pop(pid, None)
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def shutdown(self):
+        logger.info('Shutting down: draining workers')
+        pids = list(self.workers)
+        for pid in pids:
+            self._stop(pid)
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while pids and time.monotonic() < deadline:
+            for pid in list(pids):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    pids.remove(pid)
+            time.sleep(0.1)
+        for pid in pids:
+            os.kill(pid, signal.SIGKILL)
+        self.sock.close()
+
+    def reload(self):
+        """Re-exec the master with the listening socket; old workers drain in the background."""
+        logger.info('Reloading')
+        for pid in list(self.workers):
+            self._stop(pid)
+        os.environ[LISTEN_FD_ENV] = str(self.sock.fileno())
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+
+def serve(app, host='0.0.0.0', port=8000, workers=2, **options):
+    """Run ``app`` with ``workers`` processes (see :class:`Master` for options)."""
+    if not hasattr(os, 'fork'):
+        raise RuntimeError('Multi-process serving needs os.fork(); use WAITRESS_WORKERS=1 on this platform')
+    from cache import cache
+    if cache.store is None:
+        # Data versions would be per process: a write in one worker leaves the others serving stale results
+        raise RuntimeError('Multi-process serving needs a shared result cache store; set RESULT_CACHE_STORE')
+    Master(app, host, port, workers=workers, **options).run()
@@ -0,0 +1,155 @@
+"""Cold storage for reports from closed months.
+
+Reports can only be edited or deleted for 2 days, so once a GMT+7 month has
+ended and the edit window has passed its rows never change again.
+``archive_reports.py`` moves those months from ``report`` to
+``report_archive`` in batches. Readers go through :func:`sources`, which only
+adds the archive table when the requested range starts before the newest
+archived report, so queries over recent data keep scanning the small hot table.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, text
+from models import db, User, Category, Report, ReportArchive
+
+EDIT_WINDOW = timedelta(days=2)
+
+
+def archive_boundary():
+    """created_at of the newest archived report, or None if nothing is archived."""
+    return db.session.query(func.max(ReportArchive.created_at)).scalar()
+
+
+def sources(start_utc=None):
+    """Report models to read for a range starting at ``start_utc`` (None = all time)."""
+    boundary = archive_boundary()
+    if boundary is not None and (start_utc is None or start_utc <= boundary):
+        return [Report, ReportArchive]
+    return [Report]
+
+
+def find(report_id):
+    """Look a report up in the hot table, then the archive. Returns None if missing."""
+    return db.session.get(Report, report_id) or db.session.get(ReportArchive, report_id)
+
+
+DETAIL_COLUMNS = ('id', 'time', 'title', 'notes', 'item_name', 'part_number', 'customer',
+                  'user_id', 'created_at')
+
+
+def detail_statement(model, report_id):
+    """SELECT for one report's detail: DETAIL_COLUMNS plus current category name and user.
+
+    Plain columns with joins instead of Report/User objects; also executed by
+    the async tier (async_api.py).
+    """
+    return select(
+        *[getattr(model, name) for name in DETAIL_COLUMNS],
+        func.coalesce(Category.name, model.category).label('category'),
+        User.name.label('user_name'),
+        User.employee_id.label('user_employee_id')
+    ).join(User, User.id == model.user_id).outerjoin(
+        Category, Category.id == model.category_id
+    ).where(model.id == report_id)
+
+
+def find_detail(report_id):
+    """Detail row of a report (hot table, then archive), or None."""
+    for model in (Report, ReportArchive):
+        row = db.session.execute(detail_statement(model, report_id)).first()
+        if row is not None:
+            return row
+    return None
+
+
+def detail_payload(row, current_user_id, now=None):
+    """JSON body for /api/report/<id>. Editable within 2 days by its owner."""
+    days_old = ((now or datetime.utcnow()) - row.created_at).days
+    return {
+        'success': True,
+        'report': {
+            'id': row.id,
+            'time': row.time,
+            'category': row.category,
+            'title': row.title,
+            'notes': row.notes,
+            'item_name': row.item_name,
+            'part_number': row.part_number,
+            'customer': row.customer,
+            'user_name': row.user_name,
+            'user_employee_id': row.user_employee_id,
+            'created_at': row.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'is_editable': days_old < 2 and row.user_id == current_user_id
+        }
+    }
+
+
+def count_by_user(user_ids=None):
+    """{user_id: report count} across hot and archived reports."""
+    counts = {}
+    for model in sources():
+        query = db.session.query(model.user_id, func.count(model.id))
+        if user_ids is not None:
+            query = query.filter(model.user_id.in_(user_ids))
+        for user_id, count in query.group_by(model.user_id):
+            counts[user_id] = counts.get(user_id, 0) + count
+    return counts
+
+
+def total_count():
+    return sum(db.session.query(func.count(model.id)).scalar() for model in sources())
+
+
+def delete_for_user(user_id):
+    for model in sources():
+        model.query.filter_by(user_id=user_id).delete()
+
+
+def reuses_ids(table=None):
+    """True when the hot table may hand out a deleted id again.
+
+    SQLite rowid tables without AUTOINCREMENT reuse the highest id once its row
+    is gone; Postgres sequences never do.
+    """
+    table = table if table is not None else Report.__table__
+    if db.session.get_bind().dialect.name != 'sqlite':
+        return False
+    sql = db.session.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                             {'name': table.name}).scalar()
+    return 'AUTOINCREMENT' not in (sql or '').upper()
+
+
+def closed_cutoff(now=None):
+    """UTC start of the earliest GMT+7 month that may still change."""
+    local = (now or datetime.utcnow()) + timedelta(hours=7) - EDIT_WINDOW
+    month_start = datetime(local.year, local.month, 1)
+    return month_start - timedelta(hours=7)
+
+
+def archive_closed_months(batch_size=5000, now=None):
+    """Move reports of closed months to report_archive. Returns the number moved.
+
+    Each batch is copied and deleted in one transaction, so the job can be
+    interrupted and rerun safely. Raises RuntimeError on a SQLite report table
+    that can reuse ids (run migrate_report_autoincrement.py first).
+    """
+    if reuses_ids(Report.__table__):
+        raise RuntimeError('The report table can reuse ids of archived reports; '
+                           'run migrate_report_autoincrement.py before archiving')
+    cutoff = closed_cutoff(now)
+    hot = Report.__table__
+    archive = ReportArchive.__table__
+    columns = [c.name for c in archive.columns]
+    moved = 0
+    while True:
+        ids = [row[0] for row in db.session.query(Report.id).filter(
+            Report.created_at < cutoff
+        ).order_by(Report.created_at, Report.id).limit(batch_size)]
+        if not ids:
+            break
+        db.session.execute(archive.insert().from_select(
+            columns, select(*[hot.c[name] for name in columns]).where(hot.c.id.in_(ids))
+        ))
+        db.session.execute(hot.delete().where(hot.c.id.in_(ids)))
+        db.session.commit()
+        moved += len(ids)
+    return moved
@@ -0,0 +1,307 @@
+"""Bulk import of historical (paper-log) reports from .xlsx or .csv files.
+
+Rows are streamed (openpyxl read-only mode, or the csv module) and written in
+chunks: users are resolved by employee id from one prefetch, categories from
+the cached category maps, and the item triples of a chunk with one
+``insert_ignore`` and one lookup. Chunks are written with ``COPY`` on Postgres
+and ``executemany`` elsewhere, one transaction each, so operators can keep
+submitting while a large file loads. A failed import keeps the chunks already
+written; :class:`ImportResult` says how far it got.
+
+Dates and times in the file are GMT+7. Rows of closed months land in the hot
+``report`` table and are moved by the next archive_reports.py run. Call
+:func:`rebuild_rollups` afterwards (the result cache, monitoring snapshots and
+the columnar arrays all hold the old counts).
+"""
+import csv
+import io
+import os
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import func
+
+import analytics
+import category_lookup
+import snapshots
+from cache import cache
+from item_library import insert_ignore, normalize_triple
+from models import db, User, Report, ItemLibrary
+
+CHUNK_SIZE = 5000
+MAX_ERRORS = 50  # row errors kept for the summary
+TIME_FORMATS = ('%H:%M', '%H:%M:%S')
+# Checked per row: one over-long value would make Postgres reject the whole chunk
+LENGTH_CHECKED = ('time', 'category', 'item_name', 'part_number', 'customer')
+GMT7 = timedelta(hours=7)
+
+# Normalized header (lower case, single spaces) -> field
+HEADERS = {
+    'employee id': 'employee_id', 'nik': 'employee_id', 'id karyawan': 'employee_id',
+    'date': 'date', 'tanggal': 'date',
+    'time': 'time', 'jam': 'time',
+    'category': 'category', 'kategori': 'category',
+    'title': 'title', 'judul': 'title',
+    'notes': 'notes', 'catatan': 'notes',
+    'item': 'item_name', 'item name': 'item_name',
+    'part number': 'part_number', 'part no': 'part_number',
+    'customer': 'customer',
+}
+REQUIRED = ('employee_id', 'date', 'category', 'title')
+COLUMNS = ('user_id', 'time', 'category', 'category_id', 'title', 'notes',
+           'item_name', 'part_number', 'customer', 'item_id', 'created_at')
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d')
+
+
+class ImportResult:
+    """Running totals of an import."""
+
+    def __init__(self):
+        self.imported = 0
+        self.skipped = 0
+        self.errors = []  # (line, message), the first MAX_ERRORS
+        self.first_date = None
+        self.last_date = None
+
+    def error(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line, message))
+
+    def as_dict(self):
+        return {
+            'imported': self.imported,
+            'skipped': self.skipped,
+            'errors': [{'line': line, 'message': message} for line, message in self.errors],
+            'first_date': self.first_date.isoformat() if self.first_date else None,
+            'last_date': self.last_date.isoformat() if self.last_date else None,
+        }
+
+
+def _header_map(header):
+    fields = {}
+    for index, name in enumerate(header):
+        key = ' '.join(str(name or '').strip().lower().replace('_', ' ').split())
+        if key in HEADERS and HEADERS[key] not in fields:
+            fields[HEADERS[key]] = index
+    missing = [field for field in REQUIRED if field not in fields]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+    return fields
+
+
+def _records(rows, fields, first_line):
+    for line, row in enumerate(rows, start=first_line):
+        if not row or all(value in (None, '') for value in row):
+            continue
+        yield line, {field: row[index] if index < len(row) else None for field, index in fields.items()}
+
+
+def _xlsx_rows(workbook, rows, fields):
+    try:
+        yield from _records(rows, fields, 2)
+    finally:
+        workbook.close()
+
+
+def read_rows(stream, filename):
+    """(line, {field: value}) for each row of an .xlsx or .csv file (binary stream).
+
+    The header row is checked right away; raises ValueError for unsupported
+    files or missing columns.
+    """
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension == '.xlsx':
+        from openpyxl import load_workbook
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+        rows = workbook.active.iter_rows(values_only=True)
+        try:
+            fields = _header_map(next(rows, ()))
+        except ValueError:
+            workbook.close()
+            raise
+        return _xlsx_rows(workbook, rows, fields)
+    if extension == '.csv':
+        rows = csv.reader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+        return _records(rows, _header_map(next(rows, ())), 2)
+    raise ValueError('Only .xlsx and .csv files are supported')
+
+
+def _text(value):
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # numeric cells such as employee ids
+    return str(value).strip() or None
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = _text(value)
+    if text:
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(text[:10], fmt).date()
+            except ValueError:
+                pass
+    raise ValueError(f'invalid date {value!r}')
+
+
+def _parse_time(value, cell_date):
+    """(time of day, 'HH:MM' label). A datetime in the date column supplies the time."""
+    if isinstance(value, (datetime, time)):
+        value = value.time() if isinstance(value, datetime) else value
+        return value, value.strftime('%H:%M')
+    text = _text(value)
+    if text:
+        for fmt in TIME_FORMATS:
+            try:
+                parsed = datetime.strptime(text, fmt).time()
+            except ValueError:
+                continue
+            return parsed, parsed.strftime('%H:%M')
+        raise ValueError(f'invalid time {value!r}')
+    if isinstance(cell_date, datetime) and cell_date.time() != time():
+        return cell_date.time(), cell_date.strftime('%H:%M')
+    return time(), None
+
+
+class _Resolver:
+    """Users (one prefetch) and library items (per chunk) for a whole import."""
+
+    def __init__(self):
+        self.users = dict(db.session.query(User.employee_id, User.id))
+        self.items = {}
+
+    def user_id(self, employee_id):
+        return self.users.get(employee_id)
+
+    def item_ids(self, triples):
+        """{triple: library id}, adding the triples the library doesn't have yet."""
+        missing = {triple for triple in triples if triple not in self.items}
+        if missing:
+            insert_ignore(missing)
+            names = {item_name for item_name, _, _ in missing}
+            rows = db.session.query(
+                ItemLibrary.id, ItemLibrary.item_name,
+                func.coalesce(ItemLibrary.part_number, ''), func.coalesce(ItemLibrary.customer, '')
+            ).filter(ItemLibrary.item_name.in_(names))
+            for item_id, item_name, part_number, customer in rows:
+                self.items[(item_name, part_number or None, customer or None)] = item_id
+        return self.items
+
+
+def _prepare(record, resolver, result):
+    employee_id = _text(record.get('employee_id'))
+    user_id = resolver.user_id(employee_id)
+    if user_id is None:
+        raise ValueError(f'unknown employee id {employee_id!r}')
+    category = _text(record.get('category'))
+    title = _text(record.get('title'))
+    if not category or not title:
+        raise ValueError('category and title are required')
+    local_date = _parse_date(record.get('date'))
+    local_time, time_label = _parse_time(record.get('time'), record.get('date'))
+    triple = normalize_triple(_text(record.get('item_name')), _text(record.get('part_number')),
+                              _text(record.get('customer')))
+    row = {
+        'user_id': user_id,
+        'time': time_label,
+        'category': category,
+        'category_id': category_lookup.category_id(category),
+        'title': title[:200],
+        'notes': _text(record.get('notes')) or '',
+        'item_name': triple[0] or None,
+        'part_number': triple[1],
+        'customer': triple[2],
+        'item_id': None,
+        'created_at': datetime.combine(local_date, local_time) - GMT7,
+    }
+    for name in LENGTH_CHECKED:
+        limit = Report.__table__.c[name].type.length
+        if row[name] and len(row[name]) > limit:
+            raise ValueError(f'{name} longer than {limit} characters')
+    if result.first_date is None or local_date < result.first_date:
+        result.first_date = local_date
+    if result.last_date is None or local_date > result.last_date:
+        result.last_date = local_date
+    return row
+
+
+def _copy(rows):
+    """COPY rows into report through the session's psycopg2 connection."""
+    buffer = io.StringIO()
+    # Strings are quoted, so '' stays an empty string and None (unquoted) becomes NULL
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+    for row in rows:
+        writer.writerow([row[column] for column in COLUMNS])
+    buffer.seek(0)
+    connection = db.session.connection().connection.driver_connection
+    with connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY report ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _write(rows, resolver):
+    triples = {(row['item_name'], row['part_number'], row['customer']) for row in rows if row['item_name']}
+    if triples:
+        items = resolver.item_ids(triples)
+        for row in rows:
+            if row['item_name']:
+                row['item_id'] = items.get((row['item_name'], row['part_number'], row['customer']))
+    if db.session.get_bind().dialect.name == 'postgresql':
+        _copy(rows)
+    else:
+        db.session.execute(Report.__table__.insert(), rows)
+    db.session.commit()
+
+
+def import_reports(records, chunk_size=CHUNK_SIZE, result=None):
+    """Write (line, record) pairs from :func:`read_rows` as reports.
+
+    A generator: yields the running :class:`ImportResult` after each chunk,
+    so callers can show progress. Invalid rows are skipped and counted.
+    """
+    result = result or ImportResult()
+    resolver = _Resolver()
+    chunk = []
+    for line, record in records:
+        try:
+            chunk.append(_prepare(record, resolver, result))
+        except ValueError as exc:
+            result.error(line, str(exc))
+        if len(chunk) >= chunk_size:
+            _write(chunk, resolver)
+            result.imported += len(chunk)
+            chunk = []
+            yield result
+    if chunk:
+        _write(chunk, resolver)
+        result.imported += len(chunk)
+    yield result
+
+
+def check_rows(records):
+    """Validate (line, record) pairs without writing anything. Returns an ImportResult."""
+    result = ImportResult()
+    resolver = _Resolver()
+    for line, record in records:
+        try:
+            _prepare(record, resolver, result)
+            result.imported += 1
+        except ValueError as exc:
+            result.error(line, str(exc))
+    return result
+
+
+def rebuild_rollups():
+    """Recompute what summarises reports after an import."""
+    snapshots.invalidate()
+    db.session.commit()
+    # 'history' also drops cached results of closed date ranges
+    cache.bump('reports')
+    cache.bump('history')
+    snapshots.precompute_all()
+    if analytics.engine.enabled and analytics.engine.snapshot_dir:
+        analytics.engine.refresh_snapshot()
@@ -0,0 +1,170 @@
+"""Filterable report listing shared by /api/reports and the monitoring views.
+
+Filters turn into WHERE clauses on the indexed id columns where possible
+(user_id, item_id, category_id; department via an IN subquery on user_id), and
+pages are read newest first with keyset pagination on (created_at, id), so a
+page costs one index range scan per table however deep the client has paged.
+Only the requested fields are selected and rows come back as plain tuples.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, or_, and_
+
+import category_lookup
+import report_archive
+from aggregates import item_filter
+from models import db, User, Category
+from pagination import DEFAULT_PAGE_SIZE, after_cursor, encode_cursor
+
+GMT7 = timedelta(hours=7)
+NOTES_PREVIEW = 50  # characters of notes shown by the list views
+
+# Field name -> column expression; fields from other tables add their join
+FIELDS = {
+    'id': lambda model: model.id,
+    'created_at': lambda model: model.created_at,
+    'time': lambda model: model.time,
+    'category': lambda model: func.coalesce(Category.name, model.category),
+    'category_id': lambda model: model.category_id,
+    'title': lambda model: model.title,
+    'notes': lambda model: model.notes,
+    # One character more than shown, so templates can tell whether to add '...'
+    'notes_preview': lambda model: func.substr(model.notes, 1, NOTES_PREVIEW + 1),
+    'item_name': lambda model: model.item_name,
+    'part_number': lambda model: model.part_number,
+    'customer': lambda model: model.customer,
+    'user_id': lambda model: model.user_id,
+    'user_name': lambda model: User.name,
+    'employee_id': lambda model: User.employee_id,
+    'department': lambda model: User.department,
+}
+USER_FIELDS = {'user_name', 'employee_id', 'department'}
+DEFAULT_FIELDS = ('id', 'created_at', 'time', 'category', 'title', 'item_name', 'part_number', 'customer')
+# Dashboard and monitoring report tables
+LIST_FIELDS = ('id', 'created_at', 'time', 'category', 'category_id', 'title', 'notes_preview',
+               'item_name', 'part_number', 'customer')
+FILTERS = ('user_id', 'department', 'category', 'item', 'customer', 'part_number',
+           'start_date', 'end_date', 'q')
+
+
+def parse_fields(value):
+    """Field list from a comma separated ``fields`` argument; raises ValueError."""
+    if not value:
+        return DEFAULT_FIELDS
+    fields = tuple(dict.fromkeys(f.strip() for f in value.split(',') if f.strip()))
+    unknown = [f for f in fields if f not in FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return fields
+
+
+def parse_filters(args):
+    """Filters from request arguments; dates are GMT+7 days (YYYY-MM-DD). Raises ValueError."""
+    filters = {}
+    for name in FILTERS:
+        value = (args.get(name) or '').strip()
+        if not value:
+            continue
+        if name == 'user_id':
+            try:
+                value = int(value)
+            except ValueError:
+                raise ValueError('user_id must be a number')
+        elif name in ('start_date', 'end_date'):
+            try:
+                value = datetime.strptime(value, '%Y-%m-%d').date()
+            except ValueError:
+                raise ValueError(f'{name} must be YYYY-MM-DD')
+        filters[name] = value
+    return filters
+
+
+def utc_range(filters):
+    """(start_utc, end_utc) for the date filters; either may be None."""
+    start_utc = end_utc = None
+    if 'start_date' in filters:
+        start_utc = datetime.combine(filters['start_date'], datetime.min.time()) - GMT7
+    if 'end_date' in filters:
+        end_utc = datetime.combine(filters['end_date'] + timedelta(days=1), datetime.min.time()) - GMT7
+    return start_utc, end_utc
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def filter_clauses(model, filters):
+    """WHERE clauses on ``model`` (Report or ReportArchive) for parsed ``filters``."""
+    clauses = []
+    if 'user_id' in filters:
+        clauses.append(model.user_id == filters['user_id'])
+    if 'department' in filters:
+        clauses.append(model.user_id.in_(select(User.id).where(User.department == filters['department'])))
+    if 'category' in filters:
+        name = filters['category']
+        category_id = category_lookup.category_id(name)
+        unlinked = and_(model.category_id.is_(None), model.category == name)
+        clauses.append(or_(model.category_id == category_id, unlinked) if category_id else unlinked)
+    if 'item' in filters:
+        clauses.append(item_filter(model, filters['item']))
+    if 'customer' in filters:
+        clauses.append(model.customer == filters['customer'])
+    if 'part_number' in filters:
+        clauses.append(model.part_number == filters['part_number'])
+    start_utc, end_utc = utc_range(filters)
+    if start_utc is not None:
+        clauses.append(model.created_at >= start_utc)
+    if end_utc is not None:
+        clauses.append(model.created_at < end_utc)
+    if 'q' in filters:
+        prefix = _escape_like(filters['q']) + '%'
+        clauses.append(or_(model.title.ilike(prefix, escape='\\'), model.item_name.ilike(prefix, escape='\\')))
+    return clauses
+
+
+def statement(model, filters, fields, sort_key=True):
+    """SELECT created_at, id (the sort key, unless ``sort_key`` is false) followed by ``fields``, filtered."""
+    columns = [FIELDS[f](model).label(f) for f in fields]
+    stmt = select(model.created_at, model.id, *columns) if sort_key else select(*columns)
+    if 'category' in fields:
+        stmt = stmt.outerjoin(Category, Category.id == model.category_id)
+    if USER_FIELDS.intersection(fields):
+        stmt = stmt.join(User, User.id == model.user_id)
+    return stmt.where(*filter_clauses(model, filters))
+
+
+def page(filters, fields=DEFAULT_FIELDS, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """One page of reports, newest first. Returns (rows, next_cursor).
+
+    Rows are tuples of ``fields``; next_cursor is None on the last page.
+    Raises ValueError for a malformed cursor.
+    """
+    start_utc, _ = utc_range(filters)
+    key_rows = []
+    # Each table yields its own newest limit + 1 rows; merged they give the page
+    for model in report_archive.sources(start_utc):
+        sort_key = [model.created_at, model.id]
+        stmt = statement(model, filters, fields)
+        if cursor:
+            stmt = stmt.where(after_cursor(sort_key, cursor, descending=True))
+        stmt = stmt.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+        key_rows.extend(db.session.execute(stmt).all())
+    key_rows.sort(key=lambda row: (row[0], row[1]), reverse=True)
+
+    next_cursor = None
+    if len(key_rows) > limit:
+        key_rows = key_rows[:limit]
+        next_cursor = encode_cursor(key_rows[-1][:2])
+    return [tuple(row[2:]) for row in key_rows], next_cursor
+
+
+def rows(filters, fields):
+    """All matching reports as named rows of ``fields``, unordered, for the unpaged list views.
+
+    Only the listed columns are read (``notes_preview`` instead of ``notes``),
+    so no Report objects or full notes are held for the page.
+    """
+    start_utc, _ = utc_range(filters)
+    result = []
+    for model in report_archive.sources(start_utc):
+        result.extend(db.session.execute(statement(model, filters, fields, sort_key=False)).all())
+    return result
@@ -0,0 +1,100 @@
+"""JSON encoding for API responses and template blobs.
+
+Uses orjson or msgspec when installed and falls back to the stdlib ``json``
+module. :class:`FastJSONProvider` plugs the encoder into Flask, so
+``jsonify``, dict return values and the ``tojson`` template filter all use it.
+
+Large lists can be sent in a columnar shape, built straight from query tuples
+without creating ORM objects or a dict per row::
+
+    {"fields": ["id", "title"], "columns": [[1, 2], ["a", "b"]]}
+
+``static/columnar.js`` turns that back into row objects in the browser.
+"""
+import json
+from flask.json.provider import DefaultJSONProvider, _default
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional dependency
+    msgspec = None
+
+if orjson is not None:
+    BACKEND = 'orjson'
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps(obj):
+        """Encode ``obj`` to UTF-8 JSON bytes."""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    loads = orjson.loads
+elif msgspec is not None:
+    BACKEND = 'msgspec'
+    _encoder = msgspec.json.Encoder(enc_hook=_default)
+    _decoder = msgspec.json.Decoder()
+
+    def dumps(obj):
+        """Encode ``obj`` to UTF-8 JSON bytes."""
+        return _encoder.encode(obj)
+
+    loads = _decoder.decode
+else:
+    BACKEND = 'json'
+
+    def dumps(obj):
+        """Encode ``obj`` to UTF-8 JSON bytes."""
+        return json.dumps(obj, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    loads = json.loads
+
+
+def stdlib_dumps(obj):
+    """Reference encoder with Flask's default settings (used by the benchmark)."""
+    return json.dumps(obj, default=_default, sort_keys=True).encode('utf-8')
+
+
+def rows_to_dicts(rows, fields):
+    """[{field: value}] from tuple rows, for small payloads that keep the row shape."""
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def columnar(rows, fields):
+    """Columnar payload for a list of tuple rows: one array per field."""
+    rows = list(rows)
+    columns = [list(column) for column in zip(*rows)] if rows else [[] for _ in fields]
+    return {'fields': list(fields), 'columns': columns}
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by :func:`dumps`.
+
+    Keys are not sorted and output is always compact. Dates are still
+    encoded like Flask's default provider (HTTP date strings).
+    """
+
+    def dumps(self, obj, **kwargs):
+        kwargs.pop('sort_keys', None)  # passed by the tojson filter
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj) + b'\n', mimetype=self.mimetype)
+
+
+def init_app(app):
+    app.json = FastJSONProvider(app)
+    if 'jinja_env' in app.__dict__:
+        # Environment already created: point the tojson filter at the new provider
+        app.jinja_env.policies['json.dumps_function'] = app.json.dumps
@@ -0,0 +1,150 @@
+"""Precomputed snapshots of the default monitoring views.
+
+The default 30-day all-users summary (which includes the top items) and the
+stats of every favorite user are computed ahead of time, either by
+``precompute_snapshots.py`` from cron or by the optional in-process scheduler.
+``monitoring()`` then serves the freshest snapshot and merges in only the
+reports created after it was taken (``Report.id`` above the snapshot's
+high-water mark). Editing or deleting a report covered by a snapshot drops it.
+"""
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from models import db, Report, User, MonitoringSnapshot
+import aggregates
+import analytics
+
+SUMMARY = 'summary'
+USER_RANGE = 'user_range'
+USER_ITEMS = 'user_items'
+DEFAULT_DAYS = 30
+
+
+def default_range(now=None):
+    """Default monitoring range in GMT+7 dates: the last 30 days including today."""
+    end_date = ((now or datetime.utcnow()) + timedelta(hours=7)).date()
+    return end_date - timedelta(days=DEFAULT_DAYS - 1), end_date
+
+
+def local_range_to_utc(start_date, end_date):
+    start_utc = datetime.combine(start_date, datetime.min.time()) - timedelta(hours=7)
+    end_utc = datetime.combine(end_date + timedelta(days=1), datetime.min.time()) - timedelta(hours=7)
+    return start_utc, end_utc
+
+
+def _decode(view, data):
+    if view == SUMMARY:
+        # JSON object keys are strings; user counts are keyed by user id
+        data['user_counts'] = {int(k): v for k, v in data['user_counts'].items()}
+    return data
+
+
+def save_snapshot(view, start_date, end_date, data, max_report_id, user_id=None):
+    """Store a snapshot, replacing older ones for the same view."""
+    MonitoringSnapshot.query.filter_by(
+        view=view, user_id=user_id, start_date=start_date, end_date=end_date
+    ).delete()
+    db.session.add(MonitoringSnapshot(
+        view=view,
+        user_id=user_id,
+        start_date=start_date,
+        end_date=end_date,
+        max_report_id=max_report_id,
+        data=json.dumps(data),
+    ))
+
+
+def load_snapshot(view, start_date=None, end_date=None, user_id=None):
+    """Return (data, max_report_id) of the freshest matching snapshot, or None."""
+    query = MonitoringSnapshot.query.filter_by(view=view, user_id=user_id)
+    if start_date is not None:
+        query = query.filter_by(start_date=start_date, end_date=end_date)
+    snapshot = query.order_by(MonitoringSnapshot.created_at.desc()).first()
+    if not snapshot:
+        return None
+    return _decode(view, json.loads(snapshot.data)), snapshot.max_report_id
+
+
+def precompute_all(now=None):
+    """Compute and store snapshots for the default views. Returns the snapshot count."""
+    start_date, end_date = default_range(now)
+    start_utc, end_utc = local_range_to_utc(start_date, end_date)
+    max_id = db.session.query(func.max(Report.id)).scalar() or 0
+
+    save_snapshot(SUMMARY, start_date, end_date,
+                  aggregates.summary_aggregates(start_utc, end_utc, max_id=max_id), max_id)
+    count = 1
+    for user in User.query.filter_by(is_favorite=True).all():
+        save_snapshot(USER_RANGE, start_date, end_date,
+                      aggregates.user_range_aggregates(user.id, start_utc, end_utc, max_id=max_id),
+                      max_id, user_id=user.id)
+        save_snapshot(USER_ITEMS, start_date, end_date,
+                      aggregates.user_item_aggregates(user.id, max_id=max_id),
+                      max_id, user_id=user.id)
+        count += 2
+
+    # Snapshots for past ranges are never served again
+    MonitoringSnapshot.query.filter(MonitoringSnapshot.end_date < end_date).delete()
+    db.session.commit()
+    return count
+
+
+def summary_from_snapshot(start_date, end_date):
+    loaded = load_snapshot(SUMMARY, start_date, end_date)
+    if loaded is None:
+        return None
+    data, max_id = loaded
+    start_utc, end_utc = local_range_to_utc(start_date, end_date)
+    return aggregates.merge_summary(data, aggregates.summary_aggregates(start_utc, end_utc, after_id=max_id))
+
+
+def user_range_from_snapshot(user_id, start_date, end_date):
+    loaded = load_snapshot(USER_RANGE, start_date, end_date, user_id=user_id)
+    if loaded is None:
+        return None
+    data, max_id = loaded
+    start_utc, end_utc = local_range_to_utc(start_date, end_date)
+    return aggregates.merge_user_range(
+        data, aggregates.user_range_aggregates(user_id, start_utc, end_utc, after_id=max_id)
+    )
+
+
+def user_items_from_snapshot(user_id):
+    # Item stats are all-time, so any snapshot for the user can be topped up
+    loaded = load_snapshot(USER_ITEMS, user_id=user_id)
+    if loaded is None:
+        return None
+    data, max_id = loaded
+    return aggregates.merge_user_items(data, aggregates.user_item_aggregates(user_id, after_id=max_id))
+
+
+def invalidate(report_id=None):
+    """Drop snapshots that include ``report_id`` (or all snapshots)."""
+    # The columnar arrays hold every report, so any change reloads them
+    analytics.engine.invalidate()
+    query = MonitoringSnapshot.query
+    if report_id is not None:
+        query = query.filter(MonitoringSnapshot.max_report_id >= report_id)
+    query.delete()
+
+
+def start_scheduler(app, interval_minutes):
+    """Recompute snapshots every ``interval_minutes`` in a daemon thread."""
+    def run():
+        while True:
+            with app.app_context():
+                try:
+                    count = precompute_all()
+                    app.logger.info(f"Precomputed {count} monitoring snapshots")
+                except Exception as exc:
+                    db.session.rollback()
+                    app.logger.error(f"Monitoring snapshot precompute failed: {exc}")
+                finally:
+                    db.session.remove()
+            time.sleep(interval_minutes * 60)
+
+    thread = threading.Thread(target=run, name='monitoring-snapshots', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,144 @@
+// Infinite-scroll tables for the admin users/items lists.
+// Rows come from keyset-paginated JSON endpoints ({rows, next_cursor, total}).
+
+function escapeHtml(value) {
+  return String(value == null ? '' : value)
+    .replace(/&/g, '&amp;')
+    .replace(/</g, '&lt;')
+    .replace(/>/g, '&gt;')
+    .replace(/"/g, '&quot;')
+    .replace(/'/g, '&#39;');
+}
+
+function createInfiniteTable(options) {
+  // options: url, rowsKey, container, tbody, renderRow(row, index), colspan,
+  //          searchInput (optional), onTotal(total) (optional), emptyHtml (optional)
+  const state = { cursor: null, done: false, loading: false, loaded: false, count: 0, search: '', generation: 0 };
+
+  function statusRow(html) {
+    return `<tr class="infinite-status"><td colspan="${options.colspan}" class="text-center text-muted py-3">${html}</td></tr>`;
+  }
+
+  function clearStatus() {
+    options.tbody.querySelectorAll('.infinite-status').forEach(row => row.remove());
+  }
+
+  async function loadMore() {
+    if (state.loading || state.done) return;
+    state.loading = true;
+    clearStatus();
+    options.tbody.insertAdjacentHTML('beforeend', statusRow('<span class="spinner-border spinner-border-sm"></span> Loading...'));
+
+    const params = new URLSearchParams();
+    if (state.search) params.set('q', state.search);
+    if (state.cursor) params.set('cursor', state.cursor);
+    const generation = state.generation;
+
+    try {
+      const response = await fetch(`${options.url}?${params.toString()}`);
+      const data = await response.json();
+      if (generation !== state.generation) return;  // a newer search replaced this one
+      clearStatus();
+      if (!data.success) {
+        options.tbody.insertAdjacentHTML('beforeend', statusRow(escapeHtml(data.message)));
+        state.done = true;
+        return;
+      }
+      if (data.total !== null && data.total !== undefined && options.onTotal) {
+        options.onTotal(data.total);
+      }
+      const html = data[options.rowsKey].map(row => options.renderRow(row, ++state.count)).join('');
+      options.tbody.insertAdjacentHTML('beforeend', html);
+      state.cursor = data.next_cursor;
+      state.done = !data.next_cursor;
+      if (state.done && state.count === 0) {
+        options.tbody.insertAdjacentHTML('beforeend', statusRow(options.emptyHtml || 'No results'));
+      }
+    } catch (error) {
+      if (generation !== state.generation) return;
+      clearStatus();
+      options.tbody.insertAdjacentHTML('beforeend', statusRow('Failed to load data'));
+    } finally {
+      if (generation === state.generation) state.loading = false;
+    }
+    // Keep loading until the container can scroll
+    if (generation === state.generation && !state.done && options.container.scrollHeight <= options.container.clientHeight) {
+      loadMore();
+    }
+  }
+
+  function reset(search) {
+    state.generation += 1;
+    state.cursor = null;
+    state.done = false;
+    state.loading = false;
+    state.count = 0;
+    state.search = search || '';
+    options.tbody.innerHTML = '';
+    loadMore();
+  }
+
+  options.container.addEventListener('scroll', function() {
+    if (this.scrollTop + this.clientHeight >= this.scrollHeight - 100) {
+      loadMore();
+    }
+  });
+
+  if (options.searchInput) {
+    let timer = null;
+    options.searchInput.addEventListener('input', function() {
+      clearTimeout(timer);
+      timer = setTimeout(() => reset(this.value.trim()), 300);
+    });
+  }
+
+  return {
+    // First call loads the first page; later calls are no-ops
+    ensureLoaded() {
+      if (state.loaded) return;
+      state.loaded = true;
+      reset(options.searchInput ? options.searchInput.value.trim() : '');
+    },
+    reload() {
+      state.loaded = true;
+      reset(options.searchInput ? options.searchInput.value.trim() : '');
+    }
+  };
+}
+
+function renderUserRow(user) {
+  const role = user.is_admin
+    ? '<span class="badge bg-warning text-dark" style="font-size: 0.7rem;">Admin</span>'
+    : '<span class="badge bg-secondary" style="font-size: 0.7rem;">User</span>';
+  const you = user.is_self ? '<span class="badge bg-info ms-1" style="font-size: 0.7rem;">You</span>' : '';
+  const deleteBtn = user.is_self ? '' : `
+        <button onclick="deleteUser(this)"
+                data-user-id="${user.id}"
+                data-user-name="${escapeHtml(user.name)}"
+                class="btn btn-outline-danger"
+                title="Delete User">
+          <i class="bi bi-trash"></i>
+        </button>`;
+  return `
+  <tr id="user-row-${user.id}" class="user-table-row">
+    <td><strong class="text-primary">${escapeHtml(user.employee_id)}</strong></td>
+    <td>
+      <i class="bi bi-person-circle text-secondary"></i>
+      <strong>${escapeHtml(user.name)}</strong>
+      ${you}
+    </td>
+    <td><small>${escapeHtml(user.department || '-')}</small></td>
+    <td><small>${escapeHtml(user.section || '-')}</small></td>
+    <td><small>${escapeHtml(user.job || '-')}</small></td>
+    <td><small>${escapeHtml(user.shift || '-')}</small></td>
+    <td>${role}</td>
+    <td class="text-center"><span class="badge bg-primary">${user.report_count}</span></td>
+    <td class="text-center">
+      <div class="btn-group btn-group-sm" role="group">
+        <a href="${escapeHtml(user.edit_url)}" class="btn btn-outline-primary" title="Edit User">
+          <i class="bi bi-pencil"></i>
+        </a>${deleteBtn}
+      </div>
+    </td>
+  </tr>`;
+}
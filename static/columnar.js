@@ -0,0 +1,17 @@
+// Decode the columnar JSON payload built by serialization.columnar():
+// {fields: [...], columns: [[...], ...]} -> [{field: value, ...}, ...]
+
+function fromColumnar(payload) {
+  const fields = payload.fields;
+  const columns = payload.columns;
+  const length = columns.length ? columns[0].length : 0;
+  const rows = new Array(length);
+  for (let i = 0; i < length; i++) {
+    const row = {};
+    for (let f = 0; f < fields.length; f++) {
+      row[fields[f]] = columns[f][i];
+    }
+    rows[i] = row;
+  }
+  return rows;
+}
@@ -0,0 +1,22 @@
+"""Merge item combinations from new reports into ItemLibrary.
+
+Only reports created since the last sync (plus those still editable) are scanned.
+Pass --full to rescan every report, e.g. after restoring a backup.
+Run from cron, e.g.:
+    */30 * * * * cd /path/to/app && python sync_item_library.py
+"""
+import sys
+from app import create_app
+from item_library import sync_from_reports
+
+
+def main():
+    app = create_app()
+    full = '--full' in sys.argv[1:]
+    with app.app_context():
+        scanned, inserted = sync_from_reports(full=full)
+        print(f"✅ {'Full' if full else 'Incremental'} sync: {scanned} combinations scanned, {inserted} new items added")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,13 @@
 """Production entrypoint using Waitress WSGI server.
 Run with: python -m waitress --host=0.0.0.0 --port=8000 wsgi:app
 Or: python wsgi.py
+
+Set WAITRESS_WORKERS > 1 to run that many pre-forked worker processes sharing
+one socket (see prefork.py); send SIGHUP to the master for a graceful reload.
 """
 from waitress import serve
 from app import create_app
+import logging
 import os
 
 app = create_app()
@@ -14,12 +18,29 @@ if __name__ == '__main__':
     threads = int(os.getenv('WAITRESS_THREADS', '16'))
     connection_limit = int(os.getenv('WAITRESS_CONNECTION_LIMIT', '200'))
     channel_timeout = int(os.getenv('WAITRESS_CHANNEL_TIMEOUT', '300'))  # for long-lived SSE
+    workers = int(os.getenv('WAITRESS_WORKERS', '1'))
 
-    serve(
-        app,
-        host=host,
-        port=port,
-        threads=threads,
-        connection_limit=connection_limit,
-        channel_timeout=channel_timeout,
-    )
+    if workers > 1:
+        import prefork
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s [%(process)d] %(message)s')
+        prefork.serve(
+            app,
+            host=host,
+            port=port,
+            workers=workers,
+            threads=threads,
+            max_requests=int(os.getenv('WAITRESS_MAX_REQUESTS', '0')),  # recycle workers (0 = never)
+            max_requests_jitter=int(os.getenv('WAITRESS_MAX_REQUESTS_JITTER', '0')),
+            graceful_timeout=int(os.getenv('WAITRESS_GRACEFUL_TIMEOUT', '30')),
+            connection_limit=connection_limit,
+            channel_timeout=channel_timeout,
+        )
+    else:
+        serve(
+            app,
+            host=host,
+            port=port,
+            threads=threads,
+            connection_limit=connection_limit,
+            channel_timeout=channel_timeout,
+        )